@@ -20,6 +20,7 @@ from crosstab_engine import generate_crosstab_report, export_to_dataframe
 from banner_csv_parser import parse_banner_csv
 from supabase_connector import get_banner_plans_for_project, get_questions_for_project
 from excel_formatter import create_professional_excel
+from dataset_cache import load_survey_csv_cached
 
 # ==================== PROFESSIONAL CSS ====================
 # Matching web app design system
@@ -504,7 +505,7 @@ def server(input, output, session):
 
         try:
             print(f"Loading labels file: {file_info[0]['name']}")
-            df = pd.read_csv(file_info[0]["datapath"])
+            df, _ = load_survey_csv_cached(file_info[0]["datapath"])
             print(f"Loaded {len(df)} rows, {len(df.columns)} columns")
 
             # Extract questions from headers
@@ -545,7 +546,7 @@ def server(input, output, session):
             return
 
         try:
-            df = pd.read_csv(file_info[0]["datapath"])
+            df, _ = load_survey_csv_cached(file_info[0]["datapath"])
             current_state = data_state.get()
             current_state["codes_df"] = df
             data_state.set(current_state)
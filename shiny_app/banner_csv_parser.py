@@ -6,6 +6,11 @@ Converts to the format needed by crosstab_engine
 import pandas as pd
 import re
 
+from table_nets import parse_nets
+
+# Grid summary rows written by tabplan_writer for 3+ statement Likerts ("Q3_T2B Summary")
+GRID_SUMMARY_ROW = re.compile(r'^(?P<grid>.+)_(?P<summary>TB|T2B|B2B|BB|Mean) Summary$', re.IGNORECASE)
+
 def parse_banner_csv(csv_file_path):
     """
     Parse banner plan from CSV file
@@ -117,7 +122,10 @@ def parse_tab_sheet_csv(csv_file_path):
         csv_file_path: Path to tab sheet CSV file
 
     Returns:
-        list: Questions list for crosstab_engine
+        list: Questions list for crosstab_engine; questions with a parsable
+        Nets column carry 'nets' (see table_nets.parse_nets). Grid summary
+        rows (Q3_T2B Summary) become 'grid_summary' questions naming their
+        'grid' and 'summary' (TB, T2B, B2B, BB or Mean).
     """
 
     # Skip header rows - actual data starts at row 14 (0-indexed)
@@ -132,12 +140,26 @@ def parse_tab_sheet_csv(csv_file_path):
         if not q_id or q_id == 'nan' or q_id in ['Screener', 'Main Survey']:
             continue
 
-        # Skip summary instructions (Q3_TB Summary, Q3_Mean Summary, etc.)
+        # Grid summary tables (Q3_TB Summary, Q3_Mean Summary, etc.)
+        summary_row = GRID_SUMMARY_ROW.match(q_id)
+        if summary_row:
+            summary = summary_row.group('summary').upper()
+            questions.append({
+                'id': q_id,
+                'text': row.get('Base Verbiage', q_id),
+                'type': 'grid_summary',
+                'grid': summary_row.group('grid'),
+                'summary': 'Mean' if summary == 'MEAN' else summary
+            })
+            continue
+
+        # Skip any other summary instructions
         if 'summary' in q_id.lower() or '_tb' in q_id.lower() or '_t2b' in q_id.lower() or '_b2b' in q_id.lower() or '_bb' in q_id.lower() or '_mean' in q_id.lower():
             continue
 
         # Determine question type from nets and instructions
-        nets = str(row.get('Nets (English & code #s)', '')).lower()
+        nets_text = row.get('Nets (English & code #s)', '')
+        nets = str(nets_text).lower()
         instructions = str(row.get('Additional Table Instructions', '')).lower()
 
         if 't2b' in nets or 'b2b' in nets or 't2b' in instructions or 'b2b' in instructions:
@@ -147,10 +169,14 @@ def parse_tab_sheet_csv(csv_file_path):
         else:
             q_type = 'categorical'
 
-        questions.append({
+        question = {
             'id': q_id,
             'text': row.get('Base Verbiage', f'Question {q_id}'),
             'type': q_type
-        })
+        }
+        net_definitions = parse_nets(nets_text)
+        if net_definitions:
+            question['nets'] = net_definitions
+        questions.append(question)
 
     return questions
\ No newline at end of file
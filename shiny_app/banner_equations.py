@@ -0,0 +1,589 @@
+"""
+Banner Equation Compiler
+Parses banner equations once into an AST and evaluates them as whole-column masks
+
+An equation such as "Q1=1-9 & (S7=2 | S7=10)" is parsed a single time and then
+applied to every respondent with vectorized pandas/NumPy operations, instead of
+re-parsing the text for each row.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+class EquationSyntaxError(ValueError):
+    """Raised when a banner equation cannot be parsed"""
+
+
+# ========== AST ==========
+
+@dataclass(frozen=True)
+class Everyone:
+    """Matches every respondent (the TOTAL column)"""
+
+
+@dataclass(frozen=True)
+class Nobody:
+    """Matches no respondent (used for equations that fail to parse)"""
+
+
+@dataclass(frozen=True)
+class Condition:
+    """
+    Single comparison: VARIABLE OPERATOR VALUE
+
+    kind is one of:
+    - 'scalar': operands = (raw value text,)
+    - 'range':  operands = (low, high), inclusive; high may be inf for "10+"
+    - 'list':   operands = items, each a raw value text or a (low, high) range
+    """
+    variable: str
+    operator: str
+    kind: str
+    operands: Tuple
+
+
+@dataclass(frozen=True)
+class AllOf:
+    """Logical AND of child nodes"""
+    children: Tuple
+
+
+@dataclass(frozen=True)
+class AnyOf:
+    """Logical OR of child nodes"""
+    children: Tuple
+
+
+Node = Union[Everyone, Nobody, Condition, AllOf, AnyOf]
+
+
+# ========== Parsing ==========
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<amp>&&?)
+      | (?P<pipe>\|\|?)
+      | (?P<op>>=|<=|!=|<>|==|=|>|<)
+      | (?P<comma>,)
+      | (?P<word>[^\s&|()<>=!,]+)
+    )""", re.VERBOSE)
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z0-9_]+$')
+_NUMBER = r'\d+(?:\.\d+)?'
+_RANGE_RE = re.compile(rf'^({_NUMBER})\s*-\s*({_NUMBER})$')
+_OPEN_RANGE_RE = re.compile(rf'^({_NUMBER})\s*\+$')
+
+_OPERATOR_ALIASES = {'==': '=', '<>': '!='}
+
+# Word OR between two branches (the symbol forms are | and ||)
+_OR_WORD_RE = re.compile(r'\s+OR\s+', re.IGNORECASE)
+
+
+def _tokenize(equation: str) -> List[Tuple[str, str]]:
+    """Split an equation into (kind, text) tokens; AND/OR/BETWEEN words become keywords"""
+    tokens = []
+    pos = 0
+    text = equation.rstrip()
+
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise EquationSyntaxError(f"Unexpected character at position {pos} in '{equation}'")
+        pos = match.end()
+
+        kind = match.lastgroup
+        value = match.group(kind)
+
+        if kind == 'amp':
+            tokens.append(('and', value))
+        elif kind == 'pipe':
+            tokens.append(('or', value))
+        elif kind == 'word' and value.upper() in ('AND', 'OR', 'BETWEEN'):
+            tokens.append((value.lower(), value))
+        else:
+            tokens.append((kind, value))
+
+    return tokens
+
+
+def _parse_number(text: str) -> Union[float, None]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _parse_item(text: str) -> Union[str, Tuple[float, float]]:
+    """Parse one value item: a range "1-9", an open range "10+", or raw text"""
+    match = _RANGE_RE.match(text)
+    if match:
+        return (float(match.group(1)), float(match.group(2)))
+
+    match = _OPEN_RANGE_RE.match(text)
+    if match:
+        return (float(match.group(1)), float('inf'))
+
+    return text
+
+
+class _Parser:
+    """Recursive-descent parser: OR binds looser than AND, parentheses group"""
+
+    def __init__(self, equation: str):
+        self.equation = equation
+        self.tokens = _tokenize(equation)
+        self.pos = 0
+
+    def peek(self) -> Union[str, None]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind: str) -> str:
+        if self.peek() != kind:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else 'end of equation'
+            raise EquationSyntaxError(f"Expected {kind} but found '{found}' in '{self.equation}'")
+        value = self.tokens[self.pos][1]
+        self.pos += 1
+        return value
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise EquationSyntaxError(f"Unexpected '{self.tokens[self.pos][1]}' in '{self.equation}'")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.peek() == 'or':
+            self.pos += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else AnyOf(tuple(children))
+
+    def parse_and(self) -> Node:
+        children = [self.parse_factor()]
+        while self.peek() == 'and':
+            self.pos += 1
+            children.append(self.parse_factor())
+        return children[0] if len(children) == 1 else AllOf(tuple(children))
+
+    def parse_factor(self) -> Node:
+        if self.peek() == 'lparen':
+            self.pos += 1
+            node = self.parse_or()
+            self.take('rparen')
+            return node
+        return self.parse_condition()
+
+    def parse_condition(self) -> Condition:
+        variable = self.take('word')
+        if not _IDENTIFIER_RE.match(variable):
+            raise EquationSyntaxError(f"Invalid variable name '{variable}' in '{self.equation}'")
+
+        # Q1 BETWEEN 1 AND 9  ->  inclusive range
+        if self.peek() == 'between':
+            self.pos += 1
+            low = _parse_number(self.take('word'))
+            self.take('and')
+            high = _parse_number(self.take('word'))
+            if low is None or high is None:
+                raise EquationSyntaxError(f"BETWEEN needs numeric bounds in '{self.equation}'")
+            return Condition(variable, '=', 'range', (low, high))
+
+        operator = self.take('op')
+        operator = _OPERATOR_ALIASES.get(operator, operator)
+
+        # Value runs until the next AND/OR/parenthesis; commas separate list items
+        items = [[]]
+        while self.peek() in ('word', 'comma'):
+            kind, text = self.tokens[self.pos]
+            self.pos += 1
+            if kind == 'comma':
+                items.append([])
+            else:
+                items[-1].append(text)
+
+        texts = [re.sub(r'\s*-\s*', '-', ' '.join(words)) for words in items]
+        if any(not t for t in texts):
+            raise EquationSyntaxError(f"Missing value for {variable} in '{self.equation}'")
+
+        if len(texts) > 1:
+            kind, operands = 'list', tuple(_parse_item(t) for t in texts)
+        else:
+            item = _parse_item(texts[0])
+            if isinstance(item, tuple):
+                kind, operands = 'range', item
+            else:
+                kind, operands = 'scalar', (item,)
+
+        if kind != 'scalar' and operator not in ('=', '!='):
+            raise EquationSyntaxError(f"Ranges and code lists only support = and != in '{self.equation}'")
+
+        return Condition(variable, operator, kind, operands)
+
+
+def parse_equation(equation: str) -> Node:
+    """
+    Parse a banner equation into an AST
+
+    Supports:
+    - Basic comparisons: =, ==, !=, >, <, >=, <=
+    - Ranges: Q1=1-9, open-ended Q1=10+
+    - Multiple values: S7=1,2,3 (items may also be ranges)
+    - Compound logic with AND binding tighter than OR: &, |, AND, OR
+    - Parentheses: S1=1 & (S7=2 | S7=10)
+    - BETWEEN syntax: Q1 BETWEEN 1 AND 9
+
+    Args:
+        equation: Banner equation text
+
+    Returns:
+        Root AST node
+
+    Raises:
+        EquationSyntaxError: If the equation is malformed
+    """
+    if equation is None or not str(equation).strip() or str(equation).strip() == 'TOTAL':
+        return Everyone()
+
+    return _Parser(str(equation)).parse()
+
+
+def _or_branches(equation: str) -> List[str]:
+    """Top-level OR branches of an equation's text (| and OR outside parentheses)"""
+    branches = []
+    depth = start = pos = 0
+    while pos < len(equation):
+        char = equation[pos]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(depth - 1, 0)
+        elif depth == 0 and char == '|':
+            branches.append(equation[start:pos])
+            pos = start = pos + (2 if equation.startswith('||', pos) else 1)
+            continue
+        elif depth == 0:
+            word = _OR_WORD_RE.match(equation, pos)
+            if word:
+                branches.append(equation[start:pos])
+                pos = start = word.end()
+                continue
+        pos += 1
+    branches.append(equation[start:])
+    return branches
+
+
+@lru_cache(maxsize=2048)
+def compile_equation(equation: str) -> Node:
+    """
+    Parse an equation once and memoize the AST
+
+    A malformed equation is parsed again one top-level OR branch at a time,
+    and only the branches that still fail compile to Nobody (match no
+    respondents), as the row-wise evaluator treated each OR branch on its
+    own: "S1=1 | S5 >= 1-3" keeps the S1=1 respondents. An equation without a
+    valid branch matches nobody. Every dropped branch is reported with a
+    WARNING.
+    """
+    try:
+        return parse_equation(equation)
+    except EquationSyntaxError as e:
+        print(f"WARNING: {e}")
+
+    branches = _or_branches(str(equation))
+    if len(branches) < 2:
+        return Nobody()
+
+    parsed = []
+    for branch in branches:
+        if not branch.strip():
+            print(f"WARNING: Empty OR branch in '{equation}' matches nobody")
+            continue
+        try:
+            parsed.append(parse_equation(branch))
+        except EquationSyntaxError as e:
+            print(f"WARNING: Dropping OR branch '{branch.strip()}': {e}")
+    if not parsed:
+        return Nobody()
+    return parsed[0] if len(parsed) == 1 else AnyOf(tuple(parsed))
+
+
+# ========== Canonical form ==========
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _format_value(item) -> str:
+    if isinstance(item, tuple):
+        low, high = item
+        return f"{_format_number(low)}+" if high == float('inf') else f"{_format_number(low)}-{_format_number(high)}"
+    return item
+
+
+def format_equation(node: Node) -> str:
+    """
+    Equation text of an AST, e.g. "(Q1=1-9 & S7=2) | S1=1"
+
+    For canonical nodes this is the canonical spelling: single spaces around
+    & and |, = instead of ==, and parentheses only where OR sits inside AND.
+    """
+    if isinstance(node, Everyone):
+        return 'TOTAL'
+    if isinstance(node, Nobody):
+        return 'NOBODY'
+    if isinstance(node, AllOf):
+        return ' & '.join(f"({format_equation(c)})" if isinstance(c, AnyOf) else format_equation(c)
+                          for c in node.children)
+    if isinstance(node, AnyOf):
+        return ' | '.join(format_equation(c) for c in node.children)
+    items = [node.operands] if node.kind == 'range' else node.operands
+    return f"{node.variable}{node.operator}{','.join(_format_value(item) for item in items)}"
+
+
+def _item_order(item) -> Tuple:
+    if isinstance(item, tuple):
+        return (0, item[0], item[1], '')
+    number = _parse_number(item)
+    return (0, number, number, item) if number is not None else (1, 0.0, 0.0, item)
+
+
+def canonicalize(node: Node, resolve: Optional[Callable[[Condition], Condition]] = None) -> Node:
+    """
+    Canonical form of an AST, so equivalent spellings compare equal
+
+    AND/OR chains are flattened (A & (B & C) -> A & B & C), duplicate
+    children dropped and the rest sorted; TOTAL and unparseable children
+    fold away (A & TOTAL -> A, A | TOTAL -> TOTAL). Code lists are sorted
+    and deduplicated. Operators are already normalized by the parser (== is
+    =, <> is !=) and spacing/AND/OR spelling never reach the AST.
+
+    Args:
+        node: Parsed AST
+        resolve: Applied to every condition first (e.g. the dataset's
+            EquationEvaluator.resolve_checkbox, so S7=2 and S7r2=1 are one node)
+
+    Returns:
+        Equivalent canonical AST (hashable, usable as a cache key)
+    """
+    if isinstance(node, Condition):
+        node = resolve(node) if resolve is not None else node
+        if node.kind == 'list':
+            operands = tuple(sorted(set(node.operands), key=_item_order))
+            return Condition(node.variable, node.operator, 'list', operands)
+        return node
+    if not isinstance(node, (AllOf, AnyOf)):
+        return node
+
+    node_type = type(node)
+    identity, absorbing = (Everyone, Nobody) if node_type is AllOf else (Nobody, Everyone)
+
+    children = {}
+    for child in (canonicalize(c, resolve) for c in node.children):
+        flattened = child.children if isinstance(child, node_type) else (child,)
+        for item in flattened:
+            if isinstance(item, absorbing):
+                return item
+            if not isinstance(item, identity):
+                children.setdefault(item, None)
+
+    if not children:
+        return identity()
+    if len(children) == 1:
+        return next(iter(children))
+    return node_type(tuple(sorted(children, key=format_equation)))
+
+
+# ========== Evaluation ==========
+
+class EquationEvaluator:
+    """
+    Evaluate compiled equations against one DataFrame
+
+    Each referenced column is converted to numeric/text form once and reused by
+    every condition that touches it.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n_rows = len(df)
+        self.columns = frozenset(df.columns)
+        self._present: Dict[str, np.ndarray] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._text: Dict[str, np.ndarray] = {}
+
+    def mask(self, node: Node) -> np.ndarray:
+        """Return a boolean array with one entry per row of the DataFrame"""
+        if isinstance(node, Everyone):
+            return np.ones(self.n_rows, dtype=bool)
+        if isinstance(node, Nobody):
+            return np.zeros(self.n_rows, dtype=bool)
+        if isinstance(node, AllOf):
+            result = self.mask(node.children[0])
+            for child in node.children[1:]:
+                result = result & self.mask(child)
+            return result
+        if isinstance(node, AnyOf):
+            result = self.mask(node.children[0])
+            for child in node.children[1:]:
+                result = result | self.mask(child)
+            return result
+        return self._condition_mask(node)
+
+    # ----- column conversions -----
+
+    def present(self, variable: str) -> np.ndarray:
+        if variable not in self._present:
+            self._present[variable] = self.df[variable].notna().to_numpy(dtype=bool)
+        return self._present[variable]
+
+    def numeric(self, variable: str) -> np.ndarray:
+        """Column as float64 with NaN for missing and non-numeric cells"""
+        if variable not in self._numeric:
+            column = self.df[variable]
+            if pd.api.types.is_datetime64_any_dtype(column.dtype):
+                values = np.full(self.n_rows, np.nan)
+            else:
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    column = column.astype(object)
+                values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            self._numeric[variable] = values
+        return self._numeric[variable]
+
+    def text(self, variable: str) -> np.ndarray:
+        """Column as str(cell), matching the string fallback of the row-wise evaluator"""
+        if variable not in self._text:
+            self._text[variable] = self.df[variable].astype(str).to_numpy(dtype=object)
+        return self._text[variable]
+
+    # ----- conditions -----
+
+    def resolve_checkbox(self, cond: Condition) -> Condition:
+        """S7=2 -> S7r2=1 when S7 is not a column but the checkbox S7r2 is"""
+        if (cond.kind == 'scalar' and cond.operator in ('=', '!=')
+                and cond.variable not in self.columns and cond.operands[0].isdigit()):
+            checkbox_col = f"{cond.variable}r{cond.operands[0]}"
+            if checkbox_col in self.columns:
+                return Condition(checkbox_col, cond.operator, 'scalar', ('1',))
+        return cond
+
+    def _condition_mask(self, cond: Condition) -> np.ndarray:
+        cond = self.resolve_checkbox(cond)
+        if cond.variable not in self.columns:
+            return np.zeros(self.n_rows, dtype=bool)
+
+        present = self.present(cond.variable)
+        numeric = self.numeric(cond.variable)
+
+        if cond.kind == 'scalar':
+            return self._scalar_mask(cond, present, numeric)
+
+        items = [cond.operands] if cond.kind == 'range' else cond.operands
+        matched = np.zeros(self.n_rows, dtype=bool)
+        for item in items:
+            matched |= self._item_mask(cond.variable, item, numeric)
+
+        if cond.operator == '!=':
+            return present & ~matched
+        return matched
+
+    def _item_mask(self, variable: str, item, numeric: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore'):
+            if isinstance(item, tuple):
+                low, high = item
+                return (numeric >= low) & (numeric <= high)
+            number = _parse_number(item)
+            if number is not None:
+                return numeric == number
+        return self.text(variable) == item
+
+    def _scalar_mask(self, cond: Condition, present: np.ndarray, numeric: np.ndarray) -> np.ndarray:
+        value_str = cond.operands[0]
+        value = _parse_number(value_str)
+        op = cond.operator
+
+        if value is None:
+            # Non-numeric value: string comparison only
+            if op == '=':
+                return present & (self.text(cond.variable) == value_str)
+            if op == '!=':
+                return present & (self.text(cond.variable) != value_str)
+            return np.zeros(self.n_rows, dtype=bool)
+
+        is_number = ~np.isnan(numeric)
+        with np.errstate(invalid='ignore'):
+            if op == '=':
+                result = numeric == value
+            elif op == '!=':
+                result = is_number & (numeric != value)
+            elif op == '>':
+                result = numeric > value
+            elif op == '<':
+                result = numeric < value
+            elif op == '>=':
+                result = numeric >= value
+            else:
+                result = numeric <= value
+
+        # Non-numeric cells fall back to string comparison for = and !=
+        if op in ('=', '!='):
+            text_cells = present & ~is_number
+            if text_cells.any():
+                text = self.text(cond.variable)
+                if op == '=':
+                    result = result | (text_cells & (text == value_str))
+                else:
+                    result = result | (text_cells & (text != value_str))
+
+        return result
+
+
+def equation_mask(df: pd.DataFrame, equation: str) -> np.ndarray:
+    """
+    Evaluate a banner equation against every row of a DataFrame at once
+
+    Args:
+        df: Full dataset
+        equation: Banner equation (e.g., "S7=2", "Q1>5 & S1=1")
+
+    Returns:
+        Boolean NumPy array, True where the respondent matches
+    """
+    return EquationEvaluator(df).mask(compile_equation(equation))
+
+
+def equation_columns(equation: str, columns: List[str]) -> List[str]:
+    """
+    Data columns a banner equation reads
+
+    Checkbox shorthand is resolved the same way as during evaluation
+    (S7=2 reads S7r2), so only the columns below need to be loaded.
+
+    Args:
+        equation: Banner equation
+        columns: Column names in the data
+
+    Returns:
+        Referenced column names present in the data, in first-use order
+    """
+    evaluator = EquationEvaluator(pd.DataFrame(columns=list(columns)))
+    found = []
+
+    def visit(node: Node) -> None:
+        if isinstance(node, (AllOf, AnyOf)):
+            for child in node.children:
+                visit(child)
+        elif isinstance(node, Condition):
+            variable = evaluator.resolve_checkbox(node).variable
+            if variable in evaluator.columns and variable not in found:
+                found.append(variable)
+
+    visit(compile_equation(equation))
+    return found
@@ -0,0 +1,231 @@
+"""
+Banner Mask Store
+Report-scoped cache of banner column masks
+
+Every banner column is evaluated once per dataset and the resulting mask is
+shared by all question tables, so a report with Q questions and C banner
+columns performs C mask evaluations instead of Q x C.
+
+Masks are held as packed bitsets (see packed_masks): compound equations are
+combined word-parallel, bases are popcounts, and boolean arrays are only
+unpacked when a kernel needs to index the data.
+
+Equations are canonicalized before evaluation (see
+banner_equations.canonicalize), so "Q1=1-9 & S7=2", "S7=2 AND Q1 == 1-9" and
+a second column with the same definition are one node. Every atomic
+predicate and every distinct sub-expression is memoized by its canonical
+node, so banner plans that repeat "& S7=2" across columns evaluate S7=2
+against the data once and build the rest with mask algebra. "Any of"
+equations over one checkbox family (S7=2 | S7=5 | S7=9) are read from the
+family's sparse selections in one pass (see checkbox_families).
+"""
+
+import time
+from functools import reduce
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banner_equations import (
+    AllOf, AnyOf, EquationEvaluator, Everyone, Node, Nobody, canonicalize, compile_equation
+)
+from checkbox_families import CheckboxFamilyStore
+from crosstab_kernels import resolve_weights, weighted_bases
+from packed_masks import PackedMask
+from schema_catalog import SchemaCatalog, schema_catalog
+
+
+class BannerMaskStore:
+    """Evaluates banner equations against one dataset and memoizes the masks"""
+
+    def __init__(self, df: pd.DataFrame, catalog: Optional[SchemaCatalog] = None):
+        self.df = df
+        self.n_rows = len(df)
+        # Column index of the dataset, built once when it was loaded
+        self.catalog = catalog if catalog is not None else schema_catalog(df)
+        self.evaluator = EquationEvaluator(df)
+        self._masks: Dict[str, PackedMask] = {}
+        # Canonical node -> mask: the shared DAG of predicates and sub-expressions
+        self._nodes: Dict[Node, PackedMask] = {}
+        # At most one unpacked (n_rows x n_columns) matrix, see matrix()
+        self._matrices: Dict[tuple, np.ndarray] = {}
+        self._weights: Dict[str, np.ndarray] = {}
+        self._weighted_bases: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        # Sparse checkbox families, shared with multi-response tables
+        self.families = CheckboxFamilyStore(df, self.catalog)
+        self.evaluations = 0
+        self.hits = 0
+        # Atomic predicates scanned against the data, and sub-expression masks reused
+        self.predicates = 0
+        self.shared = 0
+        # Per-equation timings of cache misses (see report_profile)
+        self.parse_seconds: Dict[str, float] = {}
+        self.eval_seconds: Dict[str, float] = {}
+
+    @staticmethod
+    def _key(equation: str) -> str:
+        if equation is None or not str(equation).strip():
+            return 'TOTAL'
+        return str(equation).strip()
+
+    def canonical(self, equation: str) -> Node:
+        """Canonical AST of an equation, with checkbox shorthand resolved against this dataset"""
+        return canonicalize(compile_equation(self._key(equation)), self.evaluator.resolve_checkbox)
+
+    def _evaluate(self, node: Node) -> PackedMask:
+        """Evaluate a canonical AST, combining memoized sub-expressions on packed words"""
+        cached = self._nodes.get(node)
+        if cached is not None:
+            self.shared += 1
+            return cached
+
+        if isinstance(node, Everyone):
+            packed = PackedMask.ones(self.n_rows)
+        elif isinstance(node, Nobody):
+            packed = PackedMask.zeros(self.n_rows)
+        elif isinstance(node, AllOf):
+            packed = reduce(lambda a, b: a & b, (self._evaluate(child) for child in node.children))
+        elif isinstance(node, AnyOf):
+            packed = reduce(lambda a, b: a | b, self._any_of(node.children))
+        else:
+            packed = PackedMask.from_bool(self.evaluator.mask(node))
+            self.predicates += 1
+        self._nodes[node] = packed
+        return packed
+
+    def _any_of(self, children: Tuple) -> List[PackedMask]:
+        """Masks to OR together; two or more options of one checkbox family become one mask"""
+        options: Dict[str, List[str]] = {}
+        others = []
+        for child in children:
+            located = None if child in self._nodes else self.families.checkbox_option(child)
+            if located is None:
+                others.append(child)
+            else:
+                options.setdefault(located[0], []).append(child)
+
+        parts = []
+        for question, conditions in options.items():
+            if len(conditions) == 1:
+                others.extend(conditions)
+                continue
+            family = self.families.question(question)
+            positions = [family.positions[cond.variable] for cond in conditions]
+            parts.append(PackedMask.from_bool(family.any_of(positions)))
+            self.predicates += 1
+        return [self._evaluate(child) for child in others] + parts
+
+    def packed(self, equation: str) -> PackedMask:
+        """Packed bitset for a banner equation"""
+        key = self._key(equation)
+        cached = self._masks.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        start = time.perf_counter()
+        node = self.canonical(key)
+        parsed = time.perf_counter()
+        packed = self._evaluate(node)
+        self.parse_seconds[key] = parsed - start
+        self.eval_seconds[key] = time.perf_counter() - parsed
+        self._masks[key] = packed
+        self.evaluations += 1
+        return packed
+
+    def mask(self, equation: str) -> np.ndarray:
+        """Boolean mask (one entry per respondent) for a banner equation"""
+        return self.packed(equation).to_bool()
+
+    def base(self, equation: str) -> int:
+        """Number of respondents in a banner column (popcount)"""
+        return self.packed(equation).count()
+
+    def bases(self, banner_columns: List[Dict]) -> np.ndarray:
+        """Base of every banner column, in column order"""
+        return np.array([self.base(col['equation']) for col in banner_columns], dtype=np.int64)
+
+    def union(self, equations: List[str]) -> PackedMask:
+        """Respondents in any of the columns (e.g. an H1 net)"""
+        return reduce(lambda a, b: a | b, (self.packed(e) for e in equations), PackedMask.zeros(self.n_rows))
+
+    def intersection(self, equations: List[str]) -> PackedMask:
+        """Respondents in all of the columns (e.g. a nested banner)"""
+        return reduce(lambda a, b: a & b, (self.packed(e) for e in equations), PackedMask.ones(self.n_rows))
+
+    def matrix(self, banner_columns: List[Dict]) -> np.ndarray:
+        """
+        Unpack several banner columns into an (n_rows x n_columns) bool matrix
+
+        Only the most recently requested column set is kept unpacked, so
+        every table of a report reuses one array while memory stays bounded
+        to n_rows x n_columns; compact() drops it.
+        """
+        key = tuple(self._key(col['equation']) for col in banner_columns)
+        cached = self._matrices.get(key)
+        if cached is not None:
+            return cached
+
+        if not banner_columns:
+            matrix = np.zeros((self.n_rows, 0), dtype=bool)
+        else:
+            matrix = np.column_stack([self.mask(equation) for equation in key])
+        matrix.setflags(write=False)
+        self._keep_matrix(key, matrix)
+        return matrix
+
+    def _keep_matrix(self, key: tuple, matrix: np.ndarray) -> None:
+        """Memoize one unpacked matrix, releasing any other column set's"""
+        self._matrices.clear()
+        self._matrices[key] = matrix
+
+    def weights(self, weight_column: str) -> np.ndarray:
+        """Respondent weight vector for a weight column, resolved once per report"""
+        cached = self._weights.get(weight_column)
+        if cached is None:
+            if weight_column not in self.df.columns:
+                raise ValueError(f"Weight column '{weight_column}' not found in data")
+            cached = resolve_weights(self.df[weight_column])
+            cached.setflags(write=False)
+            self._weights[weight_column] = cached
+        return cached
+
+    def weighted_bases(self, banner_columns: List[Dict], weight_column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(weighted base, effective base) of every banner column, in column order"""
+        key = (weight_column,) + tuple(self._key(col['equation']) for col in banner_columns)
+        cached = self._weighted_bases.get(key)
+        if cached is None:
+            cached = weighted_bases(self.matrix(banner_columns), self.weights(weight_column))
+            self._weighted_bases[key] = cached
+        return cached
+
+    def seed(self, banner_columns: List[Dict], matrix: np.ndarray) -> None:
+        """
+        Install masks evaluated elsewhere (e.g. by a parent process)
+
+        Args:
+            banner_columns: Banner columns in matrix column order
+            matrix: (n_rows x n_columns) bool mask matrix
+        """
+        key = tuple(self._key(col['equation']) for col in banner_columns)
+        for idx, equation in enumerate(key):
+            if equation not in self._masks:
+                self._masks[equation] = self._nodes.setdefault(self.canonical(equation),
+                                                               PackedMask.from_bool(matrix[:, idx]))
+        self._keep_matrix(key, matrix)
+
+    def compact(self) -> None:
+        """Release unpacked working matrices, keeping only the packed masks"""
+        self._matrices.clear()
+        self._weights.clear()
+        self._weighted_bases.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the packed masks (columns and shared sub-expressions)"""
+        masks = {id(m): m for m in list(self._masks.values()) + list(self._nodes.values())}
+        return sum(m.nbytes for m in masks.values())
+
+    def __len__(self) -> int:
+        return len(self._masks)
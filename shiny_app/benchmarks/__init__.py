@@ -0,0 +1,14 @@
+"""
+Cross-Tab Benchmarks
+Synthetic survey generator and per-stage timings of generate_crosstab_report
+
+Run from shiny_app/ (the engine modules are imported as siblings):
+
+    python -m benchmarks --respondents 50000 --banner-columns 60
+    python -m benchmarks --compare benchmark-abc1234.json
+"""
+
+from benchmarks.runner import (
+    build_results, compare_results, example_case, format_results, run_case, save_results, synthetic_case
+)
+from benchmarks.synthetic import generate_banner_plan, generate_survey, replicate_rows
@@ -0,0 +1,77 @@
+"""
+Command line entry point: python -m benchmarks (from shiny_app/)
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.runner import (
+    build_results, compare_results, example_case, format_results, save_results, synthetic_case
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time each stage of a cross-tab report')
+    parser.add_argument('--cases', default='synthetic,example',
+                        help='Comma-separated cases to run: synthetic, example')
+    parser.add_argument('--respondents', type=int, default=10_000)
+    parser.add_argument('--single', type=int, default=20, help='Single-punch questions')
+    parser.add_argument('--multi', type=int, default=5, help='Checkbox families')
+    parser.add_argument('--multi-options', type=int, default=8)
+    parser.add_argument('--grids', type=int, default=4, help='Rating grids')
+    parser.add_argument('--grid-statements', type=int, default=7)
+    parser.add_argument('--numeric', type=int, default=5, help='Numeric questions')
+    parser.add_argument('--banner-columns', type=int, default=40)
+    parser.add_argument('--compound-share', type=float, default=0.3,
+                        help='Share of banner columns with compound equations')
+    parser.add_argument('--example-factor', type=int, default=20,
+                        help='Times the example Codes.csv is replicated')
+    parser.add_argument('--weighted', action='store_true', help='Weight the synthetic report')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the report stage')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Results JSON path (default: benchmark-<commit>-<time>.json)')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown before a stage counts as a regression')
+    args = parser.parse_args(argv)
+
+    cases = []
+    selected = {name.strip() for name in args.cases.split(',')}
+    with tempfile.TemporaryDirectory() as workdir:
+        if 'synthetic' in selected:
+            cases.append(synthetic_case(
+                workdir, args.respondents, args.banner_columns, args.compound_share, args.seed,
+                args.repeats, args.weighted, args.workers,
+                single=args.single, multi=args.multi, multi_options=args.multi_options,
+                grids=args.grids, grid_statements=args.grid_statements, numeric=args.numeric
+            ))
+        if 'example' in selected and args.example_factor > 0:
+            cases.append(example_case(workdir, args.example_factor, args.repeats, args.workers))
+
+    results = build_results(cases)
+    output = args.output or f"benchmark-{results['git_commit'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    save_results(results, output)
+    print(format_results(results))
+    print(f"\nINFO: Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare_results(json.load(f), results, args.tolerance)
+        print(f"\nCompared with {args.compare}:")
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ('' if row['comparable'] else '  (settings differ)')
+            print(f"  {row['case']:<10} {row['stage']:<14} {row['baseline']:>9.4f}s -> "
+                  f"{row['current']:>9.4f}s  x{row['ratio']:.2f}{flag}")
+        if any(row['regression'] for row in rows):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
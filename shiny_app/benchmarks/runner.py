@@ -0,0 +1,293 @@
+"""
+Benchmark Runner
+Times each stage of a cross-tab report and records the results as JSON
+
+Stages:
+- ingest: load_survey_csv on the CSV export
+- masks: evaluating every banner column into a BannerMaskStore
+- stats: building every question table against the stored masks
+- significance: column stat testing of the finished tables
+- report: generate_crosstab_report end to end
+- csv_export / excel_export: writing the finished report
+
+Every stage runs `repeats` times; the fastest run is the headline figure and
+all runs are kept. Results carry the git commit and library versions so
+files from different commits can be compared with compare_results.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from banner_csv_parser import parse_banner_csv, parse_tab_sheet_csv
+from banner_equations import compile_equation
+from banner_masks import BannerMaskStore
+from crosstab_engine import (
+    build_banner_columns, build_crosstab_table, export_to_csv, export_to_dataframe,
+    generate_crosstab_report
+)
+from data_ingest import load_survey_csv
+from schema_catalog import schema_catalog
+from significance import DEFAULT_CONFIDENCE, add_report_significance
+
+from benchmarks.synthetic import generate_banner_plan, generate_survey, replicate_rows
+
+RESULTS_VERSION = 1
+
+EXAMPLES_DIR = Path(__file__).resolve().parents[2] / 'apps' / 'web' / 'examples'
+EXAMPLE_DATA = EXAMPLES_DIR / 'SPSS' / 'Codes.csv'
+EXAMPLE_BANNER = EXAMPLES_DIR / 'Tab Sheet' / 'banners_infuse.csv'
+EXAMPLE_TAB_SHEET = EXAMPLES_DIR / 'Tab Sheet' / 'tab_sheet_infuse_2.csv'
+
+
+def _time(func: Callable, repeats: int) -> Dict:
+    """Run func repeats times; returns timings and the last result"""
+    runs = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return {
+        'seconds': round(min(runs), 6),
+        'median': round(float(np.median(runs)), 6),
+        'runs': [round(run, 6) for run in runs],
+        'result': result,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Short commit hash of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def _write_excel(report: Dict, path: Path) -> Optional[str]:
+    """One sheet per table via export_to_dataframe; returns the engine used (None if none installed)"""
+    for engine in ('xlsxwriter', 'openpyxl'):
+        try:
+            __import__(engine)
+        except ImportError:
+            continue
+        with pd.ExcelWriter(path, engine=engine) as writer:
+            for idx, table in enumerate(report['tables'], start=1):
+                frame = export_to_dataframe(report, table['question_id'])
+                if frame is not None:
+                    frame.to_excel(writer, sheet_name=f'Table {idx}', index=False)
+        return engine
+    return None
+
+
+def run_case(name: str, csv_path, questions: List[Dict], banner_plan: Dict, repeats: int = 3,
+             weight_column: Optional[str] = None, workers: Optional[int] = None,
+             config: Optional[Dict] = None) -> Dict:
+    """
+    Time every stage of one report
+
+    Args:
+        name: Case name stored in the results
+        csv_path: Codes.csv-style export to ingest
+        questions: Typed question definitions
+        banner_plan: Banner plan with H1/H2 structure
+        repeats: Runs per stage
+        weight_column: Respondent weight column (None = unweighted)
+        workers: Worker processes for the end-to-end report stage
+        config: Generator settings to record with the results
+
+    Returns:
+        Result dict with dataset shape and per-stage timings
+    """
+    stages = {}
+
+    timing = _time(lambda: load_survey_csv(csv_path)[0], repeats)
+    df = timing.pop('result')
+    stages['ingest'] = timing
+
+    banner_columns = build_banner_columns(banner_plan)
+
+    def evaluate_masks() -> BannerMaskStore:
+        compile_equation.cache_clear()
+        store = BannerMaskStore(df)
+        store.matrix(banner_columns)
+        return store
+
+    timing = _time(evaluate_masks, repeats)
+    masks = timing.pop('result')
+    stages['masks'] = timing
+
+    timing = _time(lambda: [build_crosstab_table(df, q, banner_columns, masks, weight_column)
+                            for q in questions], repeats)
+    tables = timing.pop('result')
+    stages['stats'] = timing
+
+    def test_tables() -> None:
+        add_report_significance({'metadata': {}, 'tables': tables}, banner_columns, DEFAULT_CONFIDENCE)
+
+    timing = _time(test_tables, repeats)
+    timing.pop('result')
+    stages['significance'] = timing
+
+    timing = _time(lambda: generate_crosstab_report(df, questions, banner_plan, workers=workers,
+                                                    weight_column=weight_column), repeats)
+    report = timing.pop('result')
+    stages['report'] = timing
+
+    timing = _time(lambda: export_to_csv(report), repeats)
+    timing['bytes'] = len(timing.pop('result').encode())
+    stages['csv_export'] = timing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timing = _time(lambda: _write_excel(report, Path(tmp) / 'report.xlsx'), repeats)
+        engine = timing.pop('result')
+    stages['excel_export'] = timing if engine else {'skipped': 'no xlsxwriter/openpyxl installed'}
+
+    return {
+        'name': name,
+        'config': config or {},
+        'dataset': {
+            'rows': len(df),
+            'columns': len(df.columns),
+            'csv_mb': round(os.path.getsize(csv_path) / (1024 * 1024), 2),
+            'questions': len(questions),
+            'banner_columns': len(banner_columns),
+            'weight_column': weight_column,
+            'workers': workers,
+        },
+        'stages': stages,
+    }
+
+
+def synthetic_case(workdir, respondents: int = 10_000, banner_columns: int = 40,
+                   compound_share: float = 0.3, seed: int = 0, repeats: int = 3,
+                   weighted: bool = False, workers: Optional[int] = None, **survey_options) -> Dict:
+    """Benchmark a generated survey (see synthetic.generate_survey for survey_options)"""
+    df, questions = generate_survey(respondents=respondents, seed=seed, **survey_options)
+    plan = generate_banner_plan(df, columns=banner_columns, compound_share=compound_share, seed=seed)
+    csv_path = Path(workdir) / 'synthetic.csv'
+    df.to_csv(csv_path, index=False)
+
+    config = {'respondents': respondents, 'banner_columns': banner_columns,
+              'compound_share': compound_share, 'seed': seed, **survey_options}
+    return run_case('synthetic', csv_path, questions, plan, repeats,
+                    'weight' if weighted else None, workers, config)
+
+
+def example_questions(df: pd.DataFrame) -> List[Dict]:
+    """Tab sheet questions typed the way the Shiny app types them on upload"""
+    questions = []
+    catalog = schema_catalog(df.columns)
+    for q in parse_tab_sheet_csv(EXAMPLE_TAB_SHEET):
+        if q['type'] == 'grid_summary':
+            # Summary tables follow their grid (Q3, then Q3_TB Summary ...)
+            if any(p['id'] == q['grid'] and p['type'] == 'likert_grid' for p in questions):
+                questions.append(q)
+        elif q['id'] in catalog:
+            questions.append(q)
+        elif catalog.has_family(q['id']):
+            family = catalog.family_columns(q['id'])
+            is_grid = (df[family].apply(pd.to_numeric, errors='coerce').max().max() or 0) > 1
+            questions.append({**q, 'type': 'likert_grid' if is_grid else 'multi'})
+    return questions
+
+
+def example_case(workdir, factor: int = 20, repeats: int = 3, workers: Optional[int] = None) -> Dict:
+    """Benchmark the Codes.csv + banners_infuse.csv example, replicated factor times"""
+    df = replicate_rows(pd.read_csv(EXAMPLE_DATA, low_memory=False), factor)
+    csv_path = Path(workdir) / 'example.csv'
+    df.to_csv(csv_path, index=False)
+
+    return run_case('example', csv_path, example_questions(df), parse_banner_csv(EXAMPLE_BANNER), repeats,
+                    workers=workers, config={'replication_factor': factor})
+
+
+def build_results(cases: List[Dict]) -> Dict:
+    return {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'git_commit': git_commit(),
+        'environment': environment(),
+        'cases': cases,
+    }
+
+
+def save_results(results: Dict, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def compare_results(baseline: Dict, current: Dict, tolerance: float = 0.2) -> List[Dict]:
+    """
+    Stage-by-stage comparison of two result files
+
+    Args:
+        baseline: Results of the reference commit
+        current: Results to check
+        tolerance: Allowed slowdown (0.2 = 20%) before a stage is a regression
+
+    Returns:
+        One row per stage present in both: case, stage, baseline and current
+        seconds, ratio, whether the case ran with the same settings and data
+        shape, and whether it regressed (only comparable cases can regress)
+    """
+    rows = []
+    baseline_cases = {case['name']: case for case in baseline.get('cases', [])}
+    for case in current.get('cases', []):
+        reference = baseline_cases.get(case['name'])
+        if reference is None:
+            continue
+        comparable = reference['config'] == case['config'] and reference['dataset'] == case['dataset']
+        for stage, timing in case['stages'].items():
+            before = reference['stages'].get(stage, {}).get('seconds')
+            after = timing.get('seconds')
+            if before is None or after is None:
+                continue
+            ratio = after / before if before > 0 else float('inf')
+            rows.append({
+                'case': case['name'],
+                'stage': stage,
+                'baseline': before,
+                'current': after,
+                'ratio': round(ratio, 3),
+                'comparable': comparable,
+                'regression': comparable and ratio > 1 + tolerance,
+            })
+    return rows
+
+
+def format_results(results: Dict) -> str:
+    """Plain-text summary table of a results dict"""
+    lines = [f"Commit {results.get('git_commit') or 'unknown'}, Python {results['environment']['python']}"]
+    for case in results['cases']:
+        dataset = case['dataset']
+        lines.append(f"\n{case['name']}: {dataset['rows']} rows x {dataset['columns']} columns, "
+                     f"{dataset['questions']} questions x {dataset['banner_columns']} banner columns")
+        for stage, timing in case['stages'].items():
+            if 'skipped' in timing:
+                lines.append(f"  {stage:<14} skipped ({timing['skipped']})")
+            else:
+                lines.append(f"  {stage:<14} {timing['seconds']:>9.4f}s  (median {timing['median']:.4f}s)")
+    return "\n".join(lines)
@@ -0,0 +1,159 @@
+"""
+Synthetic Survey Generator
+Realistic survey datasets and banner plans of any size for benchmarking
+
+Data is shaped like a Decipher/SPSS Codes.csv export: record/uuid columns,
+single-punch questions with skip-logic gaps, rNN 0/1 checkbox families with
+an open-end column, rating grids (Q3r1..Q3r7 style) and numeric questions.
+Banner plans mix simple codes, ranges, checkbox shorthand (S7=2 for S7r2)
+and compound AND/OR equations, like the example tab plans.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def generate_survey(respondents: int = 10_000, single: int = 20, multi: int = 5,
+                    multi_options: int = 8, grids: int = 4, grid_statements: int = 7,
+                    numeric: int = 5, scale_points: int = 5, seed: int = 0) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Generate a synthetic survey dataset and its question list
+
+    Args:
+        respondents: Number of rows
+        single: Single-punch questions S1..Sn (2-12 codes each)
+        multi: Checkbox families M1..Mn, each M{k}r1..r{multi_options}
+        multi_options: Options per checkbox family
+        grids: Rating grids G1..Gn, each G{k}r1..r{grid_statements}
+        grid_statements: Statements per grid
+        numeric: Numeric questions N1..Nn (ages, counts, spend)
+        scale_points: Points of the grid rating scale
+        seed: Random seed (same seed, same data)
+
+    Returns:
+        (df, questions) where questions are typed for generate_crosstab_report
+    """
+    rng = np.random.default_rng(seed)
+    columns: Dict[str, np.ndarray] = {
+        'record': np.arange(1, respondents + 1),
+        'uuid': np.array([f"{value:016x}" for value in rng.integers(0, 2 ** 63, respondents)]),
+        'weight': np.round(rng.lognormal(0, 0.35, respondents), 4),
+    }
+    questions = []
+
+    for k in range(1, single + 1):
+        n_codes = int(rng.integers(2, 13))
+        probabilities = rng.dirichlet(np.ones(n_codes))
+        values = (rng.choice(n_codes, respondents, p=probabilities) + 1).astype(float)
+        # Later questions sit behind skip logic
+        values[rng.random(respondents) < min(0.05 * (k // 4), 0.6)] = np.nan
+        columns[f'S{k}'] = values
+        questions.append({'id': f'S{k}', 'text': f'Single question {k}', 'type': 'categorical'})
+
+    for k in range(1, multi + 1):
+        asked = rng.random(respondents) > 0.1
+        rates = rng.uniform(0.05, 0.6, multi_options)
+        for option in range(1, multi_options + 1):
+            values = (rng.random(respondents) < rates[option - 1]).astype(float)
+            columns[f'M{k}r{option}'] = np.where(asked, values, np.nan)
+        other = asked & (rng.random(respondents) < 0.03)
+        columns[f'M{k}r97oe'] = np.where(other, 'other brand', None)
+        questions.append({'id': f'M{k}', 'text': f'Checkbox question {k}', 'type': 'multi'})
+
+    for k in range(1, grids + 1):
+        asked = rng.random(respondents) > 0.2
+        for statement in range(1, grid_statements + 1):
+            probabilities = rng.dirichlet(np.full(scale_points, 2.0))
+            values = (rng.choice(scale_points, respondents, p=probabilities) + 1).astype(float)
+            columns[f'G{k}r{statement}'] = np.where(asked, values, np.nan)
+        questions.append({'id': f'G{k}', 'text': f'Rating grid {k}', 'type': 'likert_grid'})
+
+    for k in range(1, numeric + 1):
+        kind = k % 3
+        if kind == 1:
+            values = rng.integers(18, 80, respondents).astype(float)
+        elif kind == 2:
+            values = rng.poisson(4, respondents).astype(float)
+        else:
+            values = np.round(rng.lognormal(3.5, 0.8, respondents), 2)
+        values[rng.random(respondents) < 0.05] = np.nan
+        columns[f'N{k}'] = values
+        questions.append({'id': f'N{k}', 'text': f'Numeric question {k}', 'type': 'numeric'})
+
+    return pd.DataFrame(columns), questions
+
+
+def generate_banner_plan(df: pd.DataFrame, columns: int = 40, group_size: int = 5,
+                         compound_share: float = 0.3, seed: int = 0) -> Dict:
+    """
+    Generate a banner plan over a synthetic survey
+
+    Args:
+        df: Dataset from generate_survey
+        columns: Number of H2 banner columns (Total not included)
+        group_size: H2 columns per H1 group
+        compound_share: Share of columns with compound AND/OR equations
+        seed: Random seed
+
+    Returns:
+        Banner plan with 'name' and H1 'groups' of H2 'columns'
+    """
+    rng = np.random.default_rng(seed)
+    singles = [col for col in df.columns if col.startswith('S') and col[1:].isdigit()]
+    checkbox_columns = [col for col in df.columns if col.startswith('M') and col.split('r')[-1].isdigit()]
+    checkboxes = sorted({col.split('r')[0] for col in checkbox_columns})
+    numerics = [col for col in df.columns if col.startswith('N') and col[1:].isdigit()]
+
+    def code(var: str) -> int:
+        return int(rng.integers(1, int(np.nanmax(df[var])) + 1))
+
+    def simple() -> str:
+        kind = rng.random()
+        if kind < 0.5 and singles:
+            var = singles[rng.integers(len(singles))]
+            return f"{var}={code(var)}"
+        if kind < 0.75 and checkboxes:
+            family = checkboxes[rng.integers(len(checkboxes))]
+            options = sum(1 for col in checkbox_columns if col.split('r')[0] == family)
+            return f"{family}={rng.integers(1, options + 1)}"
+        if numerics:
+            var = numerics[rng.integers(len(numerics))]
+            low, high = np.nanpercentile(df[var], [20, 60])
+            return f"{var}={int(low)}-{int(high)}"
+        var = singles[rng.integers(len(singles))]
+        return f"{var}={code(var)}"
+
+    plan = {'name': f'Synthetic banner ({columns} columns)', 'groups': []}
+    for idx in range(columns):
+        if idx % group_size == 0:
+            plan['groups'].append({'name': f'Group {idx // group_size + 1}', 'columns': []})
+        if rng.random() < compound_share:
+            equation = f"{simple()} & ({simple()} | {simple()})"
+        else:
+            equation = simple()
+        plan['groups'][-1]['columns'].append({
+            'id': f'col_{idx + 1}',
+            'name': f'Column {idx + 1}',
+            'equation': equation
+        })
+
+    return plan
+
+
+def replicate_rows(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """
+    Scale a real dataset up by stacking copies of it
+
+    record and uuid stay unique across copies.
+    """
+    copies = []
+    for idx in range(factor):
+        copy = df.copy()
+        if 'record' in copy.columns:
+            copy['record'] = pd.to_numeric(copy['record'], errors='coerce') + idx * len(df)
+        if 'uuid' in copy.columns:
+            copy['uuid'] = copy['uuid'].astype(str) + f'-{idx}'
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
@@ -10,6 +10,9 @@ from plotly.subplots import make_subplots
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 
+from crosstab_kernels import likert_grid_table
+from schema_catalog import SchemaCatalog, schema_catalog
+
 class SPSSChartEngine:
     """Professional chart generation engine for SPSS market research data"""
 
@@ -49,9 +52,12 @@ class SPSSChartEngine:
         'Q6r7': 'Reliable performance'
     }
 
-    def __init__(self, df: pd.DataFrame, codes_df: Optional[pd.DataFrame] = None):
+    def __init__(self, df: pd.DataFrame, codes_df: Optional[pd.DataFrame] = None,
+                 catalog: Optional[SchemaCatalog] = None):
         self.df = df
         self.codes_df = codes_df
+        # Built once when the dataset was loaded; looked up from df otherwise
+        self.catalog = catalog if catalog is not None else schema_catalog(df)
 
     def create_professional_likert_table(self, question_id: str, question_text: str = None,
                                        sort_by_t2b: bool = True, banner_var: str = None) -> go.Figure:
@@ -59,7 +65,7 @@ class SPSSChartEngine:
         Create professional multi-statement Likert chart exactly matching reference design
         """
         # Find sub-questions
-        sub_questions = [col for col in self.df.columns if col.startswith(f"{question_id}r")]
+        sub_questions = self.catalog.family_columns(question_id)
 
         if not sub_questions:
             return self._create_error_figure("No sub-questions found for this question")
@@ -68,39 +74,11 @@ class SPSSChartEngine:
         scale_order = ['Strongly agree', 'Agree', 'Neither agree nor disagree', 'Disagree', 'Strongly disagree']
         scale_colors = [self.LIKERT_COLORS[key] for key in ['strongly_agree', 'agree', 'neither', 'disagree', 'strongly_disagree']]
 
-        # Process each statement
-        statements_data = []
-        for sub_q in sorted(sub_questions):
-            statement_text = self.STATEMENT_MAPPING.get(sub_q, sub_q)
-
-            # Calculate percentages and metrics
-            responses = self.df[sub_q].value_counts()
-            total = len(self.df[sub_q].dropna())
-
-            if total == 0:
-                continue
-
-            # Calculate T2B and B2B
-            t2b = round(((responses.get('Strongly agree', 0) + responses.get('Agree', 0)) / total) * 100)
-            b2b = round(((responses.get('Strongly disagree', 0) + responses.get('Disagree', 0)) / total) * 100)
-
-            # Calculate percentages for each scale point
-            scale_percentages = []
-            for scale in scale_order:
-                pct = round((responses.get(scale, 0) / total) * 100)
-                scale_percentages.append(pct)
-
-            statements_data.append({
-                'statement': statement_text,
-                'percentages': scale_percentages,
-                't2b': t2b,
-                'b2b': b2b,
-                'total': total
-            })
-
-        # Sort by T2B if requested
-        if sort_by_t2b:
-            statements_data.sort(key=lambda x: x['t2b'], reverse=True)
+        # Process all statements in one pass over the grid
+        mask_matrix = np.ones((len(self.df), 1), dtype=bool)
+        statements_data = self._process_likert_grid(sub_questions, mask_matrix, [None], sort_by_t2b)[0]
+        for item in statements_data:
+            del item['category']
 
         return self._build_likert_table_figure(statements_data, question_text or question_id, scale_order, scale_colors)
 
@@ -260,7 +238,7 @@ class SPSSChartEngine:
             return self._create_error_figure("No valid banner categories found")
 
         # For multi-statement questions
-        sub_questions = [col for col in self.df.columns if col.startswith(f"{question_id}r")]
+        sub_questions = self.catalog.family_columns(question_id)
 
         if sub_questions:
             return self._create_crosstab_likert_table(sub_questions, banner_var, banner_categories, question_text)
@@ -282,18 +260,13 @@ class SPSSChartEngine:
         scale_order = ['Strongly agree', 'Agree', 'Neither agree nor disagree', 'Disagree', 'Strongly disagree']
         scale_colors = [self.LIKERT_COLORS[key] for key in ['strongly_agree', 'agree', 'neither', 'disagree', 'strongly_disagree']]
 
-        # Process data for total and each banner category
-        all_data = []
-
-        # Total data (first column)
-        total_data = self._process_likert_statements(sub_questions, None, None)
-        all_data.append(total_data)
-
-        # Data for each banner category
-        for category in banner_categories:
-            filtered_df = self.df[self.df[banner_var] == category]
-            category_data = self._process_likert_statements(sub_questions, filtered_df, category)
-            all_data.append(category_data)
+        # Total (first column) and every banner category in one pass
+        banner_values = self.df[banner_var]
+        mask_matrix = np.column_stack(
+            [np.ones(len(self.df), dtype=bool)] +
+            [(banner_values == category).to_numpy(dtype=bool, na_value=False) for category in banner_categories]
+        )
+        all_data = self._process_likert_grid(sub_questions, mask_matrix, [None] + list(banner_categories))
 
         # Add traces for each column
         for col_idx, (data, col_title) in enumerate(zip(all_data, ["Total"] + list(banner_categories))):
@@ -331,45 +304,59 @@ class SPSSChartEngine:
                                  category_name: str = None) -> List[Dict]:
         """Process Likert statements for a specific data subset"""
 
-        df_to_use = filtered_df if filtered_df is not None else self.df
-        scale_order = ['Strongly agree', 'Agree', 'Neither agree nor disagree', 'Disagree', 'Strongly disagree']
-
-        statements_data = []
-
-        for sub_q in sorted(sub_questions):
-            if sub_q not in df_to_use.columns:
-                continue
-
-            statement_text = self.STATEMENT_MAPPING.get(sub_q, sub_q)
-
-            responses = df_to_use[sub_q].value_counts()
-            total = len(df_to_use[sub_q].dropna())
-
-            if total == 0:
-                continue
-
-            # Calculate percentages for each scale point
-            scale_percentages = []
-            for scale in scale_order:
-                pct = round((responses.get(scale, 0) / total) * 100)
-                scale_percentages.append(pct)
-
-            # Calculate T2B and B2B
-            t2b = round(((responses.get('Strongly agree', 0) + responses.get('Agree', 0)) / total) * 100)
-            b2b = round(((responses.get('Strongly disagree', 0) + responses.get('Disagree', 0)) / total) * 100)
+        if filtered_df is None:
+            mask_matrix = np.ones((len(self.df), 1), dtype=bool)
+        else:
+            mask_matrix = self.df.index.isin(filtered_df.index)[:, None]
+        return self._process_likert_grid(sub_questions, mask_matrix, [category_name])[0]
 
-            statements_data.append({
-                'statement': statement_text,
-                'percentages': scale_percentages,
-                't2b': t2b,
-                'b2b': b2b,
-                'total': total,
-                'category': category_name
-            })
+    def _process_likert_grid(self, sub_questions: List[str], mask_matrix: np.ndarray,
+                             category_names: List, sort_by_t2b: bool = True) -> List[List[Dict]]:
+        """
+        Process all Likert statements for several data subsets at once
 
-        # Sort by T2B descending
-        statements_data.sort(key=lambda x: x['t2b'], reverse=True)
-        return statements_data
+        The statements are encoded as one respondents x statements code matrix
+        (scale points 0-4, code 5 for any other non-missing answer, which
+        counts toward the total but no scale point) and tabulated against
+        every subset's mask with crosstab_kernels.likert_grid_table.
+        """
+        scale_order = ['Strongly agree', 'Agree', 'Neither agree nor disagree', 'Disagree', 'Strongly disagree']
+        statements = [sub_q for sub_q in sorted(sub_questions) if sub_q in self.df.columns]
+
+        codes = np.full((len(self.df), len(statements)), -1, dtype=np.int64)
+        for idx, sub_q in enumerate(statements):
+            values = self.df[sub_q]
+            scale_codes = pd.Categorical(values, categories=scale_order).codes.astype(np.int64)
+            codes[:, idx] = np.where((scale_codes < 0) & values.notna().to_numpy(), len(scale_order), scale_codes)
+
+        grid = likert_grid_table(codes, len(scale_order) + 1, mask_matrix, top=[0, 1], bottom=[3, 4])
+        counts, totals = grid['counts'], grid['answered']
+
+        results = []
+        for col_idx, category_name in enumerate(category_names):
+            statements_data = []
+            for s_idx, sub_q in enumerate(statements):
+                total = int(totals[col_idx, s_idx])
+                if total == 0:
+                    continue
+
+                # Same (count / total) * 100 rounding as the per-statement value_counts version
+                row = counts[col_idx, s_idx].tolist()
+                statements_data.append({
+                    'statement': self.STATEMENT_MAPPING.get(sub_q, sub_q),
+                    'percentages': [round((row[p] / total) * 100) for p in range(len(scale_order))],
+                    't2b': round(((row[0] + row[1]) / total) * 100),
+                    'b2b': round(((row[4] + row[3]) / total) * 100),
+                    'total': total,
+                    'category': category_name
+                })
+
+            # Sort by T2B descending
+            if sort_by_t2b:
+                statements_data.sort(key=lambda x: x['t2b'], reverse=True)
+            results.append(statements_data)
+
+        return results
 
     def create_numeric_distribution(self, question_id: str, question_text: str = None,
                                   banner_var: str = None) -> go.Figure:
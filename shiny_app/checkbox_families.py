@@ -0,0 +1,205 @@
+"""
+Checkbox Family Store
+Sparse storage of 0/1 checkbox families (S7r1..S7r98, QC_FLAGSr1..)
+
+Checkbox families are mostly zeros, and large studies carry thousands of
+option columns. Each family is gathered once per dataset into a
+respondents x options sparse matrix of selections (CSC, so an option is a
+contiguous slice) plus one "answered" flag per respondent. Mentions are
+sparse x dense products against the banner mask matrix (cost grows with the
+number of selections, not rows x options), and "any of" banner equations on
+one family (S7=2 | S7=5 | S7=9) are a single pass over the selected options.
+
+Requires scipy; without it families are held as dense boolean arrays and the
+same results are computed with NumPy.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banner_equations import Condition
+from schema_catalog import OPTION_PATTERN, SchemaCatalog, schema_catalog
+
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
+
+def _numeric(column: pd.Series) -> np.ndarray:
+    """Column as float64 with NaN for missing and non-numeric cells"""
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return np.full(len(column), np.nan)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(object)
+    return pd.to_numeric(column, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+class CheckboxFamily:
+    """Selections (value == 1) and answered flags of one checkbox family"""
+
+    def __init__(self, codes: List, columns: List[str], selected, answered: np.ndarray):
+        self.codes = codes
+        self.columns = columns
+        self.selected = selected
+        self.answered = answered
+        self.n_rows = len(answered)
+        self.positions = {col: position for position, col in enumerate(columns)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, codes: List, columns: List[str]) -> 'CheckboxFamily':
+        """
+        Gather a family column by column, without a dense rows x options array
+
+        Args:
+            df: Dataset (or chunk) holding the option columns
+            codes: Option code of each column (e.g. 2 for S7r2)
+            columns: Option columns, in code order
+
+        Returns:
+            CheckboxFamily (sparse when scipy is installed)
+        """
+        n_rows = len(df)
+        answered = np.zeros(n_rows, dtype=bool)
+        rows = []
+        for col in columns:
+            values = _numeric(df[col])
+            answered |= ~np.isnan(values)
+            rows.append(np.flatnonzero(values == 1))
+
+        if sp is not None:
+            indptr = np.zeros(len(columns) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(r) for r in rows])
+            indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+            data = np.ones(len(indices), dtype=np.int8)
+            selected = sp.csc_matrix((data, indices, indptr), shape=(n_rows, len(columns)))
+        else:
+            selected = np.zeros((n_rows, len(columns)), dtype=bool)
+            for position, r in enumerate(rows):
+                selected[r, position] = True
+        return cls(list(codes), list(columns), selected, answered)
+
+    @property
+    def sparse(self) -> bool:
+        return sp is not None and sp.issparse(self.selected)
+
+    def _rows(self, position: int) -> np.ndarray:
+        """Respondents who selected one option (CSC column slice)"""
+        start, end = self.selected.indptr[position], self.selected.indptr[position + 1]
+        return self.selected.indices[start:end]
+
+    def any_of(self, positions: List[int]) -> np.ndarray:
+        """Boolean mask of respondents who selected at least one of the options"""
+        if not self.sparse:
+            return self.selected[:, positions].any(axis=1)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for position in positions:
+            mask[self._rows(position)] = True
+        return mask
+
+    def any_selected(self) -> np.ndarray:
+        """Boolean mask of respondents who selected any option of the family"""
+        if not self.sparse:
+            return self.selected.any(axis=1)
+        return np.bincount(self.selected.indices, minlength=self.n_rows) > 0
+
+    def table(self, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None,
+              net_matrix: Optional[np.ndarray] = None
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tabulate the family across all banner columns
+
+        Mentions come from one sparse x dense product of the selections with
+        the (weighted) mask matrix; "any mention", "answered" and per-net
+        "any option of the net" indicators are a few dense columns
+        multiplied alongside.
+
+        Args:
+            mask_matrix: (n_rows x n_columns) boolean banner membership
+            weights: Optional weight per respondent
+            net_matrix: Optional (n_options x n_nets) option membership of
+                each net (see table_nets.net_membership)
+
+        Returns:
+            (mentions, any_mention, answered, net_mentions): mentions is
+            (n_columns x n_options); any_mention and answered are per-column
+            counts of respondents who selected at least one option / answered
+            the question at all; net_mentions is (n_columns x n_nets)
+            respondents selecting any option of each net. Counts are int64,
+            or float64 weighted sums when weights are given.
+        """
+        columns = mask_matrix.astype(np.float64)
+        if weights is not None:
+            columns *= weights[:, None]
+
+        if net_matrix is None:
+            net_matrix = np.zeros((len(self.columns), 0), dtype=bool)
+        net_selected = (self.selected @ net_matrix.astype(np.float64)) > 0
+        indicators = np.column_stack([self.any_selected(), self.answered, net_selected]).astype(np.float64)
+
+        if self.sparse:
+            mentions = np.asarray(self.selected.T @ columns).T
+        else:
+            mentions = columns.T @ self.selected.astype(np.float64)
+        counts = np.hstack([mentions, columns.T @ indicators])
+        if weights is None:
+            # float64 products are exact for counts below 2**53
+            counts = np.rint(counts).astype(np.int64)
+
+        n_options = len(self.columns)
+        return counts[:, :n_options], counts[:, n_options], counts[:, n_options + 1], counts[:, n_options + 2:]
+
+    @property
+    def nbytes(self) -> int:
+        if self.sparse:
+            held = self.selected.data.nbytes + self.selected.indices.nbytes + self.selected.indptr.nbytes
+        else:
+            held = self.selected.nbytes
+        return held + self.answered.nbytes
+
+
+class CheckboxFamilyStore:
+    """Checkbox families of one dataset, gathered on first use"""
+
+    def __init__(self, df: pd.DataFrame, catalog: Optional[SchemaCatalog] = None):
+        self.df = df
+        self.catalog = catalog if catalog is not None else schema_catalog(df)
+        self._families: Dict[Tuple[str, ...], CheckboxFamily] = {}
+
+    def family(self, codes: List, columns: List[str]) -> CheckboxFamily:
+        """Family over explicit option columns (memoized by column list)"""
+        key = tuple(columns)
+        cached = self._families.get(key)
+        if cached is None:
+            cached = CheckboxFamily.from_frame(self.df, codes, columns)
+            self._families[key] = cached
+        return cached
+
+    def question(self, question: str) -> CheckboxFamily:
+        """The rNN family of a question (S7 -> S7r1..S7r98)"""
+        family = self.catalog.family(question)
+        return self.family([code for code, _ in family], [col for _, col in family])
+
+    def checkbox_option(self, cond) -> Optional[Tuple[str, str]]:
+        """
+        (question, option column) when a condition selects one checkbox (S7r2=1)
+
+        Conditions are expected with checkbox shorthand already resolved
+        (see EquationEvaluator.resolve_checkbox).
+        """
+        if not (isinstance(cond, Condition) and cond.kind == 'scalar' and cond.operator == '='
+                and cond.operands == ('1',)):
+            return None
+        option = OPTION_PATTERN.match(cond.variable)
+        if option is None or cond.variable not in self.catalog.family_columns(option.group('base')):
+            return None
+        return option.group('base'), cond.variable
+
+    @property
+    def nbytes(self) -> int:
+        return sum(family.nbytes for family in self._families.values())
+
+    def __len__(self) -> int:
+        return len(self._families)
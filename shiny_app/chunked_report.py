@@ -0,0 +1,628 @@
+"""
+Out-of-Core Cross-Tab Report
+Builds a cross-tab report from a data file read in row chunks
+
+Pooled multi-country trackers can be larger than the server's memory. The
+file (CSV, Parquet or .sav) is read in row chunks holding only the columns
+the report needs; banner masks are evaluated per chunk and every table keeps
+mergeable partial aggregates (counts, weighted sums, moments and quantile
+sketches) that are added chunk by chunk. Finished partials go through the
+same cell formatting as the in-memory report, so the result is identical
+except that numeric medians are log-bucket sketch approximations (about 1%
+relative error, see quantile_sketch).
+
+Parquet requires pyarrow and .sav requires pyreadstat.
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banner_equations import equation_columns
+from banner_masks import BannerMaskStore
+from checkbox_families import CheckboxFamily
+from crosstab_engine import (
+    GRID_SUMMARIES, CodeDictionary, _categorical_results, _grid_summary_results, _likert_grid_results,
+    _likert_results, _multi_results, _numeric_results, build_banner_columns, get_response_family,
+    grid_summary_values, question_data_columns, round_weighted_sum, table_code_fields
+)
+from crosstab_kernels import (
+    answered_percentages, answered_weight_squares, canonical_code, categorical_table, effective_base,
+    likert_grid_counts,
+    merge_numeric_moments, numeric_moments, numeric_summary
+)
+from data_ingest import compact_dtypes
+from quantile_sketch import ColumnSketches
+from report_profile import ReportProfiler
+from schema_catalog import SchemaCatalog
+from significance import DEFAULT_CONFIDENCE, add_report_significance
+from table_nets import net_membership, rating_scale
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+try:
+    import pyreadstat
+except ImportError:
+    pyreadstat = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+# ========== Reading ==========
+
+def _file_format(path) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.csv', '.txt'):
+        return 'csv'
+    if suffix in ('.parquet', '.pq'):
+        if pq is None:
+            raise ImportError("pyarrow is required to read Parquet files (pip install pyarrow)")
+        return 'parquet'
+    if suffix == '.sav':
+        if pyreadstat is None:
+            raise ImportError("pyreadstat is required to read .sav files (pip install pyreadstat)")
+        return 'sav'
+    raise ValueError(f"Unsupported data file '{path}' (expected .csv, .parquet or .sav)")
+
+
+def read_columns(path) -> List[str]:
+    """Column names of a CSV, Parquet or .sav file, without reading its rows"""
+    file_format = _file_format(path)
+    if file_format == 'csv':
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    if file_format == 'parquet':
+        return pq.ParquetFile(str(path)).schema_arrow.names
+    _, meta = pyreadstat.read_sav(str(path), metadataonly=True)
+    return list(meta.column_names)
+
+
+def iter_chunks(path, columns: List[str], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Read selected columns of a data file in row chunks
+
+    Each chunk gets the same compact dtypes as data_ingest.load_survey_csv.
+
+    Args:
+        path: CSV, Parquet or .sav file
+        columns: Columns to read
+        chunk_rows: Rows per chunk
+
+    Yields:
+        DataFrames of at most chunk_rows rows
+    """
+    file_format = _file_format(path)
+
+    if file_format == 'csv':
+        chunks = pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+    elif file_format == 'parquet':
+        batches = pq.ParquetFile(str(path)).iter_batches(batch_size=chunk_rows, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = (chunk for chunk, _ in pyreadstat.read_file_in_chunks(
+            pyreadstat.read_sav, str(path), chunksize=chunk_rows, usecols=columns
+        ))
+
+    for chunk in chunks:
+        yield compact_dtypes(chunk.reset_index(drop=True))
+
+
+# ========== Partial aggregates ==========
+
+def _normalize_keys(keys: List) -> List:
+    """
+    Make category keys from different chunks agree with a whole-file read
+
+    Chunks downcast on their own, so one chunk may see integer codes where
+    another sees fractions or text; the whole column would be float (or
+    text) throughout. Whole numbers come out as canonical ints.
+    """
+    def is_number(key) -> bool:
+        return isinstance(key, (int, float, np.integer, np.floating)) and not isinstance(key, bool)
+
+    if any(isinstance(key, str) for key in keys):
+        convert = str
+    elif any(is_number(key) and not float(key).is_integer() for key in keys):
+        convert = float
+    else:
+        convert = int
+    return [canonical_code(convert(key)) if is_number(key) else key for key in keys]
+
+
+class BannerBasesPartial:
+    """Column bases (and weighted sums) of the banner, added up over chunks"""
+
+    def __init__(self, n_columns: int):
+        self.bases = np.zeros(n_columns, dtype=np.int64)
+        self.sum_w = np.zeros(n_columns)
+        self.sum_w2 = np.zeros(n_columns)
+        self.total_weight = 0.0
+
+    def add(self, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        self.bases += np.count_nonzero(mask_matrix, axis=0)
+        if weights is not None:
+            sums = mask_matrix.T.astype(np.float64) @ np.column_stack([weights, weights * weights])
+            self.sum_w += sums[:, 0]
+            self.sum_w2 += sums[:, 1]
+            self.total_weight += float(weights.sum())
+
+    def merge(self, other: 'BannerBasesPartial') -> 'BannerBasesPartial':
+        self.bases += other.bases
+        self.sum_w += other.sum_w
+        self.sum_w2 += other.sum_w2
+        self.total_weight += other.total_weight
+        return self
+
+    def weighted(self) -> tuple:
+        """(weighted_base, effective_base), as BannerMaskStore.weighted_bases"""
+        return self.sum_w, effective_base(self.sum_w, self.sum_w2)
+
+
+class CategoricalPartial:
+    """Code x column counts of a categorical question"""
+
+    def __init__(self, q: Dict, columns: SchemaCatalog, n_columns: int):
+        self.question = q['id']
+        self.present = q['id'] in columns
+        self.nets = q.get('nets')
+        self.keys: Dict = {}
+        self.counts = np.zeros((n_columns, 0))
+        # Squared weights of answering respondents (effective base of the z-tests)
+        self.answered_w2 = np.zeros(n_columns)
+
+    def _add_counts(self, keys: List, counts: np.ndarray) -> None:
+        for key in keys:
+            self.keys.setdefault(key, len(self.keys))
+        if len(self.keys) > self.counts.shape[1]:
+            self.counts = np.pad(self.counts, ((0, 0), (0, len(self.keys) - self.counts.shape[1])))
+        self.counts[:, [self.keys[key] for key in keys]] += counts
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        if self.present:
+            self.add_values(chunk[self.question], mask_matrix, weights)
+
+    def add_values(self, values: pd.Series, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        uniques, counts, _ = categorical_table(values, mask_matrix, weights)
+        self._add_counts(uniques, counts)
+        if weights is not None:
+            self.answered_w2 += answered_weight_squares(values, mask_matrix, weights)
+
+    def merge(self, other: 'CategoricalPartial') -> 'CategoricalPartial':
+        self._add_counts(list(other.keys), other.counts)
+        self.answered_w2 += other.answered_w2
+        return self
+
+    def table(self, weighted: bool) -> Tuple[List, np.ndarray]:
+        """(uniques, counts) with chunk keys normalized and sorted like categorical_table's"""
+        merged: Dict = {}
+        for key, idx in zip(_normalize_keys(list(self.keys)), self.keys.values()):
+            merged[key] = merged[key] + self.counts[:, idx] if key in merged else self.counts[:, idx]
+        try:
+            uniques = sorted(merged)
+        except TypeError:
+            # Mixed types (e.g. numbers and text) keep first-seen order
+            uniques = list(merged)
+
+        counts = np.column_stack([merged[key] for key in uniques]) if uniques else self.counts[:, :0]
+        if not weighted:
+            counts = np.rint(counts).astype(np.int64)
+        return uniques, counts
+
+    def net_counts(self, weighted: bool, scale: Optional[np.ndarray] = None) -> np.ndarray:
+        """(n_columns x n_nets) respondents per net of a single-answer question"""
+        uniques, counts = self.table(weighted)
+        return counts @ net_membership(self.nets, uniques, scale).astype(counts.dtype)
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        return self.finalize_coded(banner_columns, bases, weighted)[0]
+
+    def finalize_coded(self, banner_columns: List[Dict], bases: BannerBasesPartial,
+                       weighted: bool) -> Tuple[Dict, CodeDictionary]:
+        """Cells and code dictionary (the merged, sorted chunk uniques)"""
+        if not self.present:
+            return _categorical_results(banner_columns, bases.bases, [], None, None,
+                                        bases.weighted() if weighted else None, self.nets)
+
+        uniques, counts = self.table(weighted)
+        return _categorical_results(banner_columns, bases.bases, uniques, counts, answered_percentages(counts),
+                                    bases.weighted() if weighted else None, self.nets,
+                                    self.answered_w2 if weighted else None)
+
+
+class NumericPartial:
+    """Moments and median sketches of a numeric question"""
+
+    def __init__(self, q: Dict, columns: SchemaCatalog, n_columns: int):
+        self.question = q['id']
+        self.present = q['id'] in columns
+        zeros = np.zeros(n_columns)
+        self.moments = {'base': np.zeros(n_columns, dtype=np.int64), 'sum_w': zeros, 'sum_w2': zeros,
+                        'sum_wx': zeros, 'm2': zeros}
+        self.sketches = ColumnSketches(n_columns)
+        # Value counts, only kept when net rows are needed
+        self.nets = q.get('nets')
+        self.values = CategoricalPartial(q, columns, n_columns) if self.nets else None
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        if not self.present:
+            return
+        values = pd.to_numeric(chunk[self.question], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        self.moments = merge_numeric_moments(self.moments, numeric_moments(values, mask_matrix, weights))
+        self.sketches.add(values, mask_matrix, weights)
+        if self.values is not None:
+            self.values.add_values(pd.Series(values), mask_matrix, weights)
+
+    def merge(self, other: 'NumericPartial') -> 'NumericPartial':
+        self.moments = merge_numeric_moments(self.moments, other.moments)
+        self.sketches.merge(other.sketches)
+        if self.values is not None:
+            self.values.merge(other.values)
+        return self
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        stats = {**numeric_summary(self.moments), 'median': self.sketches.quantile(0.5)}
+        net_counts = self.values.net_counts(weighted) if self.values is not None else None
+        return _numeric_results(banner_columns, stats, weighted, self.nets, net_counts)
+
+
+class LikertPartial:
+    """Top/bottom box counts of a single Likert question"""
+
+    def __init__(self, q: Dict, columns: SchemaCatalog, n_columns: int):
+        self.question = q['id']
+        self.present = q['id'] in columns
+        self.top_codes = q.get('top_codes', [1, 2])
+        self.bottom_codes = q.get('bottom_codes', [4, 5])
+        self.box_counts = np.zeros((n_columns, 2))
+        self.nets = q.get('nets')
+        self.values = CategoricalPartial(q, columns, n_columns) if self.nets else None
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        if not self.present:
+            return
+        numeric = pd.to_numeric(chunk[self.question], errors='coerce')
+        boxes = np.column_stack([numeric.isin(self.top_codes).to_numpy(dtype=bool),
+                                 numeric.isin(self.bottom_codes).to_numpy(dtype=bool)]).astype(np.float64)
+        if weights is not None:
+            boxes *= weights[:, None]
+        self.box_counts += mask_matrix.T.astype(np.float64) @ boxes
+        if self.values is not None:
+            self.values.add_values(numeric, mask_matrix, weights)
+
+    def merge(self, other: 'LikertPartial') -> 'LikertPartial':
+        self.box_counts += other.box_counts
+        if self.values is not None:
+            self.values.merge(other.values)
+        return self
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        box_counts = self.box_counts
+        if self.values is not None:
+            # Box nets count from the scale of the whole file, not of one chunk
+            uniques, _ = self.values.table(weighted)
+            scale = rating_scale(uniques, self.top_codes, self.bottom_codes)
+            box_counts = np.column_stack([box_counts, self.values.net_counts(weighted, scale)])
+        return _likert_results(banner_columns, bases.bases, box_counts if self.present else None,
+                               bases.weighted() if weighted else None, self.nets)
+
+
+class LikertGridPartial:
+    """Statement x scale point counts of a Likert grid; the scale grows as chunks add codes"""
+
+    def __init__(self, q: Dict, columns: SchemaCatalog, n_columns: int):
+        self.statements = question_data_columns({**q, 'type': 'likert_grid'}, columns)
+        self.top_codes = q.get('top_codes', [1, 2])
+        self.bottom_codes = q.get('bottom_codes', [4, 5])
+        self.nets = q.get('nets')
+        self.scale = np.zeros(0)
+        self.counts = np.zeros((n_columns, len(self.statements), 0))
+        self.answered = np.zeros((n_columns, len(self.statements)), dtype=np.int64)
+        self.column_bases = np.zeros(n_columns, dtype=np.int64)
+
+    def _add_counts(self, scale: np.ndarray, counts: np.ndarray) -> None:
+        merged = np.union1d(self.scale, scale)
+        combined = np.zeros(self.counts.shape[:2] + (len(merged),), dtype=np.result_type(self.counts, counts))
+        combined[:, :, np.searchsorted(merged, self.scale)] += self.counts
+        combined[:, :, np.searchsorted(merged, scale)] += counts
+        self.scale, self.counts = merged, combined
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        values = chunk[self.statements].apply(pd.to_numeric, errors='coerce').to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+        present = ~np.isnan(values)
+        scale = np.unique(values[present])
+        codes = np.where(present, np.searchsorted(scale, np.where(present, values, 0)), -1)
+
+        self._add_counts(scale, likert_grid_counts(codes, len(scale), mask_matrix, weights))
+        self.answered += mask_matrix.T.astype(np.int64) @ present.astype(np.int64)
+        self.column_bases += np.count_nonzero(mask_matrix & present.any(axis=1)[:, None], axis=0)
+
+    def merge(self, other: 'LikertGridPartial') -> 'LikertGridPartial':
+        self._add_counts(other.scale, other.counts)
+        self.answered += other.answered
+        self.column_bases += other.column_bases
+        return self
+
+    def _final_counts(self, weighted: bool) -> np.ndarray:
+        # Box codes always get a row, even when nobody chose them
+        box_codes = np.asarray(list(self.top_codes) + list(self.bottom_codes), dtype=np.float64)
+        self._add_counts(box_codes, np.zeros(self.counts.shape[:2] + (len(box_codes),), dtype=self.counts.dtype))
+        return self.counts if weighted else np.rint(self.counts).astype(np.int64)
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        counts = self._final_counts(weighted)
+        return _likert_grid_results(banner_columns, self.statements, self.scale, counts,
+                                    self.top_codes, self.bottom_codes, self.answered, self.column_bases,
+                                    bases.weighted() if weighted else None, self.nets)
+
+    def finalize_summary(self, summary: str, banner_columns: List[Dict], bases: BannerBasesPartial,
+                         weighted: bool) -> Dict:
+        """One of the grid's summary tables (see crosstab_engine.calculate_grid_summary_stats)"""
+        counts = self._final_counts(weighted)
+        values = grid_summary_values(self.scale, counts, self.top_codes, self.bottom_codes)
+        return _grid_summary_results(banner_columns, self.statements, summary, values[summary],
+                                     self.answered, self.column_bases, bases.weighted() if weighted else None)
+
+
+class GridSummaryPartial:
+    """A grid summary table, finalized from its grid's LikertGridPartial (possibly shared with other tables)"""
+
+    def __init__(self, q: Dict, grid: LikertGridPartial):
+        if q['summary'] not in GRID_SUMMARIES:
+            raise ValueError(f"Unknown grid summary '{q['summary']}' (expected one of {', '.join(GRID_SUMMARIES)})")
+        self.summary = q['summary']
+        self.grid = grid
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        self.grid.add(chunk, mask_matrix, weights)
+
+    def merge(self, other: 'GridSummaryPartial') -> 'GridSummaryPartial':
+        self.grid.merge(other.grid)
+        return self
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        return self.grid.finalize_summary(self.summary, banner_columns, bases, weighted)
+
+
+class MultiPartial:
+    """Mention, any-mention and answered counts of a multi-response family"""
+
+    def __init__(self, q: Dict, columns: SchemaCatalog, n_columns: int):
+        if q.get('option_columns') is not None:
+            self.family = [(col, col) for col in q['option_columns'] if col in columns]
+        else:
+            self.family = get_response_family(columns, q['id'])
+        self.nets = q.get('nets')
+        self.net_matrix = net_membership(self.nets, [code for code, _ in self.family]) if self.nets else None
+        self.net_mentions = np.zeros((n_columns, len(self.nets or [])))
+        self.mentions = np.zeros((n_columns, len(self.family)))
+        self.any_mention = np.zeros(n_columns)
+        self.answered = np.zeros(n_columns)
+        self.answered_count = np.zeros(n_columns, dtype=np.int64)
+        self.answered_w2 = np.zeros(n_columns)
+
+    def add(self, chunk: pd.DataFrame, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        family = CheckboxFamily.from_frame(chunk, [code for code, _ in self.family], [col for _, col in self.family])
+        mentions, any_mention, answered, net_mentions = family.table(mask_matrix, weights, self.net_matrix)
+        self.net_mentions += net_mentions
+        self.mentions += mentions
+        self.any_mention += any_mention
+        self.answered += answered
+
+        if weights is not None:
+            answering = mask_matrix & family.answered[:, None]
+            self.answered_count += np.count_nonzero(answering, axis=0)
+            self.answered_w2 += answering.T.astype(np.float64) @ (weights * weights)
+
+    def merge(self, other: 'MultiPartial') -> 'MultiPartial':
+        for name in ('mentions', 'any_mention', 'answered', 'answered_count', 'answered_w2', 'net_mentions'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def finalize(self, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+        return self.finalize_coded(banner_columns, bases, weighted)[0]
+
+    def finalize_coded(self, banner_columns: List[Dict], bases: BannerBasesPartial,
+                       weighted: bool) -> Tuple[Dict, CodeDictionary]:
+        """Cells and code dictionary (the family's option codes)"""
+        codes = [code for code, _ in self.family]
+        if not weighted:
+            return _multi_results(banner_columns, codes, np.rint(self.mentions).astype(np.int64),
+                                  np.rint(self.any_mention).astype(np.int64), np.rint(self.answered).astype(np.int64),
+                                  nets=self.nets, net_mentions=np.rint(self.net_mentions).astype(np.int64))
+        return _multi_results(banner_columns, codes, self.mentions, self.any_mention, self.answered,
+                              self.answered_count, effective_base(self.answered, self.answered_w2),
+                              self.nets, self.net_mentions)
+
+
+PARTIAL_TYPES = {
+    'categorical': CategoricalPartial,
+    'numeric': NumericPartial,
+    'likert': LikertPartial,
+    'likert_grid': LikertGridPartial,
+    'multi': MultiPartial,
+}
+
+
+def _grid_key(q: Dict) -> Tuple:
+    option_columns = q.get('option_columns')
+    return (q['id'], None if option_columns is None else tuple(option_columns),
+            tuple(q.get('top_codes', [1, 2])), tuple(q.get('bottom_codes', [4, 5])))
+
+
+def question_partial(q: Dict, columns: SchemaCatalog, n_columns: int, grids: Optional[Dict] = None):
+    """
+    Empty partial aggregate for a question (unknown types tabulate as categorical)
+
+    Args:
+        q: Question definition with type info
+        columns: Catalog of the file's columns
+        n_columns: Number of banner columns
+        grids: Report-scoped LikertGridPartials by grid; a grid's summary
+            tables (and the grid table, when its nets allow) share one
+
+    Returns:
+        Partial with add/merge/finalize. A GridSummaryPartial adds to its
+        .grid partial, so when grids are shared add chunks to
+        aggregate_partials(partials) rather than to every partial.
+    """
+    question_type = q.get('type', 'categorical')
+    grids = grids if grids is not None else {}
+
+    if question_type == 'grid_summary':
+        grid_q = {**q, 'id': q['grid'], 'type': 'likert_grid', 'nets': None}
+        grid = grids.get(_grid_key(grid_q))
+        if grid is None:
+            grid = grids[_grid_key(grid_q)] = LikertGridPartial(grid_q, columns, n_columns)
+        return GridSummaryPartial(q, grid)
+
+    if question_type == 'likert_grid':
+        grid = grids.get(_grid_key(q))
+        if grid is not None and grid.nets == q.get('nets'):
+            return grid
+        grid = LikertGridPartial(q, columns, n_columns)
+        grids.setdefault(_grid_key(q), grid)
+        return grid
+
+    return PARTIAL_TYPES.get(question_type, CategoricalPartial)(q, columns, n_columns)
+
+
+def aggregate_partials(partials: List) -> List[Tuple[int, object]]:
+    """
+    (index of first question, partial) for every distinct aggregate
+
+    Tables of the same grid share one LikertGridPartial; chunks are added to
+    each aggregate once.
+    """
+    aggregates = {}
+    for idx, partial in enumerate(partials):
+        aggregate = getattr(partial, 'grid', partial)
+        aggregates.setdefault(id(aggregate), (idx, aggregate))
+    return list(aggregates.values())
+
+
+def partial_table(q: Dict, partial, banner_columns: List[Dict], bases: BannerBasesPartial, weighted: bool) -> Dict:
+    """Finished table of a question from its partial aggregate"""
+    if hasattr(partial, 'finalize_coded'):
+        data, dictionary = partial.finalize_coded(banner_columns, bases, weighted)
+    else:
+        data, dictionary = partial.finalize(banner_columns, bases, weighted), None
+    return {
+        'question_id': q['id'],
+        'question_text': q.get('text', q['id']),
+        'question_type': q.get('type', 'categorical'),
+        'data': data,
+        **table_code_fields(q, dictionary)
+    }
+
+
+# ========== Report ==========
+
+def generate_chunked_report(path, questions: List[Dict], banner_plan: Dict,
+                            chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                            weight_column: Optional[str] = None,
+                            sig_confidence: Optional[float] = DEFAULT_CONFIDENCE,
+                            cprofile: bool = False) -> Dict:
+    """
+    Generate a cross-tab report from a data file too large to load at once
+
+    Args:
+        path: CSV, Parquet or .sav file
+        questions: List of question definitions with type info
+        banner_plan: Banner plan with H1/H2 structure
+        chunk_rows: Rows read (and held in memory) at a time
+        weight_column: Respondent weight column (None = unweighted)
+        sig_confidence: Confidence level of the column significance tests;
+            None skips stat testing
+        cprofile: Also capture the run with cProfile
+
+    Returns:
+        Report shaped like generate_crosstab_report's; medians are sketched
+        and metadata['chunks'] records how many chunks were read. The
+        profile's 'read' stage is time spent reading and decoding chunks.
+    """
+    profiler = ReportProfiler(cprofile)
+    columns = SchemaCatalog(read_columns(path))
+    banner_columns = build_banner_columns(banner_plan)
+
+    if weight_column and weight_column not in columns:
+        raise ValueError(f"Weight column '{weight_column}' not found in data")
+
+    needed = [col for q in questions for col in question_data_columns(q, columns)]
+    needed += [col for banner_col in banner_columns for col in equation_columns(banner_col['equation'], columns)]
+    needed += [weight_column] if weight_column else []
+    # Keep at least one column so chunks still carry their row count
+    needed = list(dict.fromkeys(needed)) or columns.columns[:1]
+
+    n_columns = len(banner_columns)
+    bases = BannerBasesPartial(n_columns)
+    grids = {}
+    partials = [question_partial(q, columns, n_columns, grids) for q in questions]
+    aggregates = aggregate_partials(partials)
+    rows = chunks = evaluations = predicates = 0
+    seconds = [0.0] * len(questions)
+
+    reader = iter_chunks(path, needed, chunk_rows)
+    while True:
+        with profiler.stage('read'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+
+        with profiler.stage('masks'):
+            masks = BannerMaskStore(chunk)
+            mask_matrix = masks.matrix(banner_columns)
+            weights = masks.weights(weight_column) if weight_column else None
+            bases.add(mask_matrix, weights)
+        evaluations += masks.evaluations
+        predicates += masks.predicates
+        profiler.scan('masks', masks.predicates * len(chunk))
+
+        with profiler.stage('stats'):
+            for idx, partial in aggregates:
+                start = time.perf_counter()
+                partial.add(chunk, mask_matrix, weights)
+                seconds[idx] += time.perf_counter() - start
+        rows += len(chunk)
+        chunks += 1
+
+    print(f"INFO: Aggregated {rows} rows in {chunks} chunks of up to {chunk_rows} rows "
+          f"({len(needed)} of {len(columns)} columns read)")
+
+    tables = []
+    with profiler.stage('finalize'):
+        for idx, (q, partial) in enumerate(zip(questions, partials)):
+            start = time.perf_counter()
+            tables.append(partial_table(q, partial, banner_columns, bases, weight_column is not None))
+            seconds[idx] += time.perf_counter() - start
+            profiler.record_table(q['id'], tables[-1]['question_type'], seconds[idx], rows)
+    profiler.counters['masks'] = {'evaluations': evaluations, 'predicates': predicates}
+
+    metadata = {
+        'banner_name': banner_plan.get('name', 'Unnamed Banner'),
+        'total_base': rows,
+        'num_questions': len(questions),
+        'num_columns': n_columns,
+        'chunks': chunks
+    }
+    if weight_column:
+        metadata['weight_column'] = weight_column
+        metadata['weighted_total_base'] = round_weighted_sum(bases.total_weight)
+
+    report = {
+        'metadata': metadata,
+        'tables': tables
+    }
+    if sig_confidence:
+        with profiler.stage('significance'):
+            add_report_significance(report, banner_columns, sig_confidence)
+
+    metadata['profile'] = profiler.finish()
+
+    return report
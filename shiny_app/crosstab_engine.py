@@ -5,13 +5,48 @@ Executes banner equations against SPSS data to generate cross-tab tables
 Created: 2025-09-30
 """
 
+import os
+import time
 import pandas as pd
 import numpy as np
 import re
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Any, Iterator, Optional, Tuple, Union
+
+from banner_equations import equation_mask
+from banner_masks import BannerMaskStore
+from crosstab_kernels import (
+    answered_weight_squares, canonical_code, categorical_table, effective_base, indicator_counts, likert_grid_counts, likert_grid_summary, numeric_table,
+    weighted_bases
+)
+from report_profile import ReportProfiler
+from schema_catalog import SchemaCatalog, schema_catalog
+from significance import DEFAULT_CONFIDENCE, add_report_significance
+from table_nets import net_indicators, net_labels, net_membership, rating_scale
+
+# Summary tables of a Likert grid, as named in the tab sheet ("Q3_T2B Summary")
+GRID_SUMMARIES = ('TB', 'T2B', 'B2B', 'BB', 'Mean')
+
+
+@dataclass
+class CodeDictionary:
+    """
+    Code dictionary of a categorical or multi-response table
+
+    codes are the question's codes in dictionary order (the sorted uniques of
+    crosstab_kernels.encode_codes, or a checkbox family's option codes);
+    reported is an (n_columns x n_codes) bool matrix of the codes each banner
+    column reports, taken from the count arrays.
+    """
+    codes: List
+    reported: np.ndarray
 
+    def table_codes(self) -> List:
+        """Codes reported by any banner column, in dictionary order"""
+        return [self.codes[idx] for idx in np.flatnonzero(self.reported.any(axis=0))]
 
-def translate_spss_equation(equation: str, available_columns: List[str]) -> str:
+
+def translate_spss_equation(equation: str, available_columns: Union[SchemaCatalog, List[str]]) -> str:
     """
     Translate simplified equations to SPSS checkbox format
 
@@ -19,7 +54,7 @@ def translate_spss_equation(equation: str, available_columns: List[str]) -> str:
 
     Args:
         equation: Original equation
-        available_columns: List of actual column names in data
+        available_columns: Actual column names in data, or their SchemaCatalog
 
     Returns:
         Translated equation
@@ -30,12 +65,13 @@ def translate_spss_equation(equation: str, available_columns: List[str]) -> str:
         return equation
 
     var_name, operator, value = match.groups()
+    catalog = schema_catalog(available_columns)
 
     # If column doesn't exist, try "r" format
-    if var_name not in available_columns:
+    if var_name not in catalog:
         # Check if S7r2 exists (checkbox format)
-        checkbox_col = f"{var_name}r{value}"
-        if checkbox_col in available_columns:
+        checkbox_col = catalog.checkbox_column(var_name, value)
+        if checkbox_col is not None:
             # Translate: S7=2 becomes S7r2=1
             if operator == '=':
                 return f"{checkbox_col}=1"
@@ -45,17 +81,30 @@ def translate_spss_equation(equation: str, available_columns: List[str]) -> str:
     return equation
 
 
+def get_response_family(columns: Union[SchemaCatalog, List[str]], question: str) -> List[tuple]:
+    """
+    Find the checkbox columns of a multi-response question
+
+    Example: S7 → [(1, 'S7r1'), (2, 'S7r2'), ..., (98, 'S7r98')]
+    Open-end columns such as S7r97oe are not part of the family.
+
+    Args:
+        columns: Column names in the data, or their SchemaCatalog
+        question: Base question ID
+
+    Returns:
+        List of (option code, column name) sorted by code
+    """
+    return schema_catalog(columns).family(question)
+
+
 def evaluate_equation(equation: str, row: pd.Series) -> bool:
     """
-    Evaluate banner equation against a data row
+    Evaluate banner equation against a single data row
 
-    Supports:
-    - Basic comparisons: =, !=, >, <, >=, <=
-    - Ranges: Q1=1-9
-    - Multiple values: S7=1,2,3
-    - Compound logic: S7=2 & Q1>5, S1=1 | S1=2, S7=2 AND Q1>5
-    - BETWEEN syntax: Q1 BETWEEN 1 AND 9
-    - Auto-translates to SPSS checkbox format (S7=2 → S7r2=1)
+    Kept for callers that work one respondent at a time; the equation is
+    compiled once (see banner_equations) and evaluated on a one-row frame.
+    Use filter_data_by_equation / equation_mask for whole datasets.
 
     Args:
         equation: Banner equation (e.g., "S7=2", "Q1>5 & S1=1", "Q1 BETWEEN 1 AND 9")
@@ -64,115 +113,15 @@ def evaluate_equation(equation: str, row: pd.Series) -> bool:
     Returns:
         bool: True if row matches equation
     """
-    if not equation or equation == 'TOTAL':
-        return True
-
-    # Get available columns
-    available_columns = row.index.tolist()
-
-    # Normalize equation format: convert "AND" to "&", "OR" to "|"
-    # Handle BETWEEN syntax first (before splitting on AND)
-    between_pattern = r'([A-Za-z0-9_]+)\s+BETWEEN\s+(\d+)\s+AND\s+(\d+)'
-    between_match = re.search(between_pattern, equation, re.IGNORECASE)
-    if between_match:
-        var_name, min_val, max_val = between_match.groups()
-        # Convert to range syntax: Q1 BETWEEN 1 AND 9 → Q1>=1 & Q1<=9
-        replacement = f'{var_name}>={min_val} & {var_name}<={max_val}'
-        equation = re.sub(between_pattern, replacement, equation, flags=re.IGNORECASE)
-
-    # Now convert word operators to symbols
-    equation = re.sub(r'\s+AND\s+', ' & ', equation, flags=re.IGNORECASE)
-    equation = re.sub(r'\s+OR\s+', ' | ', equation, flags=re.IGNORECASE)
-
-    # Handle compound logic with OR (|) first (lower precedence)
-    if '|' in equation:
-        parts = equation.split('|')
-        # Translate each sub-equation before evaluating
-        translated_parts = [translate_spss_equation(part.strip(), available_columns) for part in parts]
-        return any(evaluate_equation(part, row) for part in translated_parts)
-
-    # Handle compound logic with AND (&) (higher precedence)
-    if '&' in equation:
-        parts = equation.split('&')
-        # Translate each sub-equation before evaluating
-        translated_parts = [translate_spss_equation(part.strip(), available_columns) for part in parts]
-        return all(evaluate_equation(part, row) for part in translated_parts)
-
-    # Translate single equation to SPSS format if needed
-    equation = translate_spss_equation(equation, available_columns)
-
-    # Parse single equation: VARIABLE OPERATOR VALUE
-    patterns = [
-        (r'^([A-Za-z0-9_]+)\s*>=\s*(.+)$', '>='),
-        (r'^([A-Za-z0-9_]+)\s*<=\s*(.+)$', '<='),
-        (r'^([A-Za-z0-9_]+)\s*!=\s*(.+)$', '!='),
-        (r'^([A-Za-z0-9_]+)\s*>\s*(.+)$', '>'),
-        (r'^([A-Za-z0-9_]+)\s*<\s*(.+)$', '<'),
-        (r'^([A-Za-z0-9_]+)\s*=\s*(.+)$', '='),
-    ]
-
-    for pattern, operator in patterns:
-        match = re.match(pattern, equation)
-        if match:
-            variable, value_str = match.groups()
-
-            # Get cell value
-            if variable not in row.index:
-                return False
-
-            cell_value = row[variable]
-
-            # Handle missing/null values
-            if pd.isna(cell_value):
-                return False
-
-            # Handle ranges (e.g., "1-9")
-            if '-' in value_str and not value_str.startswith('-'):
-                try:
-                    min_val, max_val = map(float, value_str.split('-'))
-                    return min_val <= float(cell_value) <= max_val
-                except:
-                    pass
-
-            # Handle multiple values (e.g., "1,2,3")
-            if ',' in value_str:
-                values = [v.strip() for v in value_str.split(',')]
-                if operator == '=':
-                    return str(cell_value) in values or float(cell_value) in [float(v) for v in values if v.replace('.','').replace('-','').isdigit()]
-                elif operator == '!=':
-                    return str(cell_value) not in values
-
-            # Numeric comparison
-            try:
-                num_cell = float(cell_value)
-                num_value = float(value_str)
-
-                if operator == '=':
-                    return num_cell == num_value
-                elif operator == '!=':
-                    return num_cell != num_value
-                elif operator == '>':
-                    return num_cell > num_value
-                elif operator == '<':
-                    return num_cell < num_value
-                elif operator == '>=':
-                    return num_cell >= num_value
-                elif operator == '<=':
-                    return num_cell <= num_value
-            except:
-                # Fall back to string comparison
-                if operator == '=':
-                    return str(cell_value) == str(value_str)
-                elif operator == '!=':
-                    return str(cell_value) != str(value_str)
-
-    return False
+    return bool(equation_mask(row.to_frame().T, equation)[0])
 
 
 def filter_data_by_equation(df: pd.DataFrame, equation: str) -> pd.DataFrame:
     """
     Filter dataframe based on banner equation
 
+    The equation is parsed once and evaluated as a whole-column mask.
+
     Args:
         df: Full dataset
         equation: Banner equation
@@ -183,75 +132,217 @@ def filter_data_by_equation(df: pd.DataFrame, equation: str) -> pd.DataFrame:
     if not equation or equation == 'TOTAL':
         return df
 
-    mask = df.apply(lambda row: evaluate_equation(equation, row), axis=1)
-    return df[mask]
+    return df[equation_mask(df, equation)]
+
+
+def round_weighted_sum(value: float) -> float:
+    """
+    Round a sum of weights to 1dp for display, whatever order it was added in
+
+    The in-memory, chunked, parallel and tracker paths add the same weights in
+    different orders, so their sums differ in the last bits. Weights with a
+    few decimals often sum to a rounding tie (e.g. 609.65), which would then
+    round up on one path and down on another; snapping to 1e-6 first makes
+    the published figure the same everywhere.
+    """
+    return round(round(float(value), 6), 1)
+
+
+def _weighted_base_fields(weighted_base: float, effective_base: float) -> Dict:
+    """Extra per-column fields of a weighted table"""
+    return {
+        'weighted_base': round_weighted_sum(weighted_base),
+        'effective_base': round(float(effective_base), 1)
+    }
+
+
+def _add_net_cells(results: Dict, banner_columns: List[Dict], nets: List[Dict],
+                   net_counts: Optional[np.ndarray], totals: Optional[np.ndarray], weighted: bool) -> Dict:
+    """
+    Add net_frequencies / net_percentages to per-column cells
+
+    Args:
+        net_counts: (n_columns x n_nets) respondents in each net (weighted sums
+            when weighted), or None when the question is not in the data
+        totals: Per-column base the net percentages are taken of (the same
+            base as the table's own percentages)
+    """
+    labels = net_labels(nets)
+    for idx, col in enumerate(banner_columns):
+        freq = {}
+        pct = {}
+        total = float(totals[idx]) if totals is not None else 0.0
+
+        if net_counts is not None and total > 0:
+            for net_idx, label in enumerate(labels):
+                count = net_counts[idx, net_idx]
+                freq[label] = round_weighted_sum(count) if weighted else int(round(count))
+                pct[label] = float(np.round(count / total * 100, 1))
+
+        results[col['id']]['net_frequencies'] = freq
+        results[col['id']]['net_percentages'] = pct
+
+    return results
 
 
-def calculate_categorical_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict]) -> Dict:
+def calculate_categorical_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                                masks: Optional[BannerMaskStore] = None,
+                                weight_column: Optional[str] = None,
+                                nets: Optional[List[Dict]] = None) -> Dict:
     """
     Calculate frequency distribution for categorical question
 
+    The question is encoded to integer codes once and the full
+    codes x banner-columns count matrix is built in a single pass
+    (see crosstab_kernels.categorical_table). Net rows are the product of
+    that matrix with the code x net membership matrix (see table_nets).
+
     Args:
         df: Full dataset
         question: Question variable name
         banner_columns: List of banner column definitions with equations
+        masks: Report-scoped mask store (created on the fly if omitted)
+        weight_column: Respondent weight column; frequencies and percentages
+            are then weighted and weighted/effective bases are added
+        nets: Net definitions (table_nets.parse_nets); adds net_frequencies
+            and net_percentages
 
     Returns:
         Dictionary with stats for each banner column
     """
-    results = {}
+    return _categorical_stats(df, question, banner_columns, masks, weight_column, nets)[0]
+
+
+def _categorical_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                       masks: Optional[BannerMaskStore] = None, weight_column: Optional[str] = None,
+                       nets: Optional[List[Dict]] = None) -> Tuple[Dict, CodeDictionary]:
+    """Cells and code dictionary of a categorical question (see calculate_categorical_stats)"""
+    masks = masks if masks is not None else BannerMaskStore(df)
+    mask_matrix = masks.matrix(banner_columns)
+    bases = masks.bases(banner_columns)
+    weights = masks.weights(weight_column) if weight_column else None
+
+    answered_w2 = None
+    if question in df.columns:
+        uniques, counts, percentages = categorical_table(df[question], mask_matrix, weights)
+        if weights is not None:
+            answered_w2 = answered_weight_squares(df[question], mask_matrix, weights)
+    else:
+        uniques, counts, percentages = [], None, None
 
-    for col in banner_columns:
-        filtered = filter_data_by_equation(df, col['equation'])
-        base = len(filtered)
+    weighted = masks.weighted_bases(banner_columns, weight_column) if weights is not None else None
+    return _categorical_results(banner_columns, bases, uniques, counts, percentages, weighted, nets, answered_w2)
 
-        if base == 0:
-            results[col['id']] = {
-                'name': col['name'],
-                'equation': col['equation'],
-                'base': 0,
-                'frequencies': {},
-                'percentages': {}
-            }
-            continue
 
-        # Calculate frequency distribution
-        if question in filtered.columns:
-            freq = filtered[question].value_counts().to_dict()
-            pct = (filtered[question].value_counts(normalize=True) * 100).round(1).to_dict()
-        else:
-            freq = {}
-            pct = {}
+def _categorical_results(banner_columns: List[Dict], bases: np.ndarray, uniques: List,
+                         counts: Optional[np.ndarray], percentages: Optional[np.ndarray],
+                         weighted: Optional[tuple] = None, nets: Optional[List[Dict]] = None,
+                         answered_w2: Optional[np.ndarray] = None) -> Tuple[Dict, CodeDictionary]:
+    """
+    Per-column categorical cells and code dictionary
+
+    weighted is (weighted_base, effective_base) or None. Weighted cells also
+    carry 'weighted_counts': unrounded code counts, their total and the
+    effective base of the answering respondents (from answered_w2, their sum
+    of squared weights), the inputs of the column z-tests.
+    """
+    results = {}
+    if weighted is not None:
+        answered_w = counts.sum(axis=1) if counts is not None else np.zeros(len(banner_columns))
+        answered_effective = (effective_base(answered_w, answered_w2) if answered_w2 is not None
+                              else np.zeros(len(banner_columns)))
+
+    for idx, col in enumerate(banner_columns):
+        freq = {}
+        pct = {}
+        exact = {}
+
+        if counts is not None and bases[idx] > 0:
+            # Only codes actually present in the column are reported
+            for code_idx in np.flatnonzero(counts[idx]):
+                if weighted is None:
+                    freq[uniques[code_idx]] = int(counts[idx, code_idx])
+                else:
+                    freq[uniques[code_idx]] = round_weighted_sum(counts[idx, code_idx])
+                    exact[uniques[code_idx]] = float(counts[idx, code_idx])
+                pct[uniques[code_idx]] = float(percentages[idx, code_idx])
 
         results[col['id']] = {
             'name': col['name'],
             'equation': col['equation'],
-            'base': base,
+            'base': int(bases[idx]),
             'frequencies': freq,
             'percentages': pct
         }
+        if weighted is not None:
+            results[col['id']].update(_weighted_base_fields(weighted[0][idx], weighted[1][idx]))
+            results[col['id']]['weighted_counts'] = {
+                'codes': exact,
+                'total': float(answered_w[idx]),
+                'effective_base': float(answered_effective[idx]),
+            }
 
-    return results
+    if nets:
+        # Single-response codes are exclusive, so a net is the sum of its codes' counts
+        net_counts = counts @ net_membership(nets, uniques).astype(counts.dtype) if counts is not None else None
+        _add_net_cells(results, banner_columns, nets, net_counts,
+                       counts.sum(axis=1) if counts is not None else None, weighted is not None)
+
+    if counts is None:
+        reported = np.zeros((len(banner_columns), len(uniques)), dtype=bool)
+    else:
+        reported = (counts != 0) & (np.asarray(bases) > 0)[:, None]
+    return results, CodeDictionary(list(uniques), reported)
 
 
-def calculate_numeric_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict]) -> Dict:
+def calculate_numeric_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                            masks: Optional[BannerMaskStore] = None,
+                            weight_column: Optional[str] = None,
+                            median_mode: str = 'exact',
+                            nets: Optional[List[Dict]] = None) -> Dict:
     """
     Calculate mean, median, std dev for numeric question
 
+    The question is converted to float once and every banner column is
+    summarized together (see crosstab_kernels.numeric_table).
+
     Args:
         df: Full dataset
         question: Question variable name
         banner_columns: List of banner column definitions
+        masks: Report-scoped mask store (created on the fly if omitted)
+        weight_column: Respondent weight column; mean, median and std are
+            then weighted and weighted/effective bases are added
+        median_mode: 'exact' (one shared sort) or 'sketch' (approximate
+            log-bucket medians, for very large datasets)
+        nets: Net definitions, usually value ranges ("Gen Z (18-27)"); net
+            percentages are of the respondents with a value
 
     Returns:
         Dictionary with stats for each banner column
     """
+    masks = masks if masks is not None else BannerMaskStore(df)
+    weights = masks.weights(weight_column) if weight_column else None
+
+    if question in df.columns:
+        values = pd.to_numeric(df[question], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        values = np.full(masks.n_rows, np.nan)
+    mask_matrix = masks.matrix(banner_columns)
+    stats = numeric_table(values, mask_matrix, weights, median_mode)
+    net_counts = indicator_counts(net_indicators(values, nets), mask_matrix, weights) if nets else None
+    return _numeric_results(banner_columns, stats, weights is not None, nets, net_counts)
+
+
+def _numeric_results(banner_columns: List[Dict], stats: Dict[str, np.ndarray], weighted: bool,
+                     nets: Optional[List[Dict]] = None, net_counts: Optional[np.ndarray] = None) -> Dict:
+    """Per-column numeric cells from crosstab_kernels.numeric_table arrays"""
     results = {}
 
-    for col in banner_columns:
-        filtered = filter_data_by_equation(df, col['equation'])
+    for idx, col in enumerate(banner_columns):
+        base = int(stats['base'][idx])
 
-        if len(filtered) == 0 or question not in filtered.columns:
+        if base == 0:
             results[col['id']] = {
                 'name': col['name'],
                 'equation': col['equation'],
@@ -260,56 +351,110 @@ def calculate_numeric_stats(df: pd.DataFrame, question: str, banner_columns: Lis
                 'median': None,
                 'std': None
             }
-            continue
-
-        values = pd.to_numeric(filtered[question], errors='coerce').dropna()
-        base = len(values)
-
-        if base == 0:
+        else:
             results[col['id']] = {
                 'name': col['name'],
                 'equation': col['equation'],
-                'base': 0,
-                'mean': None,
-                'median': None,
-                'std': None
+                'base': base,
+                # NumPy scalar rounding (half to even on the scaled value), as before
+                'mean': float(round(stats['mean'][idx], 2)),
+                'median': float(round(stats['median'][idx], 2)),
+                'std': float(round(stats['std'][idx], 2)),
+                # Unrounded inputs of the column-mean t-test (see significance)
+                'moments': {'mean': float(stats['mean'][idx]), 'std': float(stats['std'][idx])}
             }
-            continue
 
-        results[col['id']] = {
-            'name': col['name'],
-            'equation': col['equation'],
-            'base': base,
-            'mean': round(values.mean(), 2),
-            'median': round(values.median(), 2),
-            'std': round(values.std(), 2)
-        }
+        if weighted:
+            results[col['id']].update(_weighted_base_fields(stats['weighted_base'][idx], stats['effective_base'][idx]))
+
+    if nets:
+        _add_net_cells(results, banner_columns, nets, net_counts,
+                       stats['weighted_base'] if weighted else stats['base'], weighted)
 
     return results
 
 
 def calculate_likert_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
-                          top_codes: List = [1, 2], bottom_codes: List = [4, 5]) -> Dict:
+                          top_codes: List = [1, 2], bottom_codes: List = [4, 5],
+                          masks: Optional[BannerMaskStore] = None,
+                          weight_column: Optional[str] = None,
+                          nets: Optional[List[Dict]] = None) -> Dict:
     """
     Calculate Top-2-Box and Bottom-2-Box for Likert scales
 
+    Box and net indicators are stacked into one respondents x indicators
+    matrix and counted for every banner column with a single multiply.
+
     Args:
         df: Full dataset
         question: Question variable name
         banner_columns: List of banner column definitions
         top_codes: Codes for top box (e.g., [1, 2] for Strongly Agree + Agree)
         bottom_codes: Codes for bottom box
+        masks: Report-scoped mask store (created on the fly if omitted)
+        weight_column: Respondent weight column; box percentages are then
+            weighted and weighted/effective bases are added
+        nets: Net definitions; box nets (T2B, B3B, ...) count from the
+            scale spanned by the answers and the top/bottom codes
 
     Returns:
         Dictionary with T2B/B2B for each banner column
     """
+    masks = masks if masks is not None else BannerMaskStore(df)
+    box_counts = None
+
+    if question in df.columns:
+        numeric = pd.to_numeric(df[question], errors='coerce')
+        boxes = np.column_stack([numeric.isin(top_codes).to_numpy(dtype=bool),
+                                 numeric.isin(bottom_codes).to_numpy(dtype=bool)]).astype(np.float64)
+        if nets:
+            values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            scale = rating_scale(values[~np.isnan(values)], top_codes, bottom_codes)
+            boxes = np.column_stack([boxes, net_indicators(values, nets, scale)]).astype(np.float64)
+
+        # Top/bottom (and net) counts, or weighted sums, for every column in one multiply
+        if weight_column:
+            boxes *= masks.weights(weight_column)[:, None]
+        box_counts = masks.matrix(banner_columns).T.astype(np.float64) @ boxes
+
+    weighted = masks.weighted_bases(banner_columns, weight_column) if weight_column else None
+    return _likert_results(banner_columns, masks.bases(banner_columns), box_counts, weighted, nets)
+
+
+def _box_counts(top, bottom, total) -> Dict:
+    """Unrounded top/bottom box counts and their base, the inputs of the box z-tests"""
+    return {'top': float(top), 'bottom': float(bottom), 'total': float(total)}
+
+
+def _likert_results(banner_columns: List[Dict], bases: np.ndarray, box_counts: Optional[np.ndarray],
+                    weighted: Optional[tuple] = None, nets: Optional[List[Dict]] = None) -> Dict:
+    """
+    Per-column T2B/B2B cells
+
+    box_counts is (n_columns x 2) top/bottom counts, followed by one column
+    per net, or weighted sums when weighted = (weighted_base, effective_base)
+    is given; None when the question is not in the data.
+    """
     results = {}
 
-    for col in banner_columns:
-        filtered = filter_data_by_equation(df, col['equation'])
-        base = len(filtered)
+    for idx, col in enumerate(banner_columns):
+        base = int(bases[idx])
 
-        if base == 0 or question not in filtered.columns:
+        if weighted is not None and base > 0 and box_counts is not None:
+            weighted_base, effective_base = weighted
+            total = weighted_base[idx]
+            results[col['id']] = {
+                'name': col['name'],
+                'equation': col['equation'],
+                'base': base,
+                'top_box': round(float(box_counts[idx, 0] / total) * 100, 1) if total > 0 else None,
+                'bottom_box': round(float(box_counts[idx, 1] / total) * 100, 1) if total > 0 else None,
+                'box_counts': _box_counts(box_counts[idx, 0], box_counts[idx, 1], total),
+                **_weighted_base_fields(weighted_base[idx], effective_base[idx])
+            }
+            continue
+
+        if base == 0 or box_counts is None:
             results[col['id']] = {
                 'name': col['name'],
                 'equation': col['equation'],
@@ -319,35 +464,448 @@ def calculate_likert_stats(df: pd.DataFrame, question: str, banner_columns: List
             }
             continue
 
-        values = pd.to_numeric(filtered[question], errors='coerce').dropna()
-
-        top_count = values.isin(top_codes).sum()
-        bottom_count = values.isin(bottom_codes).sum()
+        top_count = int(round(box_counts[idx, 0]))
+        bottom_count = int(round(box_counts[idx, 1]))
 
         results[col['id']] = {
             'name': col['name'],
             'equation': col['equation'],
             'base': base,
             'top_box': round((top_count / base) * 100, 1) if base > 0 else 0,
-            'bottom_box': round((bottom_count / base) * 100, 1) if base > 0 else 0
+            'bottom_box': round((bottom_count / base) * 100, 1) if base > 0 else 0,
+            'box_counts': _box_counts(top_count, bottom_count, base)
         }
 
+    if nets:
+        _add_net_cells(results, banner_columns, nets, box_counts[:, 2:] if box_counts is not None else None,
+                       weighted[0] if weighted is not None else bases, weighted is not None)
+
     return results
 
 
-def generate_crosstab_report(df: pd.DataFrame, questions: List[Dict], banner_plan: Dict) -> Dict:
+def likert_grid_tensor(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                       top_codes: List = [1, 2], bottom_codes: List = [4, 5],
+                       masks: Optional[BannerMaskStore] = None,
+                       statement_columns: Optional[List[str]] = None,
+                       weight_column: Optional[str] = None,
+                       grids: Optional[Dict] = None) -> Dict:
     """
-    Generate complete cross-tabulation report
+    Statements x scale points x banner columns counts of a Likert grid
+
+    The grid table and its TB/T2B/B2B/BB/Mean summary tables all read this
+    one tensor; with a report-scoped grids dict it is tabulated once per grid.
+
+    Args:
+        df: Full dataset
+        question: Base question ID (e.g. 'Q3' for Q3r1..Q3r7)
+        banner_columns: List of banner column definitions
+        top_codes: Codes for top box
+        bottom_codes: Codes for bottom box
+        masks: Report-scoped mask store (created on the fly if omitted)
+        statement_columns: Explicit statement columns (defaults to the rNN family)
+        weight_column: Respondent weight column
+        grids: Report-scoped cache of tensors (None = no caching)
+
+    Returns:
+        Dict with statements, scale (sorted codes, float), counts (n_columns x
+        n_statements x n_points), answered (unweighted, n_columns x
+        n_statements), column_bases and weighted ((weighted_base,
+        effective_base) or None)
+    """
+    masks = masks if masks is not None else BannerMaskStore(df)
+    key = (question, None if statement_columns is None else tuple(statement_columns),
+           tuple(top_codes), tuple(bottom_codes), weight_column,
+           tuple(BannerMaskStore._key(col['equation']) for col in banner_columns))
+    if grids is not None and key in grids:
+        return grids[key]
+
+    if statement_columns is not None:
+        statements = [col for col in statement_columns if col in df.columns]
+    else:
+        statements = [col for _, col in get_response_family(masks.catalog, question)]
+
+    values = df[statements].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    # Box codes always get a row, even when nobody chose them
+    scale = np.union1d(values[present], np.asarray(list(top_codes) + list(bottom_codes), dtype=np.float64))
+    codes = np.where(present, np.searchsorted(scale, np.where(present, values, 0)), -1)
+
+    mask_matrix = masks.matrix(banner_columns)
+    weights = masks.weights(weight_column) if weight_column else None
+    counts = likert_grid_counts(codes, len(scale), mask_matrix, weights)
+
+    # Unweighted bases: per statement, and anyone answering any statement
+    tensor = {
+        'statements': statements,
+        'scale': scale,
+        'counts': counts,
+        'answered': counts.sum(axis=2) if weights is None else mask_matrix.T.astype(np.int64) @ present.astype(np.int64),
+        'column_bases': np.count_nonzero(mask_matrix & present.any(axis=1)[:, None], axis=0),
+        'weighted': masks.weighted_bases(banner_columns, weight_column) if weights is not None else None,
+    }
+    if grids is not None:
+        grids[key] = tensor
+    return tensor
+
+
+def calculate_likert_grid_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                                top_codes: List = [1, 2], bottom_codes: List = [4, 5],
+                                masks: Optional[BannerMaskStore] = None,
+                                statement_columns: Optional[List[str]] = None,
+                                weight_column: Optional[str] = None,
+                                nets: Optional[List[Dict]] = None,
+                                grids: Optional[Dict] = None) -> Dict:
+    """
+    Calculate the full distribution, T2B/B2B and mean of every grid statement
+
+    All statements (e.g. Q3r1..Q3r7) are encoded as one respondents x
+    statements code matrix and tabulated against every banner column in a
+    single pass (see crosstab_kernels.likert_grid_table). Unlike the single
+    column Likert table, percentages are of the respondents who answered each
+    statement.
+
+    Args:
+        df: Full dataset
+        question: Base question ID (e.g. 'Q3' for Q3r1..Q3r7)
+        banner_columns: List of banner column definitions
+        top_codes: Codes for top box (e.g., [1, 2] for Strongly Agree + Agree)
+        bottom_codes: Codes for bottom box
+        masks: Report-scoped mask store (created on the fly if omitted)
+        statement_columns: Explicit statement columns (defaults to the rNN family)
+        weight_column: Respondent weight column; distributions, boxes and means
+            are then weighted and weighted/effective bases are added
+        nets: Net definitions; each statement gains net_percentages
+        grids: Report-scoped tensor cache shared with the grid's summary tables
+
+    Returns:
+        Dictionary per banner column with 'scale' (codes in order) and
+        'statements' ({column: base, distribution, top_box, bottom_box, mean})
+    """
+    tensor = likert_grid_tensor(df, question, banner_columns, top_codes, bottom_codes, masks,
+                                statement_columns, weight_column, grids)
+    return _likert_grid_results(banner_columns, tensor['statements'], tensor['scale'], tensor['counts'],
+                                top_codes, bottom_codes, tensor['answered'], tensor['column_bases'],
+                                tensor['weighted'], nets)
+
+
+def _likert_grid_results(banner_columns: List[Dict], statements: List[str], scale: np.ndarray,
+                         counts: np.ndarray, top_codes: List, bottom_codes: List,
+                         answered: np.ndarray, column_bases: np.ndarray,
+                         weighted: Optional[tuple] = None, nets: Optional[List[Dict]] = None) -> Dict:
+    """
+    Per-column Likert grid cells
+
+    Args:
+        scale: Sorted scale codes (float), one per point of counts
+        counts: (n_columns x n_statements x n_points) counts or weighted sums
+        answered: (n_columns x n_statements) unweighted answer counts
+        column_bases: Unweighted respondents answering any statement, per column
+        weighted: (weighted_base, effective_base) or None
+        nets: Net definitions, resolved against the scale
+    """
+    grid = likert_grid_summary(
+        counts,
+        top=np.flatnonzero(np.isin(scale, top_codes)),
+        bottom=np.flatnonzero(np.isin(scale, bottom_codes)),
+        scores=scale
+    )
+    if nets:
+        # Statement x net percentages straight from the statement x point counts
+        membership = net_membership(nets, scale, rating_scale(scale, top_codes, bottom_codes))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            net_percentages = np.round((counts @ membership.astype(counts.dtype))
+                                       / counts.sum(axis=2, keepdims=True) * 100, 1)
+        labels = net_labels(nets)
+
+    scale_codes = [int(v) if float(v).is_integer() else float(v) for v in scale]
+    results = {}
+
+    for idx, col in enumerate(banner_columns):
+        statement_stats = {}
+        for s_idx, statement in enumerate(statements):
+            base = int(answered[idx, s_idx])
+            if base == 0:
+                statement_stats[statement] = {
+                    'base': 0, 'distribution': {}, 'top_box': None, 'bottom_box': None, 'mean': None
+                }
+                if nets:
+                    statement_stats[statement]['net_percentages'] = {}
+                continue
+            statement_stats[statement] = {
+                'base': base,
+                'distribution': {
+                    code: float(np.round(grid['percentages'][idx, s_idx, p_idx], 1))
+                    for p_idx, code in enumerate(scale_codes)
+                },
+                'top_box': float(np.round(grid['top_box'][idx, s_idx], 1)),
+                'bottom_box': float(np.round(grid['bottom_box'][idx, s_idx], 1)),
+                'mean': float(np.round(grid['mean'][idx, s_idx], 2))
+            }
+            if nets:
+                statement_stats[statement]['net_percentages'] = {
+                    label: float(net_percentages[idx, s_idx, net_idx]) for net_idx, label in enumerate(labels)
+                }
+
+        results[col['id']] = {
+            'name': col['name'],
+            'equation': col['equation'],
+            'base': int(column_bases[idx]),
+            'scale': scale_codes,
+            'statements': statement_stats
+        }
+        if weighted is not None:
+            results[col['id']].update(_weighted_base_fields(weighted[0][idx], weighted[1][idx]))
+
+    return results
+
+
+def calculate_grid_summary_stats(df: pd.DataFrame, question: str, summary: str, banner_columns: List[Dict],
+                                 top_codes: List = [1, 2], bottom_codes: List = [4, 5],
+                                 masks: Optional[BannerMaskStore] = None,
+                                 statement_columns: Optional[List[str]] = None,
+                                 weight_column: Optional[str] = None,
+                                 grids: Optional[Dict] = None) -> Dict:
+    """
+    Calculate one summary of a Likert grid: a single value per statement
+
+    The tab sheet asks for TB, T2B, B2B, BB and Mean summary tables of every
+    grid with 3+ statements ("Q3_T2B Summary"). All five are derived at once
+    from the grid's count tensor, which the grid table itself also reads, so
+    with a report-scoped grids dict the statements are tabulated only once.
+
+    Args:
+        df: Full dataset
+        question: Grid question ID (e.g. 'Q3')
+        summary: One of GRID_SUMMARIES
+        banner_columns: List of banner column definitions
+        top_codes: Codes of the T2B summary
+        bottom_codes: Codes of the B2B summary
+        masks: Report-scoped mask store (created on the fly if omitted)
+        statement_columns: Explicit statement columns (defaults to the rNN family)
+        weight_column: Respondent weight column
+        grids: Report-scoped tensor cache (see likert_grid_tensor)
+
+    Returns:
+        Dictionary per banner column with 'summary' and 'statements'
+        ({column: {'base', 'value'}}; value None where nobody answered)
+    """
+    if summary not in GRID_SUMMARIES:
+        raise ValueError(f"Unknown grid summary '{summary}' (expected one of {', '.join(GRID_SUMMARIES)})")
+
+    tensor = likert_grid_tensor(df, question, banner_columns, top_codes, bottom_codes, masks,
+                                statement_columns, weight_column, grids)
+    if 'summaries' not in tensor:
+        tensor['summaries'] = grid_summary_values(tensor['scale'], tensor['counts'], top_codes, bottom_codes)
+    return _grid_summary_results(banner_columns, tensor['statements'], summary, tensor['summaries'][summary],
+                                 tensor['answered'], tensor['column_bases'], tensor['weighted'])
+
+
+def grid_summary_values(scale: np.ndarray, counts: np.ndarray, top_codes: List,
+                        bottom_codes: List) -> Dict[str, np.ndarray]:
+    """
+    Every grid summary from one count tensor
+
+    TB and BB are the first and last points of the rating scale (97-99 are
+    not scale points); T2B and B2B use the grid's top and bottom codes, so
+    they match the grid table's Top Box and Bottom Box rows.
+
+    Args:
+        scale: Sorted scale codes (float), one per point of counts
+        counts: (n_columns x n_statements x n_points) counts or weighted sums
+
+    Returns:
+        {summary: (n_columns x n_statements) percentages or means}, NaN where
+        nobody answered
+    """
+    grid = likert_grid_summary(
+        counts,
+        top=np.flatnonzero(np.isin(scale, top_codes)),
+        bottom=np.flatnonzero(np.isin(scale, bottom_codes)),
+        scores=scale
+    )
+    extremes = net_membership([{'label': 'TB', 'box': 'top', 'points': 1},
+                               {'label': 'BB', 'box': 'bottom', 'points': 1}],
+                              scale, rating_scale(scale, top_codes, bottom_codes))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        boxes = (counts @ extremes.astype(counts.dtype)) / grid['answered'][:, :, None] * 100
+
+    return {
+        'TB': boxes[:, :, 0],
+        'T2B': grid['top_box'],
+        'B2B': grid['bottom_box'],
+        'BB': boxes[:, :, 1],
+        'Mean': grid['mean'],
+    }
+
+
+def _grid_summary_results(banner_columns: List[Dict], statements: List[str], summary: str,
+                          values: np.ndarray, answered: np.ndarray, column_bases: np.ndarray,
+                          weighted: Optional[tuple] = None) -> Dict:
+    """
+    Per-column grid summary cells
+
+    Args:
+        values: (n_columns x n_statements) values of the summary
+        answered: (n_columns x n_statements) unweighted answer counts
+        column_bases: Unweighted respondents answering any statement, per column
+        weighted: (weighted_base, effective_base) or None
+    """
+    decimals = 2 if summary == 'Mean' else 1
+    results = {}
+
+    for idx, col in enumerate(banner_columns):
+        statement_stats = {}
+        for s_idx, statement in enumerate(statements):
+            base = int(answered[idx, s_idx])
+            statement_stats[statement] = {
+                'base': base,
+                'value': float(np.round(values[idx, s_idx], decimals)) if base else None
+            }
+
+        results[col['id']] = {
+            'name': col['name'],
+            'equation': col['equation'],
+            'base': int(column_bases[idx]),
+            'summary': summary,
+            'statements': statement_stats
+        }
+        if weighted is not None:
+            results[col['id']].update(_weighted_base_fields(weighted[0][idx], weighted[1][idx]))
+
+    return results
+
+
+def calculate_multi_response_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                                   masks: Optional[BannerMaskStore] = None,
+                                   option_columns: Optional[List[str]] = None,
+                                   weight_column: Optional[str] = None,
+                                   nets: Optional[List[Dict]] = None) -> Dict:
+    """
+    Calculate mentions for a multi-response (checkbox grid) question
+
+    All rNN columns of the question are gathered once per dataset into a
+    sparse respondents x options selection matrix (see checkbox_families) and
+    tabulated against every banner column with a single sparse x dense
+    multiply. Nets ride along in
+    the same multiply as "selected any option of the net" indicators, so a
+    respondent counts once per net and nets may overlap.
+
+    Base is the number of respondents in the banner column who answered the
+    question (at least one non-missing option); percentages use that base.
+
+    Args:
+        df: Full dataset
+        question: Base question ID (e.g. 'S7' for S7r1..S7r98)
+        banner_columns: List of banner column definitions
+        masks: Report-scoped mask store (created on the fly if omitted)
+        option_columns: Explicit option columns (defaults to the rNN family)
+        weight_column: Respondent weight column; mentions and percentages are
+            then weighted and weighted/effective bases (of answering
+            respondents) are added
+        nets: Net definitions over the option codes (e.g. "Acuvue = 1,2,3")
+
+    Returns:
+        Dictionary with mentions per option and any-mention net for each banner column
+    """
+    return _multi_response_stats(df, question, banner_columns, masks, option_columns, weight_column, nets)[0]
+
+
+def _multi_response_stats(df: pd.DataFrame, question: str, banner_columns: List[Dict],
+                          masks: Optional[BannerMaskStore] = None, option_columns: Optional[List[str]] = None,
+                          weight_column: Optional[str] = None,
+                          nets: Optional[List[Dict]] = None) -> Tuple[Dict, CodeDictionary]:
+    """Cells and code dictionary of a multi-response question (see calculate_multi_response_stats)"""
+    masks = masks if masks is not None else BannerMaskStore(df)
+
+    if option_columns is not None:
+        columns = [col for col in option_columns if col in df.columns]
+        family = masks.families.family(columns, columns)
+    else:
+        family = masks.families.question(question)
+
+    codes = family.codes
+    mask_matrix = masks.matrix(banner_columns)
+    weights = masks.weights(weight_column) if weight_column else None
+    net_matrix = net_membership(nets, codes) if nets else None
+    mentions, any_mention, answered, net_mentions = family.table(mask_matrix, weights, net_matrix)
+
+    answered_count = effective_base = None
+    if weights is not None:
+        # Unweighted base and effective base over the answering respondents
+        answering = mask_matrix & family.answered[:, None]
+        answered_count = np.count_nonzero(answering, axis=0)
+        _, effective_base = weighted_bases(answering, weights)
+
+    return _multi_results(banner_columns, codes, mentions, any_mention, answered, answered_count, effective_base,
+                          nets, net_mentions)
+
+
+def _multi_results(banner_columns: List[Dict], codes: List, mentions: np.ndarray, any_mention: np.ndarray,
+                   answered: np.ndarray, answered_count: Optional[np.ndarray] = None,
+                   effective_base: Optional[np.ndarray] = None, nets: Optional[List[Dict]] = None,
+                   net_mentions: Optional[np.ndarray] = None) -> Tuple[Dict, CodeDictionary]:
+    """
+    Per-column multi-response cells and code dictionary from checkbox_families.CheckboxFamily.table
+
+    When weighted, mentions/any_mention/answered are weighted sums and
+    answered_count / effective_base describe the answering respondents; the
+    unrounded sums go in 'weighted_counts' for the column z-tests. Columns
+    with answering respondents report every option code.
+    """
+    weighted = answered_count is not None
+    results = {}
+    reporting = np.zeros(len(banner_columns), dtype=bool)
+
+    for idx, col in enumerate(banner_columns):
+        base = int(answered[idx]) if not weighted else int(answered_count[idx])
+        total = float(answered[idx])
+        freq = {}
+        pct = {}
+
+        if base > 0 and total > 0:
+            reporting[idx] = True
+            for code_idx, code in enumerate(codes):
+                if not weighted:
+                    freq[code] = int(mentions[idx, code_idx])
+                else:
+                    freq[code] = round_weighted_sum(mentions[idx, code_idx])
+                pct[code] = round(float(mentions[idx, code_idx]) / total * 100, 1)
+
+        results[col['id']] = {
+            'name': col['name'],
+            'equation': col['equation'],
+            'base': base,
+            'frequencies': freq,
+            'percentages': pct,
+            'any_mention': int(any_mention[idx]) if not weighted else round_weighted_sum(any_mention[idx]),
+            'any_mention_pct': round(float(any_mention[idx]) / total * 100, 1) if base > 0 and total > 0 else None
+        }
+        if weighted:
+            results[col['id']].update(_weighted_base_fields(answered[idx], effective_base[idx]))
+            results[col['id']]['weighted_counts'] = {
+                'codes': {code: float(mentions[idx, code_idx]) for code_idx, code in enumerate(codes)} if freq else {},
+                'any_mention': float(any_mention[idx]),
+                'total': total,
+                'effective_base': float(effective_base[idx]),
+            }
+
+    if nets:
+        _add_net_cells(results, banner_columns, nets, net_mentions, answered, weighted)
+
+    reported = np.broadcast_to(reporting[:, None], (len(banner_columns), len(codes)))
+    return results, CodeDictionary(list(codes), reported)
+
+
+def build_banner_columns(banner_plan: Dict) -> List[Dict]:
+    """
+    Flatten a banner plan into its column list (Total + all H2s)
 
     Args:
-        df: SPSS data
-        questions: List of question definitions with type info
         banner_plan: Banner plan with H1/H2 structure
 
     Returns:
-        Complete cross-tab report
+        List of banner column definitions
     """
-    # Build banner columns list (Total + all H2s)
     banner_columns = [
         {'id': 'TOTAL', 'name': 'Total', 'equation': 'TOTAL'}
     ]
@@ -361,93 +919,394 @@ def generate_crosstab_report(df: pd.DataFrame, questions: List[Dict], banner_pla
                 'parent': h1_group['name']
             })
 
-    # Generate tables for each question
-    tables = []
+    return banner_columns
 
-    for q in questions:
-        question_id = q['id']
-        question_type = q.get('type', 'categorical')
 
-        if question_type == 'numeric':
-            stats = calculate_numeric_stats(df, question_id, banner_columns)
-        elif question_type == 'likert':
-            top_codes = q.get('top_codes', [1, 2])
-            bottom_codes = q.get('bottom_codes', [4, 5])
-            stats = calculate_likert_stats(df, question_id, banner_columns, top_codes, bottom_codes)
-        else:
-            stats = calculate_categorical_stats(df, question_id, banner_columns)
+def question_data_columns(q: Dict, columns: Union[SchemaCatalog, List[str]]) -> List[str]:
+    """
+    Physical data columns a question table reads
 
-        tables.append({
-            'question_id': question_id,
-            'question_text': q.get('text', question_id),
-            'question_type': question_type,
-            'data': stats
-        })
+    Args:
+        q: Question definition
+        columns: Column names in the data, or their SchemaCatalog
+
+    Returns:
+        Column names (only those present in the data)
+    """
+    catalog = schema_catalog(columns)
+    if q.get('type') == 'grid_summary':
+        return question_data_columns({**q, 'id': q['grid'], 'type': 'likert_grid'}, catalog)
+    if q.get('type') in ('multi', 'likert_grid'):
+        if q.get('option_columns') is not None:
+            return [col for col in q['option_columns'] if col in catalog]
+        return catalog.family_columns(q['id'])
+    return [q['id']] if q['id'] in catalog else []
+
+
+def code_labels(options: List[Dict]) -> Dict:
+    """
+    Code dictionary labels from SPSS metadata options
+
+    Example: [{'code': '1', 'label': 'Male'}, ...] -> {1: 'Male', ...}, keyed
+    by canonical codes like the table cells
+    """
+    labels = {}
+    for option in options or []:
+        code = option.get('code')
+        try:
+            code = canonical_code(float(code))
+        except (TypeError, ValueError):
+            pass
+        labels[code] = str(option.get('label', code))
+    return labels
+
+
+def table_code_fields(q: Dict, dictionary: Optional[CodeDictionary]) -> Dict:
+    """
+    Code rows of a categorical or multi-response table
 
+    'codes' lists every code reported by any banner column, in dictionary
+    order, once per table; exports and stat testing read their rows from it.
+    'code_labels' maps codes to the question's labels (q['code_labels'], see
+    code_labels) when it has any.
+
+    Args:
+        q: Question definition
+        dictionary: Code dictionary of the table (None for other types)
+
+    Returns:
+        {'codes', 'code_labels'} to add to the table ({} for other types)
+    """
+    if dictionary is None:
+        return {}
+    codes = dictionary.table_codes()
+    fields = {'codes': codes}
+    labels = q.get('code_labels')
+    if labels:
+        fields['code_labels'] = {code: labels[code] for code in codes if code in labels}
+    return fields
+
+
+def build_crosstab_table(df: pd.DataFrame, q: Dict, banner_columns: List[Dict],
+                         masks: BannerMaskStore, weight_column: Optional[str] = None,
+                         grids: Optional[Dict] = None) -> Dict:
+    """
+    Build one question table of a cross-tab report
+
+    Args:
+        df: SPSS data
+        q: Question definition with type info; 'grid_summary' questions name
+            their grid ('grid') and summary ('summary', see GRID_SUMMARIES)
+        banner_columns: Flattened banner columns
+        masks: Report-scoped mask store
+        weight_column: Respondent weight column (None = unweighted)
+        grids: Report-scoped grid tensor cache shared by a grid's tables
+
+    Returns:
+        Table dictionary
+    """
+    stats, dictionary = question_stats(df, q, banner_columns, masks, weight_column, grids)
     return {
-        'metadata': {
-            'banner_name': banner_plan.get('name', 'Unnamed Banner'),
-            'total_base': len(df),
-            'num_questions': len(questions),
-            'num_columns': len(banner_columns)
-        },
-        'tables': tables
+        'question_id': q['id'],
+        'question_text': q.get('text', q['id']),
+        'question_type': q.get('type', 'categorical'),
+        'data': stats,
+        **table_code_fields(q, dictionary)
     }
 
 
-def export_to_csv(report: Dict) -> str:
+def question_stats(df: pd.DataFrame, q: Dict, banner_columns: List[Dict], masks: BannerMaskStore,
+                   weight_column: Optional[str] = None,
+                   grids: Optional[Dict] = None) -> Tuple[Dict, Optional[CodeDictionary]]:
     """
-    Export cross-tab report to CSV string
+    Per-column cells of one question table (see build_crosstab_table)
+
+    Returns:
+        (cells, code dictionary); the dictionary is None for question types
+        without code rows
+    """
+    question_id = q['id']
+    question_type = q.get('type', 'categorical')
+
+    nets = q.get('nets')
+    dictionary = None
+
+    if question_type == 'numeric':
+        stats = calculate_numeric_stats(df, question_id, banner_columns, masks, weight_column,
+                                        q.get('median_mode', 'exact'), nets)
+    elif question_type == 'likert':
+        top_codes = q.get('top_codes', [1, 2])
+        bottom_codes = q.get('bottom_codes', [4, 5])
+        stats = calculate_likert_stats(df, question_id, banner_columns, top_codes, bottom_codes, masks,
+                                       weight_column, nets)
+    elif question_type == 'likert_grid':
+        stats = calculate_likert_grid_stats(df, question_id, banner_columns,
+                                            q.get('top_codes', [1, 2]), q.get('bottom_codes', [4, 5]),
+                                            masks, q.get('option_columns'), weight_column, nets, grids)
+    elif question_type == 'grid_summary':
+        stats = calculate_grid_summary_stats(df, q['grid'], q['summary'], banner_columns,
+                                             q.get('top_codes', [1, 2]), q.get('bottom_codes', [4, 5]),
+                                             masks, q.get('option_columns'), weight_column, grids)
+    elif question_type == 'multi':
+        stats, dictionary = _multi_response_stats(df, question_id, banner_columns, masks,
+                                                  q.get('option_columns'), weight_column, nets)
+    else:
+        stats, dictionary = _categorical_stats(df, question_id, banner_columns, masks, weight_column, nets)
+
+    return stats, dictionary
+
+
+def generate_crosstab_report(df: pd.DataFrame, questions: List[Dict], banner_plan: Dict,
+                             workers: Optional[int] = None, cache: Optional[Any] = None,
+                             fingerprint: Optional[str] = None,
+                             weight_column: Optional[str] = None,
+                             sig_confidence: Optional[float] = DEFAULT_CONFIDENCE,
+                             median_mode: Optional[str] = None,
+                             chunk_rows: Optional[int] = None,
+                             cprofile: bool = False,
+                             catalog: Optional[SchemaCatalog] = None) -> Dict:
+    """
+    Generate complete cross-tabulation report
+
+    Banner masks are evaluated once into a report-scoped BannerMaskStore and
+    shared by every question table.
 
     Args:
-        report: Generated cross-tab report
+        df: SPSS data, or the path of a CSV/Parquet/.sav file to aggregate
+            out of core in row chunks (see chunked_report; medians are then
+            sketched, and workers/cache/median_mode do not apply)
+        questions: List of question definitions with type info
+        banner_plan: Banner plan with H1/H2 structure
+        workers: Number of worker processes; None or 1 runs serially. With
+            more workers the dataset and banner masks are placed in shared
+            memory once and questions are fanned out to a process pool
+            (see parallel_report). Output is identical to the serial mode.
+        cache: Optional report_cache.CrosstabReportCache kept between runs;
+            only question/banner-column pairs not already cached are
+            computed (serially) and the rest are spliced in from the cache.
+        fingerprint: report_cache.dataset_fingerprint(df), computed once per
+            dataset; required when a cache is given.
+        weight_column: Respondent weight column. Every table is then weighted
+            (frequencies, percentages, means) and gains weighted_base and
+            effective_base per column; 'base' stays the unweighted count.
+        sig_confidence: Confidence level of the column significance tests
+            within each H1 group (see significance); None skips stat testing.
+        median_mode: Default median computation for numeric questions that do
+            not set their own 'median_mode': 'exact' or 'sketch'.
+        chunk_rows: Rows per chunk when df is a file path.
+        cprofile: Also capture the run with cProfile; the top functions are
+            stored in metadata['profile']['cprofile'].
+        catalog: SchemaCatalog built when df was loaded (see schema_catalog);
+            looked up from df.columns when omitted.
 
     Returns:
-        CSV string
+        Complete cross-tab report. metadata['profile'] holds stage timings,
+        per-type and slowest-table timings, mask and cache counters and rows
+        scanned (see report_profile).
     """
+    if isinstance(df, (str, os.PathLike)):
+        from chunked_report import DEFAULT_CHUNK_ROWS, generate_chunked_report
+        return generate_chunked_report(df, questions, banner_plan, chunk_rows or DEFAULT_CHUNK_ROWS,
+                                       weight_column, sig_confidence, cprofile)
+
+    profiler = ReportProfiler(cprofile)
+    banner_columns = build_banner_columns(banner_plan)
+
+    if weight_column and weight_column not in df.columns:
+        raise ValueError(f"Weight column '{weight_column}' not found in data")
+
+    if median_mode:
+        # Carried on the question so cached and parallel tables see it too
+        questions = [
+            {**q, 'median_mode': median_mode}
+            if q.get('type') == 'numeric' and 'median_mode' not in q else q
+            for q in questions
+        ]
+
+    if cache is not None:
+        if fingerprint is None:
+            raise ValueError("A dataset fingerprint is required when using a report cache")
+        masks = cache.mask_store(df, fingerprint, catalog)
+    else:
+        masks = BannerMaskStore(df, catalog)
+    profiler.track_masks(masks)
+
+    with profiler.stage('masks'):
+        masks.matrix(banner_columns)
+
+    # Generate tables for each question; a grid and its summary tables share one count tensor
+    grids = {}
+    with profiler.stage('stats'):
+        if cache is not None:
+            cache_misses, cache_hits = cache.misses, cache.hits
+            tables = []
+            for q in questions:
+                start, misses = time.perf_counter(), cache.misses
+                tables.append(cache.build_table(df, q, banner_columns, masks, fingerprint, weight_column, grids))
+                profiler.record_table(q['id'], tables[-1]['question_type'], time.perf_counter() - start,
+                                      len(df) if cache.misses > misses else 0)
+            profiler.counters['table_cache'] = {'hits': cache.hits - cache_hits,
+                                                'misses': cache.misses - cache_misses}
+        elif workers and workers > 1 and len(questions) > 1:
+            from parallel_report import build_tables_parallel
+            tables = build_tables_parallel(df, questions, banner_columns, masks, workers,
+                                           weight_column=weight_column, profiler=profiler)
+        else:
+            tables = []
+            for q in questions:
+                start = time.perf_counter()
+                tables.append(build_crosstab_table(df, q, banner_columns, masks, weight_column, grids))
+                profiler.record_table(q['id'], tables[-1]['question_type'], time.perf_counter() - start, len(df))
+
+    metadata = {
+        'banner_name': banner_plan.get('name', 'Unnamed Banner'),
+        'total_base': len(df),
+        'num_questions': len(questions),
+        'num_columns': len(banner_columns)
+    }
+    if weight_column:
+        metadata['weight_column'] = weight_column
+        metadata['weighted_total_base'] = round_weighted_sum(masks.weights(weight_column).sum())
+
+    masks.compact()
+
+    report = {
+        'metadata': metadata,
+        'tables': tables
+    }
+    if sig_confidence:
+        with profiler.stage('significance'):
+            add_report_significance(report, banner_columns, sig_confidence)
+
+    metadata['profile'] = profiler.finish()
+
+    return report
+
+
+def _net_labels(cells: List[Dict]) -> List[str]:
+    """Net row labels of a table, in definition order"""
+    return list(dict.fromkeys(label for cell in cells for label in cell.get('net_percentages', {})))
+
+
+def _csv_table_lines(table: Dict, letters: Optional[Dict[str, str]] = None) -> List[str]:
+    """CSV lines for one table, ending with a blank separator line"""
     lines = []
+    lines.append(f"{table['question_id']}: {table['question_text']}")
+    lines.append(f"Type: {table['question_type']}")
+    lines.append("")
+
+    # Get column IDs
+    col_ids = list(table['data'].keys())
+
+    # Header rows
+    lines.append("Column," + ",".join([table['data'][cid]['name'] for cid in col_ids]))
+    if letters:
+        lines.append("Letter," + ",".join([letters.get(cid, '') for cid in col_ids]))
+    lines.append("Equation," + ",".join([table['data'][cid]['equation'] for cid in col_ids]))
+    lines.append("Base," + ",".join([str(table['data'][cid]['base']) for cid in col_ids]))
+    if any('weighted_base' in table['data'][cid] for cid in col_ids):
+        lines.append("Weighted Base," + ",".join([str(table['data'][cid].get('weighted_base', '-')) for cid in col_ids]))
+        lines.append("Effective Base," + ",".join([str(table['data'][cid].get('effective_base', '-')) for cid in col_ids]))
+
+    # Data rows based on type
+    if table['question_type'] == 'numeric':
+        lines.append("Mean," + ",".join([str(table['data'][cid].get('mean', '-')) for cid in col_ids]))
+        if letters:
+            lines.append("Mean sig," + ",".join([table['data'][cid].get('sig_mean', '') for cid in col_ids]))
+        lines.append("Median," + ",".join([str(table['data'][cid].get('median', '-')) for cid in col_ids]))
+        lines.append("Std Dev," + ",".join([str(table['data'][cid].get('std', '-')) for cid in col_ids]))
+    elif table['question_type'] == 'likert_grid':
+        statements = list(next(iter(table['data'].values()), {}).get('statements', {}))
+        scale = list(next(iter(table['data'].values()), {}).get('scale', []))
+        for statement in statements:
+            cells = [table['data'][cid]['statements'][statement] for cid in col_ids]
+            lines.append(f"{statement} Base," + ",".join([str(c['base']) for c in cells]))
+            for code in scale:
+                lines.append(f"{statement} Code {code} %," + ",".join([str(c['distribution'].get(code, '-')) for c in cells]))
+            lines.append(f"{statement} Top Box %," + ",".join([str(c['top_box']) for c in cells]))
+            lines.append(f"{statement} Bottom Box %," + ",".join([str(c['bottom_box']) for c in cells]))
+            for label in _net_labels(cells):
+                lines.append(f"{statement} Net: {label} %," + ",".join([str(c.get('net_percentages', {}).get(label, '-')) for c in cells]))
+            lines.append(f"{statement} Mean," + ",".join([str(c['mean']) for c in cells]))
+    elif table['question_type'] == 'grid_summary':
+        first = next(iter(table['data'].values()), {})
+        label = 'Mean' if first.get('summary') == 'Mean' else f"{first.get('summary')} %"
+        for statement in first.get('statements', {}):
+            cells = [table['data'][cid]['statements'][statement] for cid in col_ids]
+            lines.append(f"{statement} {label}," + ",".join([str(c['value'] if c['value'] is not None else '-') for c in cells]))
+    elif table['question_type'] == 'likert':
+        lines.append("Top Box %," + ",".join([str(table['data'][cid].get('top_box', '-')) for cid in col_ids]))
+        if letters:
+            lines.append("Top Box sig," + ",".join([table['data'][cid].get('sig_top_box', '') for cid in col_ids]))
+        lines.append("Bottom Box %," + ",".join([str(table['data'][cid].get('bottom_box', '-')) for cid in col_ids]))
+        if letters:
+            lines.append("Bottom Box sig," + ",".join([table['data'][cid].get('sig_bottom_box', '') for cid in col_ids]))
+    else:
+        # Categorical / multi-response - show all codes
+        for code in table.get('codes', []):
+            values = [str(table['data'][cid].get('percentages', {}).get(code, '0.0')) for cid in col_ids]
+            lines.append(f"Code {code} %," + ",".join(values))
+            if letters:
+                sig = [table['data'][cid].get('sig', {}).get(code, '') for cid in col_ids]
+                lines.append(f"Code {code} sig," + ",".join(sig))
+
+        if table['question_type'] == 'multi':
+            lines.append("Any Mention %," + ",".join([str(table['data'][cid].get('any_mention_pct', '-')) for cid in col_ids]))
+            if letters:
+                lines.append("Any Mention sig," + ",".join([table['data'][cid].get('sig_any_mention', '') for cid in col_ids]))
+
+    if table['question_type'] not in ('likert_grid', 'grid_summary'):
+        for label in _net_labels([table['data'][cid] for cid in col_ids]):
+            lines.append(f"Net: {label} %," + ",".join([str(table['data'][cid].get('net_percentages', {}).get(label, '-')) for cid in col_ids]))
 
-    # Header
-    lines.append(f"Cross-Tabulation Report")
-    lines.append(f"Banner: {report['metadata']['banner_name']}")
-    lines.append(f"Total Base: {report['metadata']['total_base']}")
     lines.append("")
+    return lines
+
+
+def iter_csv_blocks(report: Dict) -> Iterator[str]:
+    """
+    Yield the CSV export one block at a time (report header, then each table)
+
+    Only one table is formatted in memory at a time, so download handlers can
+    stream the first bytes while later tables are still being written.
+    "".join(iter_csv_blocks(report)) == export_to_csv(report).
+
+    Args:
+        report: Generated cross-tab report
+
+    Yields:
+        CSV text blocks
+    """
+    header = [
+        "Cross-Tabulation Report",
+        f"Banner: {report['metadata']['banner_name']}",
+        f"Total Base: {report['metadata']['total_base']}",
+    ]
+    if report['metadata'].get('weight_column'):
+        header.append(f"Weighted by: {report['metadata']['weight_column']} "
+                      f"(weighted total {report['metadata']['weighted_total_base']})")
+    letters = report['metadata'].get('column_letters')
+    if letters:
+        header.append(f"Significance: column letters, {round(report['metadata']['sig_confidence'] * 100)}% confidence "
+                      f"within each banner group")
+    header.append("")
+    yield "\n".join(header)
 
-    # Each table
     for table in report['tables']:
-        lines.append(f"{table['question_id']}: {table['question_text']}")
-        lines.append(f"Type: {table['question_type']}")
-        lines.append("")
-
-        # Get column IDs
-        col_ids = list(table['data'].keys())
-
-        # Header rows
-        lines.append("Column," + ",".join([table['data'][cid]['name'] for cid in col_ids]))
-        lines.append("Equation," + ",".join([table['data'][cid]['equation'] for cid in col_ids]))
-        lines.append("Base," + ",".join([str(table['data'][cid]['base']) for cid in col_ids]))
-
-        # Data rows based on type
-        if table['question_type'] == 'numeric':
-            lines.append("Mean," + ",".join([str(table['data'][cid].get('mean', '-')) for cid in col_ids]))
-            lines.append("Median," + ",".join([str(table['data'][cid].get('median', '-')) for cid in col_ids]))
-            lines.append("Std Dev," + ",".join([str(table['data'][cid].get('std', '-')) for cid in col_ids]))
-        elif table['question_type'] == 'likert':
-            lines.append("Top Box %," + ",".join([str(table['data'][cid].get('top_box', '-')) for cid in col_ids]))
-            lines.append("Bottom Box %," + ",".join([str(table['data'][cid].get('bottom_box', '-')) for cid in col_ids]))
-        else:
-            # Categorical - show all codes
-            all_codes = set()
-            for cid in col_ids:
-                all_codes.update(table['data'][cid].get('percentages', {}).keys())
+        yield "\n" + "\n".join(_csv_table_lines(table, letters))
 
-            for code in sorted(all_codes):
-                values = [str(table['data'][cid].get('percentages', {}).get(code, '0.0')) for cid in col_ids]
-                lines.append(f"Code {code} %," + ",".join(values))
 
-        lines.append("")
+def export_to_csv(report: Dict) -> str:
+    """
+    Export cross-tab report to CSV string
 
-    return "\n".join(lines)
+    Args:
+        report: Generated cross-tab report
+
+    Returns:
+        CSV string
+    """
+    return "".join(iter_csv_blocks(report))
 
 
 def export_to_dataframe(report: Dict, question_id: str) -> Optional[pd.DataFrame]:
@@ -466,6 +1325,7 @@ def export_to_dataframe(report: Dict, question_id: str) -> Optional[pd.DataFrame
         return None
 
     col_ids = list(table['data'].keys())
+    letters = report['metadata'].get('column_letters')
 
     # Build DataFrame
     data = {
@@ -479,6 +1339,19 @@ def export_to_dataframe(report: Dict, question_id: str) -> Optional[pd.DataFrame
             table['data'][cid]['base']
         ]
 
+    if letters:
+        data['Metric'].append('Letter')
+        for cid in col_ids:
+            data[cid].append(letters.get(cid, ''))
+
+    if any('weighted_base' in table['data'][cid] for cid in col_ids):
+        data['Metric'].extend(['Weighted Base', 'Effective Base'])
+        for cid in col_ids:
+            data[cid].extend([
+                table['data'][cid].get('weighted_base', '-'),
+                table['data'][cid].get('effective_base', '-')
+            ])
+
     # Add type-specific rows
     if table['question_type'] == 'numeric':
         data['Metric'].extend(['Mean', 'Median', 'Std Dev'])
@@ -488,6 +1361,36 @@ def export_to_dataframe(report: Dict, question_id: str) -> Optional[pd.DataFrame
                 table['data'][cid].get('median', '-'),
                 table['data'][cid].get('std', '-')
             ])
+        if letters:
+            data['Metric'].append('Mean sig')
+            for cid in col_ids:
+                data[cid].append(table['data'][cid].get('sig_mean', ''))
+    elif table['question_type'] == 'likert_grid':
+        first = next(iter(table['data'].values()), {})
+        for statement in first.get('statements', {}):
+            cells = [table['data'][cid]['statements'][statement] for cid in col_ids]
+            rows = [('Base', 'base')] + [(f'Code {code} %', code) for code in first.get('scale', [])] + \
+                   [('Top Box %', 'top_box'), ('Bottom Box %', 'bottom_box')] + \
+                   [(f'Net: {net} %', net) for net in _net_labels(cells)] + [('Mean', 'mean')]
+            for label, key in rows:
+                data['Metric'].append(f'{statement} {label}')
+                for cid, cell in zip(col_ids, cells):
+                    if label.startswith('Code'):
+                        data[cid].append(cell['distribution'].get(key, '-'))
+                    elif label.startswith('Net: '):
+                        data[cid].append(cell.get('net_percentages', {}).get(key, '-'))
+                    else:
+                        data[cid].append(cell[key])
+
+    elif table['question_type'] == 'grid_summary':
+        first = next(iter(table['data'].values()), {})
+        label = 'Mean' if first.get('summary') == 'Mean' else f"{first.get('summary')} %"
+        for statement in first.get('statements', {}):
+            data['Metric'].append(f'{statement} {label}')
+            for cid in col_ids:
+                value = table['data'][cid]['statements'][statement]['value']
+                data[cid].append(value if value is not None else '-')
+
     elif table['question_type'] == 'likert':
         data['Metric'].extend(['Top Box %', 'Bottom Box %'])
         for cid in col_ids:
@@ -495,15 +1398,38 @@ def export_to_dataframe(report: Dict, question_id: str) -> Optional[pd.DataFrame
                 table['data'][cid].get('top_box', '-'),
                 table['data'][cid].get('bottom_box', '-')
             ])
+        if letters:
+            data['Metric'].extend(['Top Box sig', 'Bottom Box sig'])
+            for cid in col_ids:
+                data[cid].extend([
+                    table['data'][cid].get('sig_top_box', ''),
+                    table['data'][cid].get('sig_bottom_box', '')
+                ])
     else:
-        # Categorical
-        all_codes = set()
-        for cid in col_ids:
-            all_codes.update(table['data'][cid].get('percentages', {}).keys())
-
-        for code in sorted(all_codes):
-            data['Metric'].append(f'Code {code} %')
+        # Categorical / multi-response
+        labels = table.get('code_labels', {})
+        for code in table.get('codes', []):
+            data['Metric'].append(f'Code {code}: {labels[code]} %' if code in labels else f'Code {code} %')
             for cid in col_ids:
                 data[cid].append(table['data'][cid].get('percentages', {}).get(code, 0.0))
+            if letters:
+                data['Metric'].append(f'Code {code} sig')
+                for cid in col_ids:
+                    data[cid].append(table['data'][cid].get('sig', {}).get(code, ''))
+
+        if table['question_type'] == 'multi':
+            data['Metric'].append('Any Mention %')
+            for cid in col_ids:
+                data[cid].append(table['data'][cid].get('any_mention_pct', '-'))
+            if letters:
+                data['Metric'].append('Any Mention sig')
+                for cid in col_ids:
+                    data[cid].append(table['data'][cid].get('sig_any_mention', ''))
+
+    if table['question_type'] not in ('likert_grid', 'grid_summary'):
+        for label in _net_labels([table['data'][cid] for cid in col_ids]):
+            data['Metric'].append(f'Net: {label} %')
+            for cid in col_ids:
+                data[cid].append(table['data'][cid].get('net_percentages', {}).get(label, '-'))
 
     return pd.DataFrame(data)
\ No newline at end of file
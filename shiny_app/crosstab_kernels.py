@@ -0,0 +1,428 @@
+"""
+Cross-Tab Kernels
+Vectorized count kernels that tabulate one question against every banner column at once
+
+The kernels take a question column plus an (n_rows x n_columns) banner mask
+matrix and return whole count matrices, so a 60-column table costs about as
+much as a single column. Every kernel optionally takes a respondent weight
+vector; weights ride along in the same bincount / matrix multiply.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def canonical_code(value):
+    """
+    Canonical answer code: whole numbers as int (2.0 -> 2), other values unchanged
+
+    Numeric columns with missing answers are read as float, so without this
+    the same code is 2 in one table and 2.0 in another.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value) if float(value).is_integer() else float(value)
+    return value
+
+
+def encode_codes(values: pd.Series) -> Tuple[np.ndarray, List]:
+    """
+    Encode a question column as dense integer codes
+
+    Args:
+        values: Question column
+
+    Returns:
+        (codes, uniques): codes[i] indexes uniques, -1 marks a missing answer.
+        uniques is the code dictionary: canonical codes (see canonical_code),
+        sorted when the values are mutually comparable.
+    """
+    try:
+        codes, uniques = pd.factorize(values, sort=True)
+    except TypeError:
+        # Mixed types (e.g. numbers and text) cannot be ordered
+        codes, uniques = pd.factorize(values, sort=False)
+    return np.asarray(codes), [canonical_code(value) for value in uniques.tolist()]
+
+
+def resolve_weights(values: pd.Series) -> np.ndarray:
+    """
+    Respondent weights from a weight column
+
+    Missing, negative and non-numeric weights count as 0 (respondent excluded
+    from weighted figures).
+
+    Args:
+        values: Weight column
+
+    Returns:
+        float64 weight vector
+    """
+    weights = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    invalid = np.isnan(weights) | (weights < 0)
+    if invalid.any():
+        print(f"WARNING: {int(invalid.sum())} respondents have a missing or negative weight; using 0")
+        weights = np.where(invalid, 0.0, weights)
+    return weights
+
+
+def weighted_bases(mask_matrix: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted base and effective base of every banner column
+
+    The effective base is Kish's (sum w)^2 / sum w^2: the unweighted sample size
+    that would give the same precision as the weighted one.
+
+    Args:
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: float64 weight per respondent
+
+    Returns:
+        (weighted_base, effective_base), one entry per column
+    """
+    sums = mask_matrix.T.astype(np.float64) @ np.column_stack([weights, weights * weights])
+    sum_w, sum_w2 = sums[:, 0], sums[:, 1]
+    return sum_w, effective_base(sum_w, sum_w2)
+
+
+def effective_base(sum_w: np.ndarray, sum_w2: np.ndarray) -> np.ndarray:
+    """Kish effective base (sum w)^2 / sum w^2, 0 where there are no weights"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(sum_w2 > 0, sum_w * sum_w / sum_w2, 0.0)
+
+
+def count_matrix(codes: np.ndarray, n_codes: int, mask_matrix: np.ndarray,
+                 weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Count every code within every banner column in a single bincount
+
+    Each (respondent, banner column) membership contributes one entry at
+    column * n_codes + code, so all columns are counted together.
+
+    Args:
+        codes: Integer codes from encode_codes (-1 = missing)
+        n_codes: Number of distinct codes
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent; entries then sum weights
+
+    Returns:
+        (n_columns x n_codes) count matrix (int64, or float64 when weighted)
+    """
+    n_columns = mask_matrix.shape[1]
+    if n_codes == 0 or n_columns == 0:
+        return np.zeros((n_columns, n_codes), dtype=np.int64 if weights is None else np.float64)
+
+    rows, cols = np.nonzero(mask_matrix & (codes >= 0)[:, None])
+    flat = np.bincount(cols * n_codes + codes[rows], weights=None if weights is None else weights[rows],
+                       minlength=n_columns * n_codes)
+    return flat.reshape(n_columns, n_codes)
+
+
+def categorical_table(values: pd.Series, mask_matrix: np.ndarray,
+                      weights: Optional[np.ndarray] = None) -> Tuple[List, np.ndarray, np.ndarray]:
+    """
+    Tabulate a categorical question across all banner columns
+
+    Args:
+        values: Question column
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent
+
+    Returns:
+        (uniques, counts, percentages): counts is (n_columns x n_codes), weighted
+        when weights are given; percentages are of the answering (non-missing)
+        respondents per column, rounded to one decimal.
+    """
+    codes, uniques = encode_codes(values)
+    counts = count_matrix(codes, len(uniques), mask_matrix, weights)
+    return uniques, counts, answered_percentages(counts)
+
+
+def answered_weight_squares(values: pd.Series, mask_matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Sum of squared weights of each banner column's answering (non-missing) respondents"""
+    squares = np.where(values.notna().to_numpy(), weights * weights, 0.0)
+    return mask_matrix.T.astype(np.float64) @ squares
+
+
+def answered_percentages(counts: np.ndarray) -> np.ndarray:
+    """Percentages of each column's answering total, rounded to one decimal"""
+    answered = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.round(counts / answered * 100, 1)
+
+
+def indicator_counts(indicators: np.ndarray, mask_matrix: np.ndarray,
+                     weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Respondents flagged by each indicator column within every banner column
+
+    Args:
+        indicators: (n_rows x n_indicators) boolean matrix
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent
+
+    Returns:
+        (n_columns x n_indicators) int64 counts, or float64 weighted sums
+    """
+    if weights is None:
+        return np.rint(mask_matrix.T.astype(np.float64) @ indicators.astype(np.float64)).astype(np.int64)
+    return mask_matrix.T.astype(np.float64) @ (indicators * weights[:, None])
+
+
+def numeric_table(values: np.ndarray, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None,
+                  median_mode: str = 'exact') -> Dict[str, np.ndarray]:
+    """
+    Summary statistics of a numeric question for every banner column in one pass
+
+    Counts, sums and sums of squares for all columns come from one matrix
+    multiply. The sums of squares are taken on values shifted by their overall
+    mean, so the variance does not lose precision; means use the raw sums. Medians come from a
+    single sort shared by all columns, or from a log-bucket sketch
+    (median_mode='sketch', see quantile_sketch) that avoids the sort on very
+    large datasets at about 1% relative error.
+
+    Weighted statistics follow SPSS frequency-weight conventions: variance is
+    sum w (x - mean)^2 / (sum w - 1). Unweighted is the same with w = 1.
+
+    Args:
+        values: float64 question values (NaN = missing)
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent
+        median_mode: 'exact' or 'sketch'
+
+    Returns:
+        Dict of per-column arrays: base (unweighted count of answers),
+        weighted_base, effective_base, mean, median, std (NaN where undefined)
+    """
+    if median_mode not in ('exact', 'sketch'):
+        raise ValueError(f"Unknown median_mode '{median_mode}' (expected 'exact' or 'sketch')")
+
+    moments = numeric_moments(values, mask_matrix, weights)
+    w = (~np.isnan(values)).astype(np.float64) if weights is None else np.where(np.isnan(values), 0.0, weights)
+
+    if median_mode == 'sketch':
+        median = _sketch_medians(values, mask_matrix, w)
+    else:
+        median = _exact_medians(values, mask_matrix, w, moments['sum_w'])
+
+    return {**numeric_summary(moments), 'median': median}
+
+
+def numeric_moments(values: np.ndarray, mask_matrix: np.ndarray,
+                    weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Mergeable per-column moments of a numeric question
+
+    Args:
+        values: float64 question values (NaN = missing)
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent
+
+    Returns:
+        Dict of per-column arrays: base (answer count), sum_w, sum_w2, sum_wx
+        (raw weighted sum) and m2 (weighted sum of squared deviations from
+        the column mean)
+    """
+    valid = ~np.isnan(values)
+    shift = float(values[valid].mean()) if valid.any() else 0.0
+    raw = np.where(valid, values, 0.0)
+    x = np.where(valid, values - shift, 0.0)
+    w = valid.astype(np.float64) if weights is None else np.where(valid, weights, 0.0)
+
+    sums = mask_matrix.T.astype(np.float64) @ np.column_stack([valid, w, w * w, w * raw, w * x, w * x * x])
+    base, sum_w, sum_w2, sum_w_raw, sum_wx, sum_wxx = sums.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shifted_mean = np.where(sum_w > 0, sum_wx / sum_w, 0.0)
+
+    return {
+        'base': np.rint(base).astype(np.int64),
+        'sum_w': sum_w,
+        'sum_w2': sum_w2,
+        'sum_wx': sum_w_raw,
+        'm2': sum_wxx - sum_wx * shifted_mean,
+    }
+
+
+def merge_numeric_moments(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Combine the moments of two disjoint sets of rows (e.g. two data chunks)
+
+    Counts and sums add; m2 uses the pairwise update of Chan et al., which
+    stays accurate when the chunk means differ.
+    """
+    sum_w = a['sum_w'] + b['sum_w']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where((a['sum_w'] > 0) & (b['sum_w'] > 0),
+                         b['sum_wx'] / b['sum_w'] - a['sum_wx'] / a['sum_w'], 0.0)
+        correction = np.where(sum_w > 0, delta * delta * a['sum_w'] * b['sum_w'] / sum_w, 0.0)
+
+    return {
+        'base': a['base'] + b['base'],
+        'sum_w': sum_w,
+        'sum_w2': a['sum_w2'] + b['sum_w2'],
+        'sum_wx': a['sum_wx'] + b['sum_wx'],
+        'm2': a['m2'] + b['m2'] + correction,
+    }
+
+
+def numeric_summary(moments: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """base, weighted_base, effective_base, mean and std from numeric_moments"""
+    sum_w = moments['sum_w']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(sum_w > 0, moments['sum_wx'] / sum_w, np.nan)
+        variance = np.where(sum_w > 1, moments['m2'] / (sum_w - 1), np.nan)
+    # m2 carries cancellation noise of about sqrt(machine epsilon) relative to
+    # the values; a spread below that is a constant column, not a tiny variance
+    variance = np.where(variance <= (1e-6 * np.maximum(np.abs(mean), 1.0)) ** 2, 0.0, variance)
+
+    return {
+        'base': moments['base'],
+        'weighted_base': sum_w,
+        'effective_base': effective_base(sum_w, moments['sum_w2']),
+        'mean': mean,
+        'std': np.sqrt(np.maximum(variance, 0.0)),
+    }
+
+
+def _exact_medians(values: np.ndarray, mask_matrix: np.ndarray, w: np.ndarray, sum_w: np.ndarray) -> np.ndarray:
+    """
+    (Weighted) median per column from one shared sort
+
+    The median is the first sorted value whose cumulative weight reaches half
+    the total, averaged with the next one on an exact tie (with unit weights
+    this is the usual middle value / mean of the two middle values).
+    """
+    n_columns = mask_matrix.shape[1]
+    if n_columns == 0 or len(values) == 0:
+        return np.full(n_columns, np.nan)
+
+    order = np.argsort(values, kind='stable')
+    sorted_x = values[order]
+    # Cumulative weight of every column in one pass; columns x rows keeps
+    # the running sum along contiguous memory
+    cumulative = np.ascontiguousarray(mask_matrix[order].T) * w[order]
+    np.cumsum(cumulative, axis=1, out=cumulative)
+    half = cumulative[:, -1] / 2
+
+    # Cumulative sums are non-decreasing, so counting the entries below a
+    # level finds the first row reaching it (a vectorized searchsorted).
+    # On an exact tie the median averages in the next row adding weight.
+    lower = np.count_nonzero(cumulative < half[:, None], axis=1)
+    reached = cumulative[np.arange(n_columns), lower]
+    upper = np.minimum(np.count_nonzero(cumulative <= reached[:, None], axis=1), len(sorted_x) - 1)
+
+    tie = np.isclose(reached, half, rtol=1e-9, atol=0)
+    median = np.where(tie, (sorted_x[lower] + sorted_x[upper]) / 2, sorted_x[lower])
+    return np.where(sum_w > 0, median, np.nan)
+
+
+def _sketch_medians(values: np.ndarray, mask_matrix: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Approximate (weighted) median per column from log-bucket counts, no sort"""
+    from quantile_sketch import bucket_codes
+
+    codes, representatives = bucket_codes(values)
+    counts = count_matrix(codes, len(representatives), mask_matrix, w)
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1]
+
+    # First bucket whose cumulative weight reaches half of the column total
+    median = representatives[np.argmax(cumulative >= (totals / 2)[:, None], axis=1)]
+    return np.where(totals > 0, median, np.nan)
+
+
+def likert_grid_table(codes: np.ndarray, n_points: int, mask_matrix: np.ndarray,
+                      top: List[int], bottom: List[int], scores: Optional[np.ndarray] = None,
+                      weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Tabulate a whole Likert grid (all statements) across all banner columns
+
+    Every (statement, scale point) pair becomes one indicator column of a
+    respondents x (statements * points) matrix, so a single matrix multiply
+    against the banner mask matrix yields the full distribution of every
+    statement in every banner column; boxes and means are sums over it.
+
+    Args:
+        codes: (n_rows x n_statements) int scale-point codes, -1 = missing
+        n_points: Number of codes (scale points, plus any unscored answers)
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        top: Codes in the top box
+        bottom: Codes in the bottom box
+        scores: Score of each code for the mean (NaN = not scored, e.g.
+            "Don't know"); None skips the mean
+        weights: Optional weight per respondent
+
+    Returns:
+        Dict of arrays: counts (n_columns x n_statements x n_points),
+        answered (n_columns x n_statements), percentages of answered
+        (n_columns x n_statements x n_points), top_box, bottom_box (percent)
+        and mean (n_columns x n_statements); NaN where nobody answered
+    """
+    return likert_grid_summary(likert_grid_counts(codes, n_points, mask_matrix, weights), top, bottom, scores)
+
+
+def likert_grid_counts(codes: np.ndarray, n_points: int, mask_matrix: np.ndarray,
+                       weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (n_columns x n_statements x n_points) counts of a Likert grid
+
+    Args:
+        codes: (n_rows x n_statements) int scale-point codes, -1 = missing
+        n_points: Number of codes
+        mask_matrix: (n_rows x n_columns) boolean banner membership
+        weights: Optional weight per respondent
+
+    Returns:
+        int64 counts, or float64 weighted sums when weights are given
+    """
+    n_statements = codes.shape[1]
+    n_columns = mask_matrix.shape[1]
+    counts = np.zeros((n_columns, n_statements, n_points), dtype=np.int64 if weights is None else np.float64)
+    if n_points == 0 or n_columns == 0:
+        return counts
+
+    # Banner memberships once; each statement is then one bincount over
+    # column * n_points + code, as in count_matrix
+    rows, cols = np.nonzero(mask_matrix)
+    member_weights = None if weights is None else weights[rows]
+    for statement in range(n_statements):
+        point = codes[rows, statement]
+        answered = point >= 0
+        counts[:, statement, :] = np.bincount(
+            cols[answered] * n_points + point[answered],
+            weights=None if member_weights is None else member_weights[answered],
+            minlength=n_columns * n_points
+        ).reshape(n_columns, n_points)
+    return counts
+
+
+def likert_grid_summary(counts: np.ndarray, top: List[int], bottom: List[int],
+                        scores: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Distribution, boxes and means from likert_grid_counts (see likert_grid_table)"""
+    answered = counts.sum(axis=2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentages = counts / answered[:, :, None] * 100
+        top_box = counts[:, :, top].sum(axis=2) / answered * 100
+        bottom_box = counts[:, :, bottom].sum(axis=2) / answered * 100
+
+        if scores is not None:
+            scored = ~np.isnan(scores)
+            score_sum = counts[:, :, scored] @ scores[scored]
+            mean = score_sum / counts[:, :, scored].sum(axis=2)
+        else:
+            mean = np.full(answered.shape, np.nan)
+
+    return {
+        'counts': counts,
+        'answered': answered,
+        'percentages': percentages,
+        'top_box': top_box,
+        'bottom_box': bottom_box,
+        'mean': mean,
+    }
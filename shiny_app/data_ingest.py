@@ -0,0 +1,132 @@
+"""
+SPSS Data Ingest
+Loads survey exports into compact dtypes
+
+A bare pd.read_csv gives float64/object columns for data that is almost all
+small integer codes (0/1 checkboxes, 1-5 scales, 1-98 codes). This stage
+downcasts code columns to the smallest integer type (nullable Int8/Int16/...
+when answers are missing), turns repetitive text into categories, parses
+date columns once, and reports memory before and after.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns parsed as dates when present (Decipher/SPSS export conventions)
+DEFAULT_DATE_COLUMNS = ['start_date', 'date', 'end_date', 'markers_date']
+
+_INTEGER_TYPES = [
+    (np.int8, 'Int8'),
+    (np.int16, 'Int16'),
+    (np.int32, 'Int32'),
+    (np.int64, 'Int64'),
+]
+
+# Text columns with at most this distinct/non-missing ratio become 'category'
+CATEGORY_MAX_RATIO = 0.5
+
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    """Deep memory usage of a DataFrame in megabytes"""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def _downcast_numeric(series: pd.Series) -> pd.Series:
+    """Smallest integer dtype for integral codes; other numbers are left as is"""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    present = ~np.isnan(values)
+    observed = values[present]
+
+    if len(observed) and not np.all(np.mod(observed, 1) == 0):
+        return series
+
+    low = observed.min() if len(observed) else 0
+    high = observed.max() if len(observed) else 0
+    dtype = integer_dtype(low, high, not present.all())
+    return series.astype(dtype) if dtype is not None else series
+
+
+def integer_dtype(low: float, high: float, has_missing: bool):
+    """Smallest integer dtype holding [low, high] (nullable when answers are missing), or None"""
+    for numpy_type, nullable_type in _INTEGER_TYPES:
+        info = np.iinfo(numpy_type)
+        if info.min <= low and high <= info.max:
+            return nullable_type if has_missing else numpy_type
+    return None
+
+
+def compact_dtypes(df: pd.DataFrame, date_columns: Optional[List[str]] = None,
+                   category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    Convert a freshly loaded survey DataFrame to compact dtypes
+
+    Args:
+        df: Raw DataFrame (e.g. from pd.read_csv)
+        date_columns: Columns to parse as datetimes (defaults to DEFAULT_DATE_COLUMNS)
+        category_max_ratio: Text columns whose distinct/non-missing ratio is at
+            or below this become 'category'; higher-cardinality text such as
+            open ends and respondent IDs is kept as is
+
+    Returns:
+        New DataFrame with compact dtypes
+    """
+    date_columns = DEFAULT_DATE_COLUMNS if date_columns is None else date_columns
+    compact = {}
+
+    for col in df.columns:
+        series = df[col]
+
+        if col in date_columns and not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            parsed = pd.to_datetime(series, errors='coerce')
+            # Keep the original if it did not look like dates at all
+            compact[col] = parsed if parsed.notna().sum() >= series.notna().sum() * 0.9 else series
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            compact[col] = series
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            compact[col] = _downcast_numeric(series)
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            non_missing = series.notna().sum()
+            if non_missing and series.nunique(dropna=True) / non_missing <= category_max_ratio:
+                compact[col] = series.astype('category')
+            else:
+                compact[col] = series
+        else:
+            compact[col] = series
+
+    return pd.DataFrame(compact, index=df.index)
+
+
+def load_survey_csv(path, date_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Read a Codes.csv / labels.csv export into compact dtypes
+
+    Args:
+        path: File path or buffer accepted by pd.read_csv
+        date_columns: Columns to parse as datetimes (defaults to DEFAULT_DATE_COLUMNS)
+
+    Returns:
+        (df, ingest_report) where ingest_report holds memory before/after in MB
+        and the number of columns per resulting dtype
+    """
+    raw = pd.read_csv(path, low_memory=False)
+    memory_before = memory_usage_mb(raw)
+
+    df = compact_dtypes(raw, date_columns)
+    memory_after = memory_usage_mb(df)
+
+    report = {
+        'rows': len(df),
+        'columns': len(df.columns),
+        'memory_before_mb': round(float(memory_before), 2),
+        'memory_after_mb': round(float(memory_after), 2),
+        'reduction_pct': round(float(1 - memory_after / memory_before) * 100, 1) if memory_before else 0.0,
+        'dtypes': df.dtypes.astype(str).value_counts().to_dict(),
+    }
+
+    print(f"INFO: Loaded {report['rows']} rows x {report['columns']} columns: "
+          f"{report['memory_before_mb']} MB -> {report['memory_after_mb']} MB "
+          f"({report['reduction_pct']}% smaller)")
+
+    return df, report
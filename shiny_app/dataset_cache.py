@@ -0,0 +1,179 @@
+"""
+Uploaded Dataset Cache
+Content-addressed Arrow IPC cache for survey uploads
+
+Analysts re-upload the same export many times a day. Uploads are hashed by
+content; the typed dataset produced by data_ingest is written once as an Arrow
+IPC file in a local cache directory and memory-mapped back on the next upload
+of identical bytes: numeric columns without missing values are wrapped
+zero-copy (read-only) over the mapped file, the rest are converted column by
+column while Arrow releases each source buffer. The directory is size-bounded
+with least-recently-used eviction. Datasets Arrow cannot represent (e.g. an
+object column mixing numbers and text) are simply not cached.
+
+Requires pyarrow; without it the cache is disabled and files are parsed as usual.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from data_ingest import load_survey_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+# Bump when data_ingest changes the dtypes it produces, so stale entries miss
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'QGEN_DATASET_CACHE_DIR', Path.home() / '.cache' / 'qgen-tab-planner' / 'datasets'
+))
+DEFAULT_MAX_BYTES = int(os.environ.get('QGEN_DATASET_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+
+def file_digest(path, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Arrow IPC files named by content digest, evicted least-recently-used"""
+
+    def __init__(self, cache_dir=None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.enabled = pa is not None
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            print("INFO: pyarrow not installed; uploaded dataset cache disabled")
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        stem = f"{key}-v{CACHE_FORMAT_VERSION}"
+        return self.cache_dir / f"{stem}.arrow", self.cache_dir / f"{stem}.json"
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, Dict]]:
+        """
+        Memory-map a cached dataset, or None on a miss
+
+        Numeric columns without nulls share the mapped pages (no copy, read
+        only; writes to them raise). Columns with nulls, text and
+        categoricals are materialized, one column at a time
+        (split_blocks/self_destruct), so the peak is one column on top of
+        the frame rather than a second full copy.
+        """
+        if not self.enabled:
+            return None
+
+        data_path, meta_path = self._paths(key)
+        if not data_path.exists():
+            return None
+
+        try:
+            # The mapping stays open for as long as zero-copy columns reference it
+            source = pa.memory_map(str(data_path), 'r')
+            table = pa_ipc.open_file(source).read_all()
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        except (OSError, pa.ArrowInvalid, ValueError) as e:
+            print(f"WARNING: Discarding unreadable cache entry {data_path.name}: {e}")
+            self._remove(key)
+            return None
+
+        # Touch for LRU ordering
+        os.utime(data_path)
+        return df, meta
+
+    def put(self, key: str, df: pd.DataFrame, meta: Optional[Dict] = None) -> None:
+        """Write a dataset atomically, then evict old entries over the size bound"""
+        if not self.enabled:
+            return
+
+        data_path, meta_path = self._paths(key)
+        tmp_path = data_path.with_suffix('.arrow.tmp')
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            # The upload itself loaded fine; it just is not cached
+            print(f"WARNING: Not caching dataset {key[:12]}: {e}")
+            return
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, data_path)
+        meta_path.write_text(json.dumps(meta or {}, default=str))
+
+        self.evict()
+
+    def _remove(self, key: str) -> None:
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Delete least-recently-used entries until the cache fits max_bytes"""
+        entries = sorted(self.cache_dir.glob('*.arrow'), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+
+        # Never evict the newest entry, even if it alone exceeds the bound
+        for path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            path.with_suffix('.json').unlink(missing_ok=True)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.cache_dir.glob('*.arrow')) if self.enabled else 0
+
+
+_default_cache: Optional[DatasetCache] = None
+
+
+def get_default_cache() -> DatasetCache:
+    """Process-wide cache shared by all Shiny sessions"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DatasetCache()
+    return _default_cache
+
+
+def load_survey_csv_cached(path, cache: Optional[DatasetCache] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    load_survey_csv with the content-addressed cache in front of it
+
+    Args:
+        path: Uploaded file path
+        cache: Cache to use (defaults to the process-wide cache)
+
+    Returns:
+        (df, ingest_report); ingest_report['cache'] is 'hit' or 'miss'
+    """
+    cache = cache if cache is not None else get_default_cache()
+    key = file_digest(path)
+
+    cached = cache.get(key)
+    if cached is not None:
+        df, report = cached
+        report['cache'] = 'hit'
+        print(f"INFO: Loaded {len(df)} rows x {len(df.columns)} columns from dataset cache")
+        return df, report
+
+    df, report = load_survey_csv(path)
+    cache.put(key, df, report)
+    report['cache'] = 'miss'
+    return df, report
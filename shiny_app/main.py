@@ -16,6 +16,8 @@ from shiny import App, ui, render, reactive, req
 from shiny.types import FileInfo
 import shinyswatch
 
+from schema_catalog import schema_catalog
+
 # Custom CSS for professional styling
 css = """
 .main-header {
@@ -359,9 +361,10 @@ def extract_questions_from_headers(headers):
         'Q9': {'text': 'Value perception', 'type': 'likert', 'section': 'main'}
     }
 
-    # Extract main questions
+    # Extract main questions (Q3r1 -> Q3; record, hidden and QC columns have no question)
+    catalog = schema_catalog(headers)
     for header in headers:
-        base_q = header.split('r')[0] if 'r' in header else header
+        base_q = catalog.base_question(header)
         if base_q in question_map:
             if not any(q['id'] == base_q for q in questions):
                 question_info = question_map[base_q].copy()
@@ -386,7 +389,7 @@ def create_multi_likert_chart(df, question_id, question):
     """Create professional multi-Likert chart using Plotly"""
 
     # Find sub-questions (Q3r1, Q3r2, etc.)
-    sub_questions = [col for col in df.columns if col.startswith(f"{question_id}r")]
+    sub_questions = schema_catalog(df.columns).family_columns(question_id)
 
     if not sub_questions:
         return go.Figure().add_annotation(text="No sub-questions found", showarrow=False)
@@ -15,8 +15,9 @@ import shinyswatch
 # Import cross-tab engine
 from crosstab_engine import (
     generate_crosstab_report,
-    export_to_csv,
-    export_to_dataframe
+    iter_csv_blocks,
+    export_to_dataframe,
+    code_labels
 )
 from banner_csv_parser import parse_banner_csv, parse_tab_sheet_csv
 from supabase_connector import (
@@ -25,6 +26,13 @@ from supabase_connector import (
     check_api_health
 )
 from excel_formatter import create_professional_excel
+from report_cache import CrosstabReportCache, dataset_fingerprint
+from report_profile import timed_export
+from schema_catalog import schema_catalog
+from dataset_cache import load_survey_csv_cached
+from sav_ingest import load_survey_sav
+from significance import DEFAULT_CONFIDENCE
+from tracker_store import TrackerStore, study_store_dir
 
 # Custom CSS
 css = """
@@ -129,10 +137,10 @@ app_ui = ui.page_navbar(
             ui.h4("1️⃣ Upload SPSS Data"),
             ui.row(
                 ui.column(6,
-                    ui.input_file("codes_file", "Codes.csv (numeric data)", accept=[".csv"])
+                    ui.input_file("codes_file", "Codes.csv or .sav (numeric data)", accept=[".csv", ".sav"])
                 ),
                 ui.column(6,
-                    ui.input_file("labels_file", "Labels.csv (text labels)", accept=[".csv"])
+                    ui.input_file("labels_file", "Labels.csv (text labels, not needed for .sav)", accept=[".csv"])
                 )
             ),
             ui.output_ui("codes_status"),
@@ -192,6 +200,21 @@ app_ui = ui.page_navbar(
                                      class_="btn-secondary w-100", style="padding: 15px; font-size: 16px;")
                 )
             ),
+            ui.row(
+                ui.column(4,
+                    ui.input_numeric("crosstab_workers", "Worker processes (1 = serial)",
+                                     value=1, min=1, max=64)
+                ),
+                ui.column(4,
+                    ui.input_text("weight_column", "Weight column (optional)",
+                                  placeholder="e.g. weight")
+                ),
+                ui.column(4,
+                    ui.input_checkbox("stat_testing", "Stat testing (90% confidence)", value=True),
+                    ui.input_checkbox("cprofile", "Capture cProfile (slower)", value=False),
+                    ui.input_checkbox("tracker_mode", "Tracker: aggregate new records only", value=False)
+                )
+            ),
             class_="upload-section"
         ),
 
@@ -200,6 +223,13 @@ app_ui = ui.page_navbar(
             ui.h4("📊 Results Preview"),
             ui.output_ui("crosstab_results"),
             class_="upload-section"
+        ),
+
+        # Performance profile
+        ui.div(
+            ui.h4("⏱️ Performance Profile"),
+            ui.output_ui("crosstab_profile"),
+            class_="upload-section"
         )
     ),
 
@@ -213,8 +243,18 @@ def server(input, output, session):
     labels_data = reactive.Value(None)
     banner_plan = reactive.Value(None)
     question_types = reactive.Value({})
+    question_nets = reactive.Value({})
+    grid_summaries = reactive.Value({})
     crosstab_report = reactive.Value(None)
     api_connected = reactive.Value(None)
+    codes_fingerprint = reactive.Value(None)
+    codes_catalog = reactive.Value(None)
+    codes_name = reactive.Value(None)
+    codes_ingest = reactive.Value(None)
+    spss_metadata = reactive.Value(None)
+
+    # Session-scoped cache: regenerating only recomputes changed tables/columns
+    report_cache = CrosstabReportCache()
 
     # ========== CROSS-TABS TAB ==========
 
@@ -272,6 +312,8 @@ def server(input, output, session):
                     for q in questions_data:
                         types[q['id']] = q['type']
                     question_types.set(types)
+                    question_nets.set({})
+                    grid_summaries.set({})
                     print(f"SUCCESS: Loaded {len(types)} question types from Supabase")
                 else:
                     print(f"WARNING: No questions data received from API")
@@ -290,7 +332,17 @@ def server(input, output, session):
         file_info = input.codes_file()
         if file_info is not None:
             try:
-                df = pd.read_csv(file_info[0]["datapath"])
+                if file_info[0]["name"].lower().endswith(".sav"):
+                    # Value labels come with the .sav; no labels.csv needed
+                    df, metadata, ingest_report = load_survey_sav(file_info[0]["datapath"])
+                    spss_metadata.set(metadata)
+                else:
+                    df, ingest_report = load_survey_csv_cached(file_info[0]["datapath"])
+                    spss_metadata.set(None)
+                codes_fingerprint.set(dataset_fingerprint(df))
+                codes_catalog.set(schema_catalog(df))
+                codes_name.set(Path(file_info[0]["name"]).stem)
+                codes_ingest.set(ingest_report)
                 codes_data.set(df)
 
                 # Only initialize question types if not already loaded from Supabase/tab sheet
@@ -318,7 +370,7 @@ def server(input, output, session):
         file_info = input.labels_file()
         if file_info is not None:
             try:
-                df = pd.read_csv(file_info[0]["datapath"])
+                df, _ = load_survey_csv_cached(file_info[0]["datapath"])
                 labels_data.set(df)
             except Exception as e:
                 print(f"Error loading labels file: {e}")
@@ -332,9 +384,19 @@ def server(input, output, session):
         status_items = []
 
         if codes_df is not None:
+            ingest = codes_ingest.get() or {}
+            memory_note = ""
+            if ingest:
+                memory_note = (f" ({ingest['memory_before_mb']} MB → {ingest['memory_after_mb']} MB "
+                               f"in memory, {ingest['reduction_pct']}% smaller)")
+                if ingest.get('cache') == 'hit':
+                    memory_note += " — loaded from cache"
+            metadata = spss_metadata.get()
+            if metadata:
+                memory_note += f", value labels for {len(metadata['questions'])} questions"
             status_items.append(
                 ui.div(
-                    f"✅ Codes: {len(codes_df)} respondents × {len(codes_df.columns)} variables",
+                    f"✅ Codes: {len(codes_df)} respondents × {len(codes_df.columns)} variables{memory_note}",
                     class_="status-success"
                 )
             )
@@ -379,14 +441,29 @@ def server(input, output, session):
                 # REPLACE question types with ONLY tab sheet questions
                 # This filters out metadata columns like QualityScore_TOTAL
                 types = {}
+                catalog = codes_catalog.get()
                 for q in questions:
-                    if q['id'] in df.columns:
+                    if q['type'] == 'grid_summary':
+                        continue
+                    if q['id'] in catalog:
                         types[q['id']] = q['type']
+                    elif catalog.has_family(q['id']):
+                        # rNN columns: 0/1 checkboxes (S7r1..S7r98) or a rating grid (Q3r1..Q3r7)
+                        family = catalog.family_columns(q['id'])
+                        is_grid = (df[family].apply(pd.to_numeric, errors='coerce').max().max() or 0) > 1
+                        types[q['id']] = 'likert_grid' if is_grid else 'multi'
                     else:
                         print(f"WARNING: Tab sheet question '{q['id']}' not found in SPSS data")
 
                 if len(types) > 0:
                     question_types.set(types)  # Completely replace, don't merge
+                    question_nets.set({q['id']: q['nets'] for q in questions if q['id'] in types and q.get('nets')})
+                    # TB/T2B/B2B/BB/Mean summary tables, reported after their grid
+                    summaries = {}
+                    for q in questions:
+                        if q['type'] == 'grid_summary' and q['grid'] in types:
+                            summaries.setdefault(q['grid'], []).append(q)
+                    grid_summaries.set(summaries)
                     print(f"SUCCESS: Loaded {len(types)} questions from tab sheet")
                 else:
                     print("ERROR: No matching questions found between tab sheet and SPSS data")
@@ -460,7 +537,7 @@ def server(input, output, session):
                             ui.input_radio_buttons(
                                 f"qtype_{q}",
                                 None,
-                                choices=["categorical", "numeric", "likert"],
+                                choices=["categorical", "numeric", "likert", "likert_grid", "multi"],
                                 selected=types[q],
                                 inline=True
                             )
@@ -478,6 +555,9 @@ def server(input, output, session):
         df = codes_data.get()
         plan = banner_plan.get()
         types = question_types.get()
+        nets = question_nets.get()
+        summaries = grid_summaries.get()
+        metadata = spss_metadata.get() or {}
 
         if df is None or plan is None:
             return
@@ -495,15 +575,49 @@ def server(input, output, session):
                     # UI input doesn't exist yet, use default type
                     pass
 
+                q_metadata = metadata.get('questions', {}).get(q_id, {})
                 questions.append({
                     'id': q_id,
-                    'text': f"Question {q_id}",
+                    'text': q_metadata.get('text', f"Question {q_id}"),
                     'type': q_type
                 })
+                if q_metadata.get('options'):
+                    # Code dictionary labels for the table rows
+                    questions[-1]['code_labels'] = code_labels(q_metadata['options'])
+                if q_id in nets:
+                    # Net rows from the tab sheet's Nets column
+                    questions[-1]['nets'] = nets[q_id]
+                if q_type == 'likert_grid':
+                    questions.extend(summaries.get(q_id, []))
 
             # Generate report
             print(f"Generating cross-tabs for {len(questions)} questions...")
-            report = generate_crosstab_report(df, questions, plan)
+            workers = input.crosstab_workers() or 1
+            weight_column = (input.weight_column() or "").strip() or None
+            sig_confidence = DEFAULT_CONFIDENCE if input.stat_testing() else None
+            if input.tracker_mode():
+                # Fold only records not aggregated yet into this study's per-wave store;
+                # the project ID (else the export name) keeps studies with the same plan apart
+                store_id = (input.project_id() or "").strip() or codes_name.get()
+                store = TrackerStore(store_id, plan, weight_column=weight_column,
+                                     store_dir=study_store_dir(store_id))
+                store.update(df, questions)
+                report = store.report(questions, sig_confidence=sig_confidence)
+            elif int(workers) > 1:
+                report = generate_crosstab_report(df, questions, plan, workers=int(workers),
+                                                  weight_column=weight_column,
+                                                  sig_confidence=sig_confidence,
+                                                  cprofile=input.cprofile(),
+                                                  catalog=codes_catalog.get())
+            else:
+                report = generate_crosstab_report(df, questions, plan, cache=report_cache,
+                                                  fingerprint=codes_fingerprint.get(),
+                                                  weight_column=weight_column,
+                                                  sig_confidence=sig_confidence,
+                                                  cprofile=input.cprofile(),
+                                                  catalog=codes_catalog.get())
+                print(f"INFO: Recomputed {report['metadata']['profile']['table_cache']['misses']} "
+                      f"table columns, rest from cache")
             crosstab_report.set(report)
             print(f"SUCCESS: Generated {len(report['tables'])} tables")
 
@@ -543,13 +657,49 @@ def server(input, output, session):
 
         return ui.div(*preview_tables)
 
+    @output
+    @render.ui
+    def crosstab_profile():
+        report = crosstab_report.get()
+        profile = report['metadata'].get('profile') if report is not None else None
+        if profile is None:
+            return ui.p("Stage timings appear here after generating cross-tabs", class_="text-center text-muted")
+
+        def html_table(rows):
+            return ui.HTML(pd.DataFrame(rows).to_html(index=False, classes="table table-sm table-striped"))
+
+        masks = profile.get('masks', {})
+        summary = (f"Total {profile['total_seconds']:.3f}s with {profile['workers']} worker(s); "
+                   f"{masks.get('evaluations', 0)} banner masks evaluated from "
+                   f"{masks.get('predicates', 0)} predicates, {masks.get('hits', 0)} reused; "
+                   f"{sum(profile['rows_scanned'].values()):,} rows scanned")
+        if 'table_cache' in profile:
+            summary += (f"; table cache {profile['table_cache']['hits']} hits, "
+                        f"{profile['table_cache']['misses']} misses")
+
+        sections = [
+            ui.p(summary),
+            ui.h5("Stages"),
+            html_table([{'stage': name, **stage} for name, stage in profile['stages'].items()]),
+            ui.h5("Question types"),
+            html_table([{'type': name, **totals} for name, totals in profile['question_types'].items()]),
+            ui.h5("Slowest tables"),
+            html_table(profile['slowest_tables']),
+        ]
+        if profile.get('slowest_equations'):
+            sections += [ui.h5("Slowest banner equations"), html_table(profile['slowest_equations'])]
+        if profile.get('cprofile'):
+            sections += [ui.h5("cProfile (cumulative time)"), html_table(profile['cprofile'])]
+
+        return ui.div(*sections)
+
     @session.download(filename="crosstabs.csv")
     def download_csv():
         report = crosstab_report.get()
         if report is not None:
-            csv_str = export_to_csv(report)
-            return csv_str
-        return ""
+            # Stream table blocks as they are formatted instead of one big string;
+            # the formatting time goes to the report profile's export stage
+            yield from timed_export(report, iter_csv_blocks(report))
 
     @session.download(filename="crosstabs.xlsx")
     def download_excel():
@@ -0,0 +1,98 @@
+"""
+Packed Bitset Masks
+Banner membership stored as packed uint64 words
+
+One bit per respondent instead of one byte, so resident masks take 1/8 of the
+memory of bool arrays, and AND/OR/NOT of masks run 64 respondents per word
+operation. Bases come from a popcount over the words.
+"""
+
+import numpy as np
+
+# Bits set per byte value, used when numpy lacks bitwise_count (numpy < 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+class PackedMask:
+    """Immutable bitset over n_rows respondents"""
+
+    __slots__ = ('words', 'n_rows')
+
+    def __init__(self, words: np.ndarray, n_rows: int):
+        words.setflags(write=False)
+        self.words = words
+        self.n_rows = n_rows
+
+    @staticmethod
+    def n_words(n_rows: int) -> int:
+        return (n_rows + 63) // 64
+
+    @classmethod
+    def from_bool(cls, mask: np.ndarray) -> 'PackedMask':
+        """Pack a boolean array (bit i = row i, little-endian within each word)"""
+        mask = np.asarray(mask, dtype=bool)
+        n_rows = len(mask)
+        packed = np.packbits(mask, bitorder='little')
+        padded = np.zeros(cls.n_words(n_rows) * 8, dtype=np.uint8)
+        padded[:len(packed)] = packed
+        return cls(padded.view(np.uint64), n_rows)
+
+    @classmethod
+    def ones(cls, n_rows: int) -> 'PackedMask':
+        return cls.from_bool(np.ones(n_rows, dtype=bool))
+
+    @classmethod
+    def zeros(cls, n_rows: int) -> 'PackedMask':
+        return cls(np.zeros(cls.n_words(n_rows), dtype=np.uint64), n_rows)
+
+    def to_bool(self) -> np.ndarray:
+        """Unpack to a boolean array of length n_rows"""
+        return np.unpackbits(self.words.view(np.uint8), count=self.n_rows, bitorder='little').astype(bool)
+
+    def count(self) -> int:
+        """Number of set bits (the base of the banner column)"""
+        return _popcount(self.words)
+
+    def any(self) -> bool:
+        return bool(self.words.any())
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    def _check(self, other: 'PackedMask') -> None:
+        if self.n_rows != other.n_rows:
+            raise ValueError(f"Mask lengths differ: {self.n_rows} vs {other.n_rows}")
+
+    def __and__(self, other: 'PackedMask') -> 'PackedMask':
+        self._check(other)
+        return PackedMask(np.bitwise_and(self.words, other.words), self.n_rows)
+
+    def __or__(self, other: 'PackedMask') -> 'PackedMask':
+        self._check(other)
+        return PackedMask(np.bitwise_or(self.words, other.words), self.n_rows)
+
+    def __invert__(self) -> 'PackedMask':
+        words = np.invert(self.words)
+        # Clear the padding bits past n_rows so counts stay exact
+        tail = self.n_rows % 64
+        if tail:
+            words[-1] &= np.uint64((1 << tail) - 1)
+        return PackedMask(words, self.n_rows)
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, PackedMask) and self.n_rows == other.n_rows
+                and np.array_equal(self.words, other.words))
+
+    def __hash__(self) -> int:
+        # words are read-only, so a mask's hash never changes
+        return hash((self.n_rows, self.words.tobytes()))
+
+    def __repr__(self) -> str:
+        return f"PackedMask(n_rows={self.n_rows}, count={self.count()})"
@@ -0,0 +1,187 @@
+"""
+Parallel Cross-Tab Report Generation
+Fans question tables out to a process pool over a shared-memory dataset
+
+The parent evaluates the banner masks once, then places the question columns
+and the mask matrix in multiprocessing.shared_memory. Each worker attaches to
+those segments a single time (pool initializer), rebuilds a zero-copy
+DataFrame over them, and builds tables with the same code as the serial path,
+so the output is identical to generate_crosstab_report(..., workers=None).
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banner_masks import BannerMaskStore
+from crosstab_engine import build_crosstab_table, question_data_columns
+from report_profile import ReportProfiler
+
+
+class SharedDataset:
+    """
+    Owns the shared-memory segments for one parallel report
+
+    Numeric NumPy columns, nullable (masked) extension columns and category
+    codes go into shared memory; anything else (text, timezone-aware dates)
+    travels pickled in the worker spec.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: List[str], mask_matrix: np.ndarray):
+        self._segments: List[shared_memory.SharedMemory] = []
+        self.spec = {
+            'n_rows': len(df),
+            'columns': [self._put_column(df[col]) | {'name': col} for col in columns],
+            'masks': self._put(np.ascontiguousarray(mask_matrix)),
+        }
+
+    def _put(self, array: np.ndarray) -> Dict:
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._segments.append(segment)
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+        view[...] = array
+        return {'shm': segment.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+    def _put_column(self, series: pd.Series) -> Dict:
+        dtype = series.dtype
+
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biufmM':
+            return {'kind': 'numpy', 'data': self._put(series.to_numpy())}
+
+        if isinstance(series.array, pd.arrays.IntegerArray) or isinstance(series.array, pd.arrays.FloatingArray) \
+                or isinstance(series.array, pd.arrays.BooleanArray):
+            # Nullable dtypes (Int8, Float32, boolean) are a values array plus a NA mask
+            return {
+                'kind': 'masked',
+                'dtype': str(dtype),
+                'data': self._put(series.array._data),
+                'mask': self._put(series.array._mask),
+            }
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            return {
+                'kind': 'categorical',
+                'codes': self._put(series.cat.codes.to_numpy()),
+                'categories': dtype.categories,
+                'ordered': dtype.ordered,
+            }
+
+        return {'kind': 'pickled', 'series': series.reset_index(drop=True)}
+
+    def close(self) -> None:
+        """Release and unlink every segment"""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+
+# ========== Worker side ==========
+
+_worker_state: Dict = {}
+
+
+def _attach(info: Dict) -> np.ndarray:
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not make the segment outlive (or die with) this worker
+    segment = shared_memory.SharedMemory(name=info['shm'])
+    _worker_state.setdefault('segments', []).append(segment)
+    return np.ndarray(info['shape'], dtype=np.dtype(info['dtype']), buffer=segment.buf)
+
+
+def _rebuild_column(info: Dict) -> pd.Series:
+    kind = info['kind']
+
+    if kind == 'numpy':
+        return pd.Series(_attach(info['data']), copy=False)
+
+    if kind == 'masked':
+        dtype = pd.api.types.pandas_dtype(info['dtype'])
+        array = dtype.construct_array_type()(_attach(info['data']), _attach(info['mask']), copy=False)
+        return pd.Series(array, copy=False)
+
+    if kind == 'categorical':
+        codes = _attach(info['codes'])
+        return pd.Series(pd.Categorical.from_codes(codes, categories=info['categories'], ordered=info['ordered']))
+
+    return info['series']
+
+
+def _init_worker(spec: Dict, banner_columns: List[Dict], weight_column: Optional[str]) -> None:
+    """Pool initializer: attach to the shared dataset once per worker"""
+    df = pd.DataFrame({info['name']: _rebuild_column(info) for info in spec['columns']}, copy=False)
+    if not spec['columns']:
+        df = pd.DataFrame(index=pd.RangeIndex(spec['n_rows']))
+
+    masks = BannerMaskStore(df)
+    masks.seed(banner_columns, _attach(spec['masks']))
+
+    _worker_state.update(df=df, masks=masks, banner_columns=banner_columns, weight_column=weight_column, grids={})
+
+
+def _build_chunk(questions: List[Dict]) -> List[Tuple[Dict, float]]:
+    """(table, seconds) for each question of a task"""
+    state = _worker_state
+    results = []
+    for q in questions:
+        start = time.perf_counter()
+        table = build_crosstab_table(state['df'], q, state['banner_columns'], state['masks'], state['weight_column'],
+                                     state['grids'])
+        results.append((table, time.perf_counter() - start))
+    return results
+
+
+# ========== Parent side ==========
+
+def build_tables_parallel(df: pd.DataFrame, questions: List[Dict], banner_columns: List[Dict],
+                          masks: BannerMaskStore, workers: int,
+                          chunksize: Optional[int] = None,
+                          weight_column: Optional[str] = None,
+                          profiler: Optional[ReportProfiler] = None) -> List[Dict]:
+    """
+    Build question tables on a process pool
+
+    Args:
+        df: SPSS data
+        questions: List of question definitions with type info
+        banner_columns: Flattened banner columns
+        masks: Mask store of the parent (masks are evaluated here, once)
+        workers: Number of worker processes
+        chunksize: Questions per task; defaults to about four tasks per worker
+        weight_column: Respondent weight column (None = unweighted)
+        profiler: Records each table's worker-side build time
+
+    Returns:
+        Tables in question order. Each worker keeps its own grid tensor
+        cache, so a grid whose summary tables land on several workers is
+        tabulated once per worker.
+    """
+    needed = list(dict.fromkeys(col for q in questions for col in question_data_columns(q, masks.catalog)))
+    if weight_column and weight_column not in needed:
+        needed.append(weight_column)
+
+    mask_matrix = masks.matrix(banner_columns)
+    chunksize = chunksize or max(1, math.ceil(len(questions) / (workers * 4)))
+    chunks = [questions[i:i + chunksize] for i in range(0, len(questions), chunksize)]
+
+    if profiler is not None:
+        profiler.workers = workers
+    shared = SharedDataset(df, needed, mask_matrix)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec, banner_columns, weight_column)) as pool:
+            tables = []
+            for chunk_tables in pool.map(_build_chunk, chunks):
+                for table, seconds in chunk_tables:
+                    tables.append(table)
+                    if profiler is not None:
+                        profiler.record_table(table['question_id'], table['question_type'], seconds, len(df))
+    finally:
+        shared.close()
+
+    return tables
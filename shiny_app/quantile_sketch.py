@@ -0,0 +1,148 @@
+"""
+Quantile Sketch
+Log-bucket (DDSketch-style) quantile sketch for very large numeric questions
+
+Every value is mapped to a bucket whose bounds grow geometrically, so a value
+is represented within a fixed relative accuracy (1% by default) no matter its
+magnitude. Bucketing is a vectorized log per value instead of a sort, and
+bucket counts are plain integers that can be bincounted per banner column and
+added across data chunks.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+def _gamma(relative_accuracy: float) -> float:
+    if not 0 < relative_accuracy < 1:
+        raise ValueError("relative_accuracy must be between 0 and 1")
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+
+def bucket_keys(magnitudes: np.ndarray, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> np.ndarray:
+    """Bucket key ceil(log_gamma(m)) of positive magnitudes"""
+    return np.ceil(np.log(magnitudes) / math.log(_gamma(relative_accuracy))).astype(np.int64)
+
+
+def bucket_values(keys: np.ndarray, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> np.ndarray:
+    """Representative magnitude of each bucket (relative error <= relative_accuracy)"""
+    gamma = _gamma(relative_accuracy)
+    return 2 * np.power(gamma, keys.astype(np.float64)) / (gamma + 1)
+
+
+def bucket_codes(values: np.ndarray,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode values as dense, order-preserving bucket codes
+
+    Negative values, zero and positive values share one code range (most
+    negative bucket first), so the codes can go straight into
+    crosstab_kernels.count_matrix and cumulative counts give quantiles.
+
+    Args:
+        values: float64 values (NaN = missing)
+        relative_accuracy: Relative accuracy of the representatives
+
+    Returns:
+        (codes, representatives): codes[i] indexes representatives, -1 marks a
+        missing value; representatives are ascending
+    """
+    codes = np.full(len(values), -1, dtype=np.int64)
+    positive = values > 0
+    negative = values < 0
+
+    pos_keys = bucket_keys(values[positive], relative_accuracy)
+    neg_keys = bucket_keys(-values[negative], relative_accuracy)
+    pos_min, pos_max = (pos_keys.min(), pos_keys.max()) if len(pos_keys) else (0, -1)
+    neg_min, neg_max = (neg_keys.min(), neg_keys.max()) if len(neg_keys) else (0, -1)
+
+    n_neg = neg_max - neg_min + 1
+    codes[negative] = neg_max - neg_keys
+    codes[values == 0] = n_neg
+    codes[positive] = n_neg + 1 + (pos_keys - pos_min)
+
+    representatives = np.concatenate([
+        -bucket_values(np.arange(neg_max, neg_min - 1, -1), relative_accuracy),
+        [0.0],
+        bucket_values(np.arange(pos_min, pos_max + 1), relative_accuracy),
+    ])
+    return codes, representatives
+
+
+class ColumnSketches:
+    """
+    Mergeable quantile sketches of one question in every banner column
+
+    Buckets are identified by a signed id that orders them like their values
+    (negative buckets below zero below positive ones), and the sketch holds a
+    (n_columns x n_buckets) count matrix, so a data chunk is added to all
+    banner columns with one bincount.
+    """
+
+    # Keys of float64 magnitudes stay well inside +/-2**20 at any accuracy used here
+    _KEY_OFFSET = 1 << 20
+
+    def __init__(self, n_columns: int, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros((n_columns, 0), dtype=np.float64)
+
+    def _bucket_ids(self, values: np.ndarray) -> np.ndarray:
+        ids = np.zeros(len(values), dtype=np.int64)
+        positive, negative = values > 0, values < 0
+        ids[positive] = bucket_keys(values[positive], self.relative_accuracy) + self._KEY_OFFSET
+        ids[negative] = -(bucket_keys(-values[negative], self.relative_accuracy) + self._KEY_OFFSET)
+        return ids
+
+    def _id_values(self, ids: np.ndarray) -> np.ndarray:
+        magnitudes = bucket_values(np.abs(ids) - self._KEY_OFFSET, self.relative_accuracy)
+        return np.where(ids > 0, magnitudes, np.where(ids < 0, -magnitudes, 0.0))
+
+    def _add_counts(self, ids: np.ndarray, counts: np.ndarray) -> None:
+        merged = np.union1d(self.ids, ids)
+        combined = np.zeros((self.counts.shape[0], len(merged)))
+        combined[:, np.searchsorted(merged, self.ids)] += self.counts
+        combined[:, np.searchsorted(merged, ids)] += counts
+        self.ids, self.counts = merged, combined
+
+    def add(self, values: np.ndarray, mask_matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        """
+        Add one chunk of values to every banner column
+
+        Args:
+            values: float64 values (NaN = missing)
+            mask_matrix: (n_rows x n_columns) boolean banner membership
+            weights: Optional weight per respondent
+        """
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        ids, codes = np.unique(self._bucket_ids(values[valid]), return_inverse=True)
+
+        rows, cols = np.nonzero(mask_matrix[valid])
+        flat = np.bincount(cols * len(ids) + codes[rows],
+                           weights=None if weights is None else weights[valid][rows],
+                           minlength=mask_matrix.shape[1] * len(ids))
+        self._add_counts(ids, flat.reshape(mask_matrix.shape[1], len(ids)).astype(np.float64))
+
+    def merge(self, other: 'ColumnSketches') -> 'ColumnSketches':
+        """Add another set of sketches (same banner columns) into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self._add_counts(other.ids, other.counts)
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Approximate q-quantile of every column (NaN where a column is empty)"""
+        if not len(self.ids):
+            return np.full(self.counts.shape[0], np.nan)
+
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1]
+        # First bucket whose cumulative weight reaches q of the column total
+        result = self._id_values(self.ids)[np.argmax(cumulative >= (totals * q)[:, None], axis=1)]
+        return np.where(totals > 0, result, np.nan)
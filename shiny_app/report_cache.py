@@ -0,0 +1,156 @@
+"""
+Incremental Cross-Tab Report Cache
+Recomputes only the tables and banner columns whose inputs changed
+
+Every table cell block is keyed by (dataset fingerprint, question definition,
+banner column equation). When an analyst flips one question's type or edits
+one banner column, regenerating the report only computes the affected
+question/column pairs and splices the cached rest back in.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banner_masks import BannerMaskStore
+from schema_catalog import SchemaCatalog
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a dataset (shape, column names, dtypes and every value)
+
+    Compute it once when the data is loaded and pass it along; hashing a large
+    dataset takes a full pass over the data.
+
+    Args:
+        df: Dataset
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((df.shape, df.columns.tolist(), [str(t) for t in df.dtypes])).encode())
+    if len(df.columns) and len(df):
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def question_key(q: Dict) -> Tuple:
+    """Everything in a question definition that affects its numbers (not its text)"""
+    return tuple(sorted(
+        (k, repr(v)) for k, v in q.items() if k not in ('text', 'sub_title', 'code_labels')
+    ))
+
+
+class CrosstabReportCache:
+    """
+    Memoizes per-column table statistics across report runs
+
+    Keep one instance per session; pass it to generate_crosstab_report along
+    with the dataset fingerprint. Each entry is a column's cell plus, for
+    categorical and multi-response questions, the question's code dictionary
+    and the codes that column reports, so a table's code rows are rebuilt
+    from arrays rather than from the cells.
+    """
+
+    def __init__(self, max_entries: int = 200_000, max_datasets: int = 2):
+        self.max_entries = max_entries
+        self.max_datasets = max_datasets
+        self._entries: 'OrderedDict[Tuple, Tuple]' = OrderedDict()
+        self._mask_stores: 'OrderedDict[str, BannerMaskStore]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def mask_store(self, df: pd.DataFrame, fingerprint: str,
+                   catalog: Optional[SchemaCatalog] = None) -> BannerMaskStore:
+        """
+        Mask store that survives between runs on the same dataset
+
+        Editing one banner column then evaluates only that column's equation.
+        """
+        store = self._mask_stores.get(fingerprint)
+        if store is None:
+            store = BannerMaskStore(df, catalog)
+            self._mask_stores[fingerprint] = store
+            while len(self._mask_stores) > self.max_datasets:
+                self._mask_stores.popitem(last=False)
+        else:
+            self._mask_stores.move_to_end(fingerprint)
+        return store
+
+    def build_table(self, df: pd.DataFrame, q: Dict, banner_columns: List[Dict],
+                    masks: BannerMaskStore, fingerprint: str,
+                    weight_column: Optional[str] = None,
+                    grids: Optional[Dict] = None) -> Dict:
+        """
+        Build a question table, computing only the banner columns not cached
+
+        Args:
+            df: SPSS data
+            q: Question definition with type info
+            banner_columns: Flattened banner columns
+            masks: Mask store for df
+            fingerprint: dataset_fingerprint(df)
+            weight_column: Respondent weight column (None = unweighted)
+            grids: Report-scoped grid tensor cache (see build_crosstab_table)
+
+        Returns:
+            Table dictionary, identical to crosstab_engine.build_crosstab_table
+        """
+        from crosstab_engine import CodeDictionary, question_stats, table_code_fields
+
+        q_key = (question_key(q), weight_column)
+        keys = [(fingerprint, q_key, BannerMaskStore._key(col['equation'])) for col in banner_columns]
+
+        missing = []
+        seen = set()
+        for col, key in zip(banner_columns, keys):
+            if key not in self._entries and key not in seen:
+                missing.append(col)
+                seen.add(key)
+
+        if missing:
+            computed, dictionary = question_stats(df, q, missing, masks, weight_column, grids)
+            for idx, col in enumerate(missing):
+                key = (fingerprint, q_key, BannerMaskStore._key(col['equation']))
+                if dictionary is None:
+                    self._entries[key] = (computed[col['id']], None, None)
+                else:
+                    self._entries[key] = (computed[col['id']], dictionary.codes, dictionary.reported[idx])
+            self.misses += len(missing)
+
+        data = {}
+        codes, reported = None, []
+        for col, key in zip(banner_columns, keys):
+            cell, codes, column_reported = self._entries[key]
+            self._entries.move_to_end(key)
+            data[col['id']] = {**cell, 'name': col['name'], 'equation': col['equation']}
+            reported.append(column_reported)
+        self.hits += len(banner_columns) - len(missing)
+        # Every entry of one question and dataset shares the same code dictionary
+        dictionary = CodeDictionary(codes, np.vstack(reported)) if codes is not None else None
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        question_type = q.get('type', 'categorical')
+        return {
+            'question_id': q['id'],
+            'question_text': q.get('text', q['id']),
+            'question_type': question_type,
+            'data': data,
+            **table_code_fields(q, dictionary)
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._mask_stores.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
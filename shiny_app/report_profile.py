@@ -0,0 +1,180 @@
+"""
+Cross-Tab Report Profiling
+Per-stage wall times and counters recorded into report['metadata']['profile']
+
+Every report records how long each stage took (equation parsing, mask
+evaluation, table stats, significance, CSV export), time and table counts per
+question type, the slowest tables and banner equations, mask and table cache
+hits, and rows scanned. Timing uses perf_counter around whole stages and
+tables, so it is cheap enough to leave on. Optionally the run is also
+captured with cProfile and the top functions are stored alongside.
+"""
+
+import cProfile
+import pstats
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Slowest tables / equations / functions kept in the profile
+DEFAULT_TOP = 10
+CPROFILE_TOP = 25
+
+
+class ReportProfiler:
+    """Collects stage timings and counters for one report run"""
+
+    def __init__(self, cprofile: bool = False):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.question_types: Dict[str, Dict] = {}
+        self.tables: List[Dict] = []
+        self.rows_scanned: Dict[str, int] = {}
+        self.counters: Dict[str, Any] = {}
+        self.workers = 1
+        self._masks = None
+        self._cprofile = cProfile.Profile() if cprofile else None
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def track_masks(self, masks) -> None:
+        """
+        Count mask evaluations from here on
+
+        A cached BannerMaskStore outlives a single report, so its counters and
+        equation timings are recorded relative to this point.
+        """
+        self._masks = (masks, masks.evaluations, masks.hits, masks.predicates, masks.shared, set(masks.eval_seconds))
+
+    def add_stage(self, name: str, seconds: float, calls: int = 1) -> None:
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        stage['seconds'] += seconds
+        stage['calls'] += calls
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block as (part of) a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def record_table(self, question_id: str, question_type: str, seconds: float, rows_scanned: int = 0) -> None:
+        """Time of one question table (rows_scanned = 0 when it came from a cache)"""
+        totals = self.question_types.setdefault(question_type, {'tables': 0, 'seconds': 0.0})
+        totals['tables'] += 1
+        totals['seconds'] += seconds
+        self.tables.append({'question_id': question_id, 'question_type': question_type, 'seconds': seconds})
+        self.scan('tables', rows_scanned)
+
+    def scan(self, name: str, rows: int) -> None:
+        self.rows_scanned[name] = self.rows_scanned.get(name, 0) + int(rows)
+
+    def finish(self, top: int = DEFAULT_TOP) -> Dict:
+        """
+        Stop timing and build the profile dict
+
+        Args:
+            top: Number of slowest tables / equations to keep
+
+        Returns:
+            JSON-serializable profile
+        """
+        profile = {
+            'total_seconds': round(time.perf_counter() - self.started, 6),
+            'stages': {name: {'seconds': round(s['seconds'], 6), 'calls': s['calls']}
+                       for name, s in self.stages.items()},
+            'question_types': {name: {'tables': t['tables'], 'seconds': round(t['seconds'], 6)}
+                               for name, t in self.question_types.items()},
+            'slowest_tables': [
+                {**t, 'seconds': round(t['seconds'], 6)}
+                for t in sorted(self.tables, key=lambda t: t['seconds'], reverse=True)[:top]
+            ],
+            'rows_scanned': dict(self.rows_scanned),
+            'workers': self.workers,
+            **self.counters,
+        }
+
+        if self._masks is not None:
+            masks, evaluations, hits, predicates, shared, seen = self._masks
+            evaluated = [e for e in masks.eval_seconds if e not in seen]
+            profile['masks'] = {
+                'evaluations': masks.evaluations - evaluations,
+                'hits': masks.hits - hits,
+                'predicates': masks.predicates - predicates,
+                'shared_subexpressions': masks.shared - shared,
+                'stored': len(masks),
+                'packed_bytes': masks.nbytes,
+                'checkbox_families': len(masks.families),
+                'checkbox_family_bytes': masks.families.nbytes,
+                'parse_seconds': round(sum(masks.parse_seconds[e] for e in evaluated), 6),
+                'eval_seconds': round(sum(masks.eval_seconds[e] for e in evaluated), 6),
+            }
+            # Only atomic predicates read the data; everything else is mask algebra
+            profile['rows_scanned']['masks'] = profile['masks']['predicates'] * masks.n_rows
+            equations = sorted(evaluated, key=lambda e: masks.eval_seconds[e], reverse=True)[:top]
+            profile['slowest_equations'] = [
+                {'equation': equation,
+                 'parse_seconds': round(masks.parse_seconds.get(equation, 0.0), 6),
+                 'eval_seconds': round(masks.eval_seconds[equation], 6)}
+                for equation in equations
+            ]
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            profile['cprofile'] = cprofile_summary(self._cprofile)
+            self._cprofile = None
+
+        return profile
+
+
+def cprofile_summary(profiler: cProfile.Profile, top: int = CPROFILE_TOP) -> List[Dict]:
+    """Top functions by cumulative time, as plain dicts"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f"{filename}:{line}({function})",
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        })
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:top]
+
+
+def record_export_time(report: Dict, seconds: float) -> None:
+    """Record the latest export's time in a finished report's profile, if it has one"""
+    profile: Optional[Dict] = report.get('metadata', {}).get('profile')
+    if profile is not None:
+        profile['stages']['export'] = {'seconds': round(seconds, 6), 'calls': 1}
+
+
+def timed_export(report: Dict, blocks: Iterator[str]) -> Iterator[str]:
+    """
+    Pass export blocks through, recording the time spent formatting them
+
+    Time the consumer spends between blocks (e.g. a slow download) is not
+    counted. The time is recorded when the export finishes or is abandoned,
+    and replaces the previous export's, so repeat downloads do not add up.
+
+    Args:
+        report: Report being exported
+        blocks: Export blocks, e.g. crosstab_engine.iter_csv_blocks(report)
+
+    Yields:
+        The blocks unchanged
+    """
+    blocks = iter(blocks)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            block = next(blocks, None)
+            elapsed += time.perf_counter() - start
+            if block is None:
+                return
+            yield block
+    finally:
+        record_export_time(report, elapsed)
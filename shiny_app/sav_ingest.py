@@ -0,0 +1,323 @@
+"""
+SPSS .sav Ingest
+Reads a .sav file in row chunks into compact codes plus label metadata
+
+A .sav file already carries the numeric codes and their value labels, so the
+separate Codes.csv / labels.csv exports (and the labels DataFrame held next to
+the codes) are not needed. Rows are read in chunks and downcast as they
+arrive, so the full float64 frame never exists in memory. Value and variable
+labels are extracted into the same structure as the web app's SPSS metadata
+file (apps/web/examples/SPSS/example_metadata.json).
+
+Requires pyreadstat.
+"""
+
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_ingest import (
+    CATEGORY_MAX_RATIO, DEFAULT_DATE_COLUMNS, _downcast_numeric, integer_dtype, memory_usage_mb
+)
+from schema_catalog import OPTION_PATTERN, schema_catalog
+
+try:
+    import pyreadstat
+except ImportError:
+    pyreadstat = None
+
+METADATA_VERSION = '1.0'
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Value labels that mean "this checkbox was ticked" rather than naming an option
+_CHECKBOX_LABELS = {'checked', 'selected', 'yes', 'unchecked', 'not selected', 'no'}
+
+
+def _code_str(code) -> str:
+    """Value label keys come back as floats (1.0); metadata codes are '1'"""
+    if isinstance(code, float) and code.is_integer():
+        return str(int(code))
+    return str(code)
+
+
+def _options(value_labels: Dict) -> List[Dict]:
+    return [
+        {'code': _code_str(code), 'label': str(label), 'orderIndex': idx}
+        for idx, (code, label) in enumerate(value_labels.items())
+    ]
+
+
+def _common_affixes(labels: List[str]) -> Tuple[str, str]:
+    """Longest prefix and suffix shared by every label of a family"""
+    if len(labels) < 2:
+        return '', ''
+    prefix = os.path.commonprefix(labels)
+    suffix = os.path.commonprefix([label[::-1] for label in labels])[::-1]
+    return prefix, suffix
+
+
+def _row_labels(columns: List[str], variable_labels: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Split the variable labels of an rNN family into question text and row labels
+
+    Decipher labels family columns like "S7r1: Day Acuvue Moist - Which brand
+    ...?"; the part every column shares is the question, the rest is the row.
+    """
+    stripped = {}
+    for col in columns:
+        label = variable_labels.get(col) or ''
+        stripped[col] = re.sub(rf'^{re.escape(col)}\s*[:.-]\s*', '', label).strip()
+
+    prefix, suffix = _common_affixes(list(stripped.values()))
+    rows = {}
+    if len(suffix) >= len(prefix):
+        question_text = suffix
+        for col, label in stripped.items():
+            rows[col] = label[:len(label) - len(suffix)]
+    else:
+        question_text = prefix
+        for col, label in stripped.items():
+            rows[col] = label[len(prefix):]
+
+    question_text = question_text.strip(' -:')
+    rows = {col: row.strip(' -:') or col for col, row in rows.items()}
+    return question_text, rows
+
+
+def _is_checkbox(value_labels: Dict) -> bool:
+    if not value_labels:
+        return True
+    codes = {_code_str(code) for code in value_labels}
+    labels = {str(label).strip().lower() for label in value_labels.values()}
+    return codes <= {'0', '1'} and labels <= _CHECKBOX_LABELS
+
+
+def build_spss_metadata(columns: List[str], variable_labels: Dict[str, str],
+                        value_labels: Dict[str, Dict], project_id: Optional[str] = None) -> Dict:
+    """
+    Build web-app style SPSS metadata from .sav variable and value labels
+
+    Single columns with value labels become 'single' questions whose options are
+    the value labels. rNN families become 'multi' questions (0/1 checkboxes,
+    options are the rows) or 'grid_single' questions (shared scale, options
+    are the scale points); every family column gets a columnMappings entry.
+
+    Args:
+        columns: Column names in file order (or DataFrame.columns, whose
+            schema catalog is then shared with the rest of the app)
+        variable_labels: Column name -> variable label
+        value_labels: Column name -> {code: label}
+        project_id: Stored as projectId when known
+
+    Returns:
+        Metadata dict with version, generatedAt, projectId, questions and
+        columnMappings
+    """
+    catalog = schema_catalog(columns)
+    families: Dict[str, List[str]] = {}
+    for col in columns:
+        option = OPTION_PATTERN.match(col)
+        base = option.group('base') if option else None
+        # If the base is itself a column, the rNN columns are not its options
+        if base is not None and base not in families and base not in catalog:
+            # Options in file order, as the survey lists them (S2r99 may precede S2r98)
+            families[base] = sorted(catalog.family_columns(base), key=catalog.position)
+
+    metadata = {
+        'version': METADATA_VERSION,
+        'generatedAt': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'projectId': project_id,
+        'questions': {},
+        'columnMappings': {},
+    }
+
+    in_family = set()
+    for base, family in families.items():
+        if len(family) < 2:
+            continue
+        in_family.update(family)
+
+        question_text, rows = _row_labels(family, variable_labels)
+        scale = value_labels.get(family[0], {})
+        mode = 'multi' if _is_checkbox(scale) else 'grid_single'
+
+        if mode == 'multi':
+            options = [
+                {'code': OPTION_PATTERN.match(col).group('code'), 'label': rows[col], 'orderIndex': idx}
+                for idx, col in enumerate(family)
+            ]
+        else:
+            options = _options(scale)
+
+        metadata['questions'][base] = {
+            'id': base,
+            'text': question_text or base,
+            'mode': mode,
+            'type': mode,
+            'options': options,
+        }
+        for col in family:
+            metadata['columnMappings'][col] = {
+                'questionId': base,
+                'questionText': question_text or base,
+                'optionCode': OPTION_PATTERN.match(col).group('code'),
+                'optionLabel': rows[col],
+                'questionMode': mode,
+            }
+
+    for col in columns:
+        if col in in_family or not value_labels.get(col):
+            continue
+        text = re.sub(rf'^{re.escape(col)}\s*[:.-]\s*', '', variable_labels.get(col) or '').strip()
+        metadata['questions'][col] = {
+            'id': col,
+            'text': text or col,
+            'mode': 'single',
+            'type': 'single',
+            'options': _options(value_labels[col]),
+        }
+
+    return metadata
+
+
+def _observe_chunk(chunk: pd.DataFrame, stats: Dict[str, Dict], date_columns: List[str]) -> pd.DataFrame:
+    """
+    Downcast one chunk provisionally and fold its column statistics into stats
+
+    The statistics (integral or not, min/max and missing answers of numbers;
+    distinct values of text; how many cells of a date column parse) are what
+    compact_dtypes decides from, so the final dtypes can be settled once all
+    chunks are read (see _settled_chunks) without widening and re-scanning
+    the concatenated frame.
+    """
+    compact = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        col_stats = stats.setdefault(col, {'kind': 'keep'})
+
+        if col in date_columns and not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            parsed = pd.to_datetime(series, errors='coerce')
+            col_stats['kind'] = 'date'
+            col_stats['parsed'] = col_stats.get('parsed', 0) + int(parsed.notna().sum())
+            col_stats['non_missing'] = col_stats.get('non_missing', 0) + int(series.notna().sum())
+            col_stats.setdefault('parsed_chunks', []).append(parsed)
+            compact[col] = series
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            compact[col] = series
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy(dtype=float, na_value=np.nan)
+            present = ~np.isnan(values)
+            observed = values[present]
+            col_stats['kind'] = 'number'
+            col_stats['integral'] = col_stats.get('integral', True) and bool(np.all(np.mod(observed, 1) == 0))
+            if len(observed):
+                col_stats['low'] = min(col_stats.get('low', np.inf), observed.min())
+                col_stats['high'] = max(col_stats.get('high', -np.inf), observed.max())
+            col_stats['missing'] = col_stats.get('missing', False) or not present.all()
+            col_stats.setdefault('dtype', series.dtype)
+            compact[col] = _downcast_numeric(series)
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            col_stats['kind'] = 'text'
+            col_stats.setdefault('values', set()).update(series.dropna().unique().tolist())
+            col_stats['non_missing'] = col_stats.get('non_missing', 0) + int(series.notna().sum())
+            compact[col] = series
+        else:
+            compact[col] = series
+
+    return pd.DataFrame(compact, index=chunk.index)
+
+
+def _settled_dtype(col_stats: Dict):
+    """Final dtype of a column from the statistics of all chunks (None = leave as read)"""
+    if col_stats['kind'] == 'number':
+        if not col_stats['integral']:
+            return col_stats['dtype']
+        return integer_dtype(col_stats.get('low', 0), col_stats.get('high', 0), col_stats['missing'])
+    if col_stats['kind'] == 'text':
+        values = col_stats['values']
+        if col_stats['non_missing'] and len(values) / col_stats['non_missing'] <= CATEGORY_MAX_RATIO:
+            try:
+                categories = sorted(values)
+            except TypeError:
+                categories = list(values)
+            return pd.CategoricalDtype(categories)
+    return None
+
+
+def _settled_chunks(chunks: List[pd.DataFrame], stats: Dict[str, Dict]) -> List[pd.DataFrame]:
+    """Cast every chunk to the settled dtypes in place, so concat keeps them"""
+    dtypes = {col: _settled_dtype(col_stats) for col, col_stats in stats.items()}
+    dtypes = {col: dtype for col, dtype in dtypes.items() if dtype is not None}
+    dates = {col: col_stats['parsed_chunks'] for col, col_stats in stats.items()
+             if col_stats['kind'] == 'date' and col_stats['parsed'] >= col_stats['non_missing'] * 0.9}
+
+    for idx, chunk in enumerate(chunks):
+        settled = chunk.astype(dtypes) if dtypes else chunk
+        for col, parsed_chunks in dates.items():
+            # Keep the original if it did not look like dates at all
+            settled[col] = parsed_chunks[idx]
+        chunks[idx] = settled
+    return chunks
+
+
+def load_survey_sav(path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    date_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict, Dict]:
+    """
+    Read a .sav file in row chunks into compact dtypes, plus label metadata
+
+    Args:
+        path: Path to the .sav file
+        chunk_rows: Rows per chunk
+        date_columns: Columns to parse as datetimes (defaults to DEFAULT_DATE_COLUMNS)
+
+    Returns:
+        (df, metadata, ingest_report); df holds codes only, metadata is shaped
+        like example_metadata.json, ingest_report matches load_survey_csv
+    """
+    if pyreadstat is None:
+        raise ImportError("pyreadstat is required to read .sav files (pip install pyreadstat)")
+
+    _, meta = pyreadstat.read_sav(str(path), metadataonly=True)
+
+    date_columns = DEFAULT_DATE_COLUMNS if date_columns is None else date_columns
+    chunks = []
+    stats: Dict[str, Dict] = {}
+    memory_before = 0.0
+    for chunk, _ in pyreadstat.read_file_in_chunks(pyreadstat.read_sav, str(path), chunksize=chunk_rows):
+        memory_before += memory_usage_mb(chunk)
+        # Downcast as chunks arrive; dtypes are settled across chunks before the single concat
+        chunks.append(_observe_chunk(chunk, stats, date_columns))
+
+    if chunks:
+        df = pd.concat(_settled_chunks(chunks, stats), ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=meta.column_names)
+    memory_after = memory_usage_mb(df)
+
+    metadata = build_spss_metadata(
+        df.columns,
+        dict(zip(meta.column_names, meta.column_labels)),
+        meta.variable_value_labels,
+    )
+
+    report = {
+        'rows': len(df),
+        'columns': len(df.columns),
+        'memory_before_mb': round(float(memory_before), 2),
+        'memory_after_mb': round(float(memory_after), 2),
+        'reduction_pct': round(float(1 - memory_after / memory_before) * 100, 1) if memory_before else 0.0,
+        'dtypes': df.dtypes.astype(str).value_counts().to_dict(),
+        'chunks': len(chunks),
+        'labelled_questions': len(metadata['questions']),
+    }
+
+    print(f"INFO: Loaded {report['rows']} rows x {report['columns']} columns from .sav in "
+          f"{report['chunks']} chunks: {report['memory_before_mb']} MB -> {report['memory_after_mb']} MB "
+          f"({report['reduction_pct']}% smaller), {report['labelled_questions']} labelled questions")
+
+    return df, metadata, report
@@ -0,0 +1,204 @@
+"""
+Dataset Schema Catalog
+Maps question IDs to the physical columns of a Decipher/SPSS export
+
+A Codes.csv export stores one question across several columns: checkbox and
+grid questions as rNN families (S7r1..S7r98, Q3r1..Q3r7), "other, specify"
+answers as open-end columns (S7r97oe), plus hidden variables (hCountry),
+quality-control fields (QC_FLAGSr1, Flag_Q3_SL, TimeSection_*) and system
+fields (record, uuid, status). The catalog classifies every column once per
+dataset and answers lookups with dict/set access instead of scanning the
+column list. Build it once when a dataset is loaded and pass the catalog
+along; schema_catalog(df.columns) also finds the existing catalog of an
+unchanged DataFrame without touching its columns.
+"""
+
+import re
+import weakref
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+# Decipher system fields
+SYSTEM_COLUMNS = frozenset({
+    'record', 'uuid', 'date', 'start_date', 'status', 'markers', 'qtime', 'decLang', 'list',
+    'vlist', 'vos', 'vbrowser', 'vmobiledevice', 'vmobileos',
+    'ipAddress', 'userAgent', 'url', 'session',
+})
+
+# Quality-control fields: quality scores and flags, speeder timings, length of interview
+QC_PATTERN = re.compile(r'^(QC_|QualityScore|Flag_|TimeSection_|LOI)', re.IGNORECASE)
+
+# Hidden variables: h + upper-case letter or digit (hCountry, hS9CountSwitchers)
+HIDDEN_PATTERN = re.compile(r'^h[A-Z0-9]')
+
+# Option column of a family: <question>r<code>
+OPTION_PATTERN = re.compile(r'^(?P<base>.+?)r(?P<code>\d+)$')
+
+# Open end: <question>r<code>oe or <question>oe (question IDs end in a digit)
+OPEN_END_PATTERN = re.compile(r'^(?P<base>.+?\d)(?:r(?P<code>\d+))?oe$')
+
+
+class SchemaCatalog:
+    """Column index of one dataset"""
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns: List[str] = [str(col) for col in columns]
+        self._positions: Dict[str, int] = {}
+        self._kinds: Dict[str, str] = {}
+        self._bases: Dict[str, str] = {}
+        self._families: Dict[str, List[Tuple[int, str]]] = {}
+        self._open_ends: Dict[str, List[str]] = {}
+        self._questions: Dict[str, None] = {}
+
+        for position, col in enumerate(self.columns):
+            self._positions.setdefault(col, position)
+            self._index(col)
+
+        for family in self._families.values():
+            family.sort()
+
+    def _index(self, col: str) -> None:
+        option = OPTION_PATTERN.match(col)
+        if option:
+            # Families are structural: any <base>r<NN> column belongs to one
+            self._families.setdefault(option.group('base'), []).append((int(option.group('code')), col))
+
+        if col in SYSTEM_COLUMNS:
+            kind = 'system'
+        elif QC_PATTERN.match(col):
+            kind = 'qc'
+        elif HIDDEN_PATTERN.match(col):
+            kind = 'hidden'
+        else:
+            open_end = OPEN_END_PATTERN.match(col)
+            if open_end:
+                kind = 'open_end'
+                base = open_end.group('base')
+                self._open_ends.setdefault(base, []).append(col)
+            elif option:
+                kind = 'option'
+                base = option.group('base')
+            else:
+                kind = 'question'
+                base = col
+            self._bases[col] = base
+            if base not in self._questions:
+                self._questions[base] = None
+
+        self._kinds[col] = kind
+
+    # ----- lookups -----
+
+    def __contains__(self, col: str) -> bool:
+        return col in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def position(self, col: str) -> Optional[int]:
+        return self._positions.get(col)
+
+    def kind(self, col: str) -> Optional[str]:
+        """'question', 'option', 'open_end', 'hidden', 'qc' or 'system' (None if not a column)"""
+        return self._kinds.get(col)
+
+    def base_question(self, col: str) -> Optional[str]:
+        """
+        Question a column belongs to
+
+        Example: S7r2 → S7, S7r97oe → S7, Q1 → Q1, record → None (hidden,
+        QC and system columns belong to no question)
+        """
+        return self._bases.get(col)
+
+    def family(self, question: str) -> List[Tuple[int, str]]:
+        """
+        rNN columns of a question as (option code, column) sorted by code
+
+        Example: S7 → [(1, 'S7r1'), (2, 'S7r2'), ..., (98, 'S7r98')]
+        Open-end columns such as S7r97oe are not part of the family.
+        """
+        return list(self._families.get(question, ()))
+
+    def has_family(self, question: str) -> bool:
+        return question in self._families
+
+    def family_columns(self, question: str) -> List[str]:
+        return [col for _, col in self._families.get(question, ())]
+
+    def open_ends(self, question: str) -> List[str]:
+        """Open-end columns of a question (S7 → ['S7r97oe'])"""
+        return list(self._open_ends.get(question, ()))
+
+    def checkbox_column(self, question: str, code) -> Optional[str]:
+        """Checkbox column for shorthand like S7=2 (S7r2), if the dataset has it"""
+        col = f"{question}r{code}"
+        return col if col in self._positions else None
+
+    def questions(self) -> List[str]:
+        """Question IDs in first-column order, excluding hidden, QC and system columns"""
+        return list(self._questions)
+
+    def columns_of_kind(self, kind: str) -> List[str]:
+        return [col for col in self.columns if self._kinds[col] == kind]
+
+    @property
+    def hidden(self) -> List[str]:
+        return self.columns_of_kind('hidden')
+
+    @property
+    def qc(self) -> List[str]:
+        return self.columns_of_kind('qc')
+
+    @property
+    def system(self) -> List[str]:
+        return self.columns_of_kind('system')
+
+
+@lru_cache(maxsize=16)
+def _cached_catalog(columns: Tuple[str, ...]) -> SchemaCatalog:
+    return SchemaCatalog(columns)
+
+
+# Catalogs of live column indexes by identity; pandas indexes are immutable, so
+# a DataFrame whose columns change gets a new Index (and a new catalog)
+_index_catalogs: Dict[int, Tuple[weakref.ref, SchemaCatalog]] = {}
+
+
+def _index_catalog(index: pd.Index) -> SchemaCatalog:
+    key = id(index)
+    entry = _index_catalogs.get(key)
+    if entry is not None and entry[0]() is index:
+        return entry[1]
+    catalog = SchemaCatalog(index)
+    _index_catalogs[key] = (weakref.ref(index, lambda _, key=key: _index_catalogs.pop(key, None)), catalog)
+    return catalog
+
+
+def schema_catalog(columns: Union[SchemaCatalog, pd.DataFrame, pd.Index, Iterable[str]]) -> SchemaCatalog:
+    """
+    Catalog of a dataset's columns
+
+    An existing catalog is returned as is, and a DataFrame (or its columns)
+    maps to the one catalog of that column Index in O(1). Plain lists are
+    looked up by their contents, which costs O(columns) per call, so prefer
+    passing the catalog itself.
+
+    Args:
+        columns: SchemaCatalog, DataFrame, DataFrame.columns or column names
+
+    Returns:
+        SchemaCatalog
+    """
+    if isinstance(columns, SchemaCatalog):
+        return columns
+    if isinstance(columns, pd.DataFrame):
+        columns = columns.columns
+    if isinstance(columns, pd.Index):
+        return _index_catalog(columns)
+    return _cached_catalog(tuple(str(col) for col in columns))
@@ -0,0 +1,231 @@
+"""
+Banner Significance Testing
+Column-proportion z-tests and column-mean t-tests within each H1 group
+
+Every banner column (except Total) gets a letter. A cell carries the letters
+of the columns in the same H1 group it is significantly higher than, as in a
+standard "with stat testing" tab deliverable. All pairs of a group are tested
+at once by broadcasting (columns x columns x rows), so a wide banner costs a
+few array operations per table.
+
+Tests run on the finished table, after caching and parallel fan-out, because a
+column's letters depend on its sibling columns; numeric and Likert cells carry
+their unrounded moments and box counts for this, so tests never see display
+rounding. Weighted tables use the effective base as the sample size. scipy, when installed, supplies Student t
+critical values; otherwise the normal approximation is used.
+"""
+
+from statistics import NormalDist
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    from scipy import stats as scipy_stats
+except ImportError:
+    scipy_stats = None
+
+# Banner plans are specified at 90% confidence (see tabplan_writer)
+DEFAULT_CONFIDENCE = 0.90
+
+# Columns with fewer respondents than this are neither tested nor tested against
+DEFAULT_MIN_BASE = 30
+
+
+def column_letter(index: int) -> str:
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA', ..."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def column_letters(banner_columns: List[Dict]) -> Dict[str, str]:
+    """Letter for every banner column except Total, in banner order"""
+    lettered = [col for col in banner_columns if col['id'] != 'TOTAL']
+    return {col['id']: column_letter(idx) for idx, col in enumerate(lettered)}
+
+
+def column_groups(banner_columns: List[Dict]) -> List[np.ndarray]:
+    """Indices (into banner_columns) of the columns of each H1 group"""
+    groups: Dict[str, List[int]] = {}
+    for idx, col in enumerate(banner_columns):
+        if col['id'] != 'TOTAL' and col.get('parent') is not None:
+            groups.setdefault(col['parent'], []).append(idx)
+    return [np.array(indices) for indices in groups.values() if len(indices) > 1]
+
+
+def proportion_higher(p: np.ndarray, n: np.ndarray, confidence: float) -> np.ndarray:
+    """
+    Pooled two-proportion z-test between every pair of columns
+
+    Args:
+        p: (n_columns x n_rows) proportions
+        n: (n_columns,) sample sizes
+        confidence: Two-sided confidence level
+
+    Returns:
+        (n_columns x n_columns x n_rows) bool, [i, j, k] = column i is
+        significantly higher than column j on row k
+    """
+    z_crit = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+
+    n_i, n_j = n[:, None, None], n[None, :, None]
+    p_i, p_j = p[:, None, :], p[None, :, :]
+    pooled = (p_i * n_i + p_j * n_j) / (n_i + n_j)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (p_i - p_j) / np.sqrt(pooled * (1 - pooled) * (1 / n_i + 1 / n_j))
+    return np.nan_to_num(z, nan=0.0) > z_crit
+
+
+def mean_higher(mean: np.ndarray, std: np.ndarray, n: np.ndarray, confidence: float) -> np.ndarray:
+    """
+    Welch t-test between the means of every pair of columns
+
+    Args:
+        mean: (n_columns,) means
+        std: (n_columns,) sample standard deviations
+        n: (n_columns,) sample sizes
+        confidence: Two-sided confidence level
+
+    Returns:
+        (n_columns x n_columns) bool, [i, j] = column i mean significantly higher
+    """
+    v = std * std / n
+    v_i, v_j = v[:, None], v[None, :]
+    # Means that agree up to summation noise (constant columns) are equal, not "higher"
+    difference = np.where(np.isclose(mean[:, None], mean[None, :], rtol=1e-9, atol=0.0),
+                          0.0, mean[:, None] - mean[None, :])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = difference / np.sqrt(v_i + v_j)
+        if scipy_stats is not None:
+            dof = (v_i + v_j) ** 2 / (v_i ** 2 / (n[:, None] - 1) + v_j ** 2 / (n[None, :] - 1))
+            t_crit = scipy_stats.t.ppf(1 - (1 - confidence) / 2, dof)
+        else:
+            t_crit = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+        return np.nan_to_num(t, nan=0.0) > np.nan_to_num(t_crit, nan=np.inf)
+
+
+def _letters(higher: np.ndarray, group_letters: List[str]) -> np.ndarray:
+    """Join the letters of the beaten columns; higher is (g x g [x k])"""
+    letters = np.full(higher.shape[:1] + higher.shape[2:], '', dtype=object)
+    for i, j, *rest in zip(*np.nonzero(higher)):
+        letters[(i, *rest)] += group_letters[j]
+    return letters
+
+
+def _sample_size(cell: Dict, question_type: str) -> float:
+    """Effective base when weighted, else the unweighted percentage base"""
+    if 'weighted_counts' in cell:
+        # Answering respondents only, from the unrounded weights
+        return cell['weighted_counts']['effective_base']
+    if 'effective_base' in cell:
+        return cell['effective_base']
+    if question_type not in ('numeric', 'likert', 'multi'):
+        # Categorical percentages are of answering respondents, not the column base
+        return sum(cell.get('frequencies', {}).values())
+    return cell.get('base', 0)
+
+
+def _exact_counts(cell: Dict, question_type: str) -> Dict:
+    """Unrounded code counts, any-mention count and percentage base of a cell"""
+    if 'weighted_counts' in cell:
+        return cell['weighted_counts']
+    frequencies = cell.get('frequencies', {})
+    if question_type == 'multi':
+        total = cell.get('weighted_base', cell.get('base', 0))
+    else:
+        total = sum(frequencies.values())
+    return {'codes': frequencies, 'any_mention': cell.get('any_mention', 0), 'total': total}
+
+
+def add_significance(table: Dict, banner_columns: List[Dict],
+                     confidence: float = DEFAULT_CONFIDENCE,
+                     min_base: int = DEFAULT_MIN_BASE) -> None:
+    """
+    Add significance letters to a finished table, in place
+
+    Categorical and multi-response cells get 'sig' ({code: letters}) and
+    multi-response cells 'sig_any_mention'; numeric cells get 'sig_mean';
+    Likert cells get 'sig_top_box' and 'sig_bottom_box'.
+
+    Args:
+        table: Table from build_crosstab_table
+        banner_columns: Flattened banner columns (with 'parent' H1 names)
+        confidence: Two-sided confidence level
+        min_base: Smallest (effective) base that is tested
+    """
+    question_type = table['question_type']
+    if question_type in ('likert_grid', 'grid_summary'):
+        # Statement bases differ per column; grid and grid summary tables are not stat tested
+        return
+    letters = column_letters(banner_columns)
+
+    for group in column_groups(banner_columns):
+        cols = [banner_columns[idx] for idx in group]
+        cells = [table['data'][col['id']] for col in cols]
+        group_letters = [letters[col['id']] for col in cols]
+        n = np.array([_sample_size(cell, question_type) for cell in cells], dtype=np.float64)
+        testable = n >= min_base
+        if testable.sum() < 2:
+            continue
+        n = np.where(testable, n, np.nan)
+
+        if question_type == 'numeric':
+            moments = [c.get('moments', {}) for c in cells]
+            mean = np.array([m.get('mean', np.nan) for m in moments], dtype=np.float64)
+            std = np.array([m.get('std', np.nan) for m in moments], dtype=np.float64)
+            sig = _letters(mean_higher(mean, std, n, confidence), group_letters)
+            for cell, value in zip(cells, sig):
+                cell['sig_mean'] = value
+
+        elif question_type == 'likert':
+            boxes = np.array([[c.get('box_counts', {}).get(k, np.nan) for k in ('top', 'bottom', 'total')]
+                              for c in cells], dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                p = boxes[:, :2] / boxes[:, 2:]
+            sig = _letters(proportion_higher(p, n, confidence), group_letters)
+            for cell, (top, bottom) in zip(cells, sig):
+                cell['sig_top_box'] = top
+                cell['sig_bottom_box'] = bottom
+
+        else:
+            # Rows of the table's code dictionary that this group reports
+            codes = [code for code in table.get('codes', []) if any(code in c.get('frequencies', {}) for c in cells)]
+            if not codes:
+                continue
+            exact = [_exact_counts(c, question_type) for c in cells]
+            counts = np.array([[e['codes'].get(code, 0) for code in codes] for e in exact], dtype=np.float64)
+            if question_type == 'multi':
+                counts = np.column_stack([counts, [e['any_mention'] for e in exact]])
+            denominators = np.array([e['total'] for e in exact], dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                p = counts / denominators[:, None]
+            sig = _letters(proportion_higher(p, n, confidence), group_letters)
+            for cell, row in zip(cells, sig):
+                cell['sig'] = {code: row[k] for k, code in enumerate(codes)}
+                if question_type == 'multi':
+                    cell['sig_any_mention'] = row[-1]
+
+
+def add_report_significance(report: Dict, banner_columns: List[Dict],
+                            confidence: float = DEFAULT_CONFIDENCE,
+                            min_base: int = DEFAULT_MIN_BASE) -> None:
+    """
+    Stat-test every table of a report in place and record the column letters
+
+    Args:
+        report: Report from generate_crosstab_report
+        banner_columns: Flattened banner columns
+        confidence: Two-sided confidence level
+        min_base: Smallest (effective) base that is tested
+    """
+    for table in report['tables']:
+        add_significance(table, banner_columns, confidence, min_base)
+
+    report['metadata']['column_letters'] = column_letters(banner_columns)
+    report['metadata']['sig_confidence'] = confidence
@@ -0,0 +1,217 @@
+"""
+Table Nets
+Row-side nets from the tab sheet "Nets (English & code #s)" column
+
+A net is a group of answer codes reported as one extra row (e.g. "T2B" or
+"Acuvue brands = 1,2,3"). Net definitions are resolved against a table's
+codes into a code x net membership matrix, so every net row of a table comes
+out of the counts the table already computes: a matrix product of the code
+counts for single-response questions, or extra indicator columns in the same
+mask multiply for multi-response and rating questions. Nets may overlap; on
+a multi-response question a respondent counts once in a net however many of
+its options they selected.
+
+Supported forms (separated by ';', or by ',' when there is no ';'; each may
+repeat the "Net:" prefix):
+- Box nets relative to the rating scale: TB, T2B, T3B, BB, B2B, B3B,
+  "Top 2 Box", "Bottom Box", also joined by '/' ("T2B/B2B"). Code 1 is the
+  top of the scale, as for the Likert tables' default top_codes; codes 97-99
+  are not scale points.
+- Code lists: "Acuvue brands = 1,2,3", "Top 2 Box (1, 2)", "Codes 4, 5"
+- Ranges: "Gen Z (18-27)", "Heavy users = 10+", "Acuvue = 1-3"
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# "Other", "None of these", "Don't know" style codes are never scale points
+NON_SCALE_CODES = frozenset({97, 98, 99})
+
+_PREFIX = re.compile(r'^\s*nets?\s*:\s*', re.IGNORECASE)
+_BOX = re.compile(r'^(?:(?P<short>[TB])(?P<n>\d*)B|(?P<long>top|bottom)\s*(?P<long_n>\d*)\s*box(?:es)?)$',
+                  re.IGNORECASE)
+_NUMBER = r'-?\d+(?:\.\d+)?'
+_CODE = re.compile(rf'^\s*(?P<value>{_NUMBER})\s*$')
+_RANGE = re.compile(rf'^\s*(?P<low>{_NUMBER})\s*[-–]\s*(?P<high>{_NUMBER})\s*$')
+_OPEN_RANGE = re.compile(rf'^\s*(?P<low>{_NUMBER})\s*\+\s*$')
+_PAREN_SPEC = re.compile(r'^(?P<label>.+?)\s*\((?P<spec>[^()]+)\)$')
+_CODES_SPEC = re.compile(r'^codes?\s+(?P<spec>.+)$', re.IGNORECASE)
+
+
+def _number(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _parse_spec(spec: str) -> Optional[Dict]:
+    """'1,2,3' / '18-27' / '65+' -> {'codes': [...], 'ranges': [[low, high], ...]}; None if not codes"""
+    codes, ranges = [], []
+    for item in spec.split(','):
+        if _CODE.match(item):
+            codes.append(_number(_CODE.match(item).group('value')))
+        elif _RANGE.match(item):
+            match = _RANGE.match(item)
+            ranges.append([_number(match.group('low')), _number(match.group('high'))])
+        elif _OPEN_RANGE.match(item):
+            ranges.append([_number(_OPEN_RANGE.match(item).group('low')), None])
+        else:
+            return None
+    return {'codes': codes, 'ranges': ranges}
+
+
+def _parse_net(piece: str) -> Optional[Dict]:
+    box = _BOX.match(piece)
+    if box:
+        side = (box.group('short') or box.group('long'))[0].upper()
+        points = int(box.group('n') or box.group('long_n') or 1)
+        return {'label': piece, 'box': 'top' if side == 'T' else 'bottom', 'points': points}
+
+    match = _PAREN_SPEC.match(piece)
+    if match:
+        label, spec = match.group('label'), match.group('spec')
+    elif '=' in piece:
+        label, spec = piece.split('=', 1)
+    elif _CODES_SPEC.match(piece):
+        label, spec = piece, _CODES_SPEC.match(piece).group('spec')
+    else:
+        return None
+
+    parsed = _parse_spec(spec)
+    if parsed is None or not label.strip():
+        return None
+    return {'label': label.strip(), **parsed}
+
+
+def _split_boxes(piece: str) -> List[str]:
+    """'T2B/B2B' -> ['T2B', 'B2B']; anything else is one piece"""
+    boxes = [box.strip() for box in piece.split('/')]
+    if len(boxes) > 1 and all(_BOX.match(box) for box in boxes):
+        return boxes
+    return [piece]
+
+
+def _split_pieces(text: str) -> List[str]:
+    if ';' in text:
+        pieces = [_PREFIX.sub('', piece).strip() for piece in text.split(';')]
+        return [box for piece in pieces if piece for box in _split_boxes(piece)]
+
+    # Commas separate nets, except inside parentheses and in a code list after '=' / 'Codes'
+    pieces = []
+    for piece in re.split(r',(?![^()]*\))', text):
+        piece = _PREFIX.sub('', piece).strip()
+        if not piece:
+            continue
+        if pieces and ('=' in pieces[-1] or _CODES_SPEC.match(pieces[-1])) and _parse_spec(piece) is not None:
+            pieces[-1] += f", {piece}"
+        else:
+            pieces.append(piece)
+    return [box for piece in pieces for box in _split_boxes(piece)]
+
+
+def parse_nets(text) -> List[Dict]:
+    """
+    Parse a tab sheet nets cell into net definitions
+
+    Examples:
+        "Net: T2B, B2B" -> [{'label': 'T2B', 'box': 'top', 'points': 2},
+                            {'label': 'B2B', 'box': 'bottom', 'points': 2}]
+        "Net: Acuvue brands = 1,2,3" -> [{'label': 'Acuvue brands', 'codes': [1, 2, 3], 'ranges': []}]
+
+    Args:
+        text: Cell text (None/NaN for no nets)
+
+    Returns:
+        Net definitions in sheet order; parts that do not name codes (e.g.
+        "Under $25,000 - $49,000") are skipped with a warning
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+    text = _PREFIX.sub('', str(text).strip())
+    if not text or text.lower() == 'nan':
+        return []
+
+    nets = []
+    for piece in _split_pieces(text):
+        net = _parse_net(piece)
+        if net is None:
+            print(f"WARNING: Could not read net '{piece}' (expected codes like 'Label = 1,2,3' or T2B/B2B)")
+        else:
+            nets.append(net)
+    return nets
+
+
+def scale_points(codes: Sequence) -> np.ndarray:
+    """
+    Sorted scale points spanned by a table's numeric codes (97-99 excluded)
+
+    Whole-number scales are filled in between their lowest and highest code,
+    so an unused point (nobody chose 4) still counts towards B2B.
+    """
+    values = pd.to_numeric(pd.Series(list(codes), dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    values = values[~np.isnan(values)]
+    values = np.unique(values[~np.isin(values, list(NON_SCALE_CODES))])
+    if len(values) and np.all(values == np.round(values)):
+        return np.arange(values[0], values[-1] + 1)
+    return values
+
+
+def rating_scale(codes: Sequence, top_codes: Sequence, bottom_codes: Sequence) -> np.ndarray:
+    """Scale points box nets of a rating question count from: its answers plus its top/bottom codes"""
+    return scale_points(np.union1d(np.asarray(codes, dtype=np.float64),
+                                   np.asarray(list(top_codes) + list(bottom_codes), dtype=np.float64)))
+
+
+def net_membership(nets: List[Dict], codes: Sequence, scale: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Code x net membership matrix
+
+    Args:
+        nets: Definitions from parse_nets
+        codes: The table's codes (uniques, option codes or scale points)
+        scale: Scale the box nets count from (defaults to scale_points(codes))
+
+    Returns:
+        (n_codes x n_nets) bool matrix; codes may belong to several nets
+    """
+    values = pd.to_numeric(pd.Series(list(codes), dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    scale = scale_points(codes) if scale is None else scale
+    matrix = np.zeros((len(values), len(nets)), dtype=bool)
+
+    for idx, net in enumerate(nets):
+        if 'box' in net:
+            selected = scale[:net['points']] if net['box'] == 'top' else scale[max(len(scale) - net['points'], 0):]
+            matrix[:, idx] = np.isin(values, selected)
+            continue
+        member = np.isin(values, np.asarray(net.get('codes', []), dtype=np.float64))
+        for low, high in net.get('ranges', []):
+            member |= (values >= low) & (values <= (np.inf if high is None else high))
+        matrix[:, idx] = member
+
+    return matrix
+
+
+def net_indicators(values: np.ndarray, nets: List[Dict], scale: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Respondent x net indicators of a single-answer numeric column
+
+    Args:
+        values: float64 answers (NaN = missing)
+        nets: Definitions from parse_nets
+        scale: Scale for box nets (defaults to the observed scale points)
+
+    Returns:
+        (n_rows x n_nets) bool matrix
+    """
+    present = ~np.isnan(values)
+    uniques = np.unique(values[present])
+    membership = net_membership(nets, uniques, scale)
+    indicators = np.zeros((len(values), len(nets)), dtype=bool)
+    indicators[present] = membership[np.searchsorted(uniques, values[present])]
+    return indicators
+
+
+def net_labels(nets: List[Dict]) -> List[str]:
+    return [net['label'] for net in nets]
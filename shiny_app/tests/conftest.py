@@ -0,0 +1,10 @@
+"""
+Test configuration
+The engine modules are imported as siblings (as the app and benchmarks do),
+so shiny_app/ goes on the import path wherever pytest is started from.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,48 @@
+"""
+Banner equations
+Pins the deliberate differences from the old row-wise evaluator: checkbox
+shorthand with spaces, != on ranges and code lists, ordering operators on
+ranges and lists as syntax errors, and malformed OR branches dropped alone.
+"""
+
+import numpy as np
+import pytest
+
+from banner_equations import EquationSyntaxError, Nobody, compile_equation, equation_mask, parse_equation
+from benchmarks.synthetic import generate_survey
+
+
+@pytest.fixture(scope='module')
+def df():
+    # S4 sits behind skip logic (has missing answers); M1 is a checkbox family M1r1..M1r8
+    data, _ = generate_survey(500, single=4, multi=1, grids=0, numeric=0, seed=11)
+    assert data['S4'].isna().any() and 'M1' not in data.columns
+    return data
+
+
+@pytest.mark.parametrize('equation', ['M1=2', 'M1 = 2', 'M1 =2', 'M1= 2'])
+def test_checkbox_shorthand_allows_spaces(df, equation):
+    np.testing.assert_array_equal(equation_mask(df, equation), (df['M1r2'] == 1).to_numpy())
+
+
+@pytest.mark.parametrize('equation, codes', [('S4 != 1-3', [1, 2, 3]), ('S4 != 1,4', [1, 4]),
+                                             ('S4 != 1, 3-4', [1, 3, 4])])
+def test_not_equal_negates_range_and_list_membership(df, equation, codes):
+    expected = df['S4'].notna() & ~df['S4'].isin(codes)
+    np.testing.assert_array_equal(equation_mask(df, equation), expected.to_numpy())
+
+
+@pytest.mark.parametrize('equation', ['S1 >= 1-3', 'S1 < 1,2', 'S1 > 10+', 'S1 <= 1, 2-3'])
+def test_ordering_operators_on_ranges_and_lists_are_syntax_errors(equation):
+    with pytest.raises(EquationSyntaxError):
+        parse_equation(equation)
+
+
+@pytest.mark.parametrize('equation', ['S2=1 | S1 >= 1-3', 'S2=1 | (S1=1', 'S2=1 OR S1 => 2', 'S2=1 |'])
+def test_malformed_or_branch_is_dropped_alone(df, equation):
+    np.testing.assert_array_equal(equation_mask(df, equation), (df['S2'] == 1).to_numpy())
+
+
+@pytest.mark.parametrize('equation', ['S1 >= 1-3', '(S2=1 | S1=2', 'S2=1 & S1 >= 1-3 | S1 < 1,2'])
+def test_equation_without_valid_branch_matches_nobody(equation):
+    assert compile_equation(equation) == Nobody()
@@ -0,0 +1,123 @@
+"""
+Report parity
+Every way of producing a report (serial, worker processes, table cache,
+chunked CSV, tracker store) must give the same cells as a plain in-memory
+generate_crosstab_report, weighted and unweighted. Published cell fields must
+match exactly; the unrounded fields kept for stat testing may differ by float
+summation order only. Chunked and tracker reports take medians from quantile
+sketches, so those only match to the sketch's accuracy.
+"""
+
+import pytest
+
+from benchmarks.synthetic import generate_banner_plan, generate_survey
+from crosstab_engine import generate_crosstab_report
+from quantile_sketch import DEFAULT_RELATIVE_ACCURACY
+from report_cache import CrosstabReportCache, dataset_fingerprint
+from table_nets import parse_nets
+from tracker_store import TrackerStore
+
+# Cell fields that hold unrounded sums for the column tests
+UNROUNDED = ('moments', 'box_counts', 'weighted_counts')
+# Report metadata that describes the run rather than the results
+RUN_METADATA = ('profile', 'chunks', 'waves')
+# A sketch median is within the relative accuracy of a middle value; the exact
+# median of an even count may sit halfway to the next one
+SKETCH_MEDIAN_RTOL = 2 * DEFAULT_RELATIVE_ACCURACY
+
+
+@pytest.fixture(scope='module')
+def survey():
+    df, questions = generate_survey(3000, single=4, multi=2, grids=1, numeric=2, seed=3)
+    questions[0]['nets'] = parse_nets('Net: Low = 1,2; Net: High = 4+')
+    grid = next(q for q in questions if q['type'] == 'likert_grid')['id']
+    questions += [{'id': f'{grid}_{summary} Summary', 'type': 'grid_summary', 'grid': grid, 'summary': summary}
+                  for summary in ('T2B', 'Mean')]
+    return df, questions, generate_banner_plan(df, 12, seed=3)
+
+
+@pytest.fixture(scope='module', params=[None, 'weight'], ids=['unweighted', 'weighted'])
+def weight_column(request):
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def reference(survey, weight_column):
+    df, questions, plan = survey
+    return generate_crosstab_report(df, questions, plan, weight_column=weight_column)
+
+
+def _flatten(value, path=()):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, path + (key,))
+    else:
+        yield path, value
+
+
+def assert_same_report(expected, actual, sketch_medians=False):
+    """Same tables, table fields and cells; unrounded test fields to float precision"""
+    unrounded = UNROUNDED + (('median',) if sketch_medians else ())
+    strip = lambda metadata: {k: v for k, v in metadata.items() if k not in RUN_METADATA}
+    assert strip(actual['metadata']) == strip(expected['metadata'])
+    assert [t['question_id'] for t in actual['tables']] == [t['question_id'] for t in expected['tables']]
+
+    for table, other in zip(expected['tables'], actual['tables']):
+        assert {k: v for k, v in other.items() if k != 'data'} == {k: v for k, v in table.items() if k != 'data'}
+        assert list(other['data']) == list(table['data'])
+        for column_id, cell in table['data'].items():
+            where = f"{table['question_id']} / {column_id}"
+            other_cell = other['data'][column_id]
+            published = lambda c: {k: v for k, v in c.items() if k not in unrounded}
+            assert published(other_cell) == published(cell), where
+            if sketch_medians and cell.get('median') is not None:
+                assert other_cell['median'] == pytest.approx(cell['median'], rel=SKETCH_MEDIAN_RTOL), where
+            elif sketch_medians:
+                assert other_cell.get('median') is None, where
+            for key in UNROUNDED:
+                assert (key in other_cell) == (key in cell), where
+                if key in cell:
+                    exact = dict(_flatten(cell[key]))
+                    assert dict(_flatten(other_cell[key])) == pytest.approx(exact, rel=1e-9, abs=1e-9), where
+
+
+def test_workers_match_serial(survey, weight_column, reference):
+    df, questions, plan = survey
+    report = generate_crosstab_report(df, questions, plan, weight_column=weight_column, workers=2)
+    assert_same_report(reference, report)
+
+
+def test_table_cache_matches_uncached(survey, weight_column, reference):
+    df, questions, plan = survey
+    cache = CrosstabReportCache()
+    fingerprint = dataset_fingerprint(df)
+
+    cold = generate_crosstab_report(df, questions, plan, weight_column=weight_column,
+                                    cache=cache, fingerprint=fingerprint)
+    warm = generate_crosstab_report(df, questions, plan, weight_column=weight_column,
+                                    cache=cache, fingerprint=fingerprint)
+    assert cache.hits > 0
+    assert_same_report(reference, cold)
+    assert_same_report(reference, warm)
+
+
+def test_chunked_csv_matches_in_memory(survey, weight_column, reference, tmp_path):
+    df, questions, plan = survey
+    path = tmp_path / 'survey.csv'
+    df.to_csv(path, index=False)
+
+    report = generate_crosstab_report(str(path), questions, plan, weight_column=weight_column, chunk_rows=700)
+    assert report['metadata']['chunks'] > 1
+    assert_same_report(reference, report, sketch_medians=True)
+
+
+def test_tracker_store_matches_in_memory(survey, weight_column, reference, tmp_path):
+    df, questions, plan = survey
+    store = TrackerStore('parity-study', plan, weight_column=weight_column, store_dir=tmp_path)
+    # Daily appends re-send earlier rows; the last question is added later and back-filled
+    for end in (1000, 1800, len(df)):
+        store.update(df.iloc[:end], questions[:-1])
+    store.update(df, questions)
+
+    reopened = TrackerStore('parity-study', plan, weight_column=weight_column, store_dir=tmp_path)
+    assert_same_report(reference, reopened.report(questions), sketch_medians=True)
@@ -0,0 +1,360 @@
+"""
+Tracker Aggregate Store
+Append-only incremental aggregation of tracker waves
+
+Trackers get new completes appended to the same export every day. Instead of
+re-tabulating every row on each refresh, the store keeps the mergeable partial
+aggregates of chunked_report (counts, weighted sums, moments and median
+sketches) per banner plan, per wave (dTrack) and per question, together with
+the record IDs already folded in. A refresh evaluates banner masks and tables
+on the new rows only; a question added to the plan is back-filled once from
+the rows of each wave. Waves are kept apart, so any wave or set of waves can
+be reported, and wave-over-wave deltas are computed, from stored aggregates
+without re-reading earlier waves.
+
+The data is assumed append-only: rows already folded in are never updated or
+removed, and a respondent's weight does not change once aggregated. As in the
+out-of-core report, numeric medians are sketch approximations. State files
+are pickles written by this store in a local directory per study; the study
+ID (project ID or export name) is part of the store key, so two studies with
+the same banner plan never share aggregates or record IDs.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from banner_masks import BannerMaskStore
+from chunked_report import BannerBasesPartial, partial_table, question_partial
+from crosstab_engine import build_banner_columns, round_weighted_sum
+from report_cache import question_key
+from report_profile import ReportProfiler
+from schema_catalog import schema_catalog
+from significance import DEFAULT_CONFIDENCE, add_report_significance
+
+# Bump when the partial classes change shape, so stale state starts over
+STORE_FORMAT_VERSION = 1
+
+DEFAULT_STORE_DIR = Path(os.environ.get(
+    'QGEN_TRACKER_STORE_DIR', Path.home() / '.cache' / 'qgen-tab-planner' / 'trackers'
+))
+
+# Decipher wave and respondent ID fields
+DEFAULT_WAVE_COLUMN = 'dTrack'
+RECORD_COLUMNS = ('record', 'uuid')
+
+# Wave of rows without a wave column / value
+NO_WAVE = 'all'
+
+# Cell fields that are labels, letters or bases rather than results
+_NOT_DIFFED = frozenset({'name', 'equation', 'scale', 'summary', 'moments', 'box_counts', 'weighted_counts',
+                         'sig', 'sig_mean', 'sig_top_box', 'sig_bottom_box', 'sig_any_mention'})
+
+
+def plan_key(store_id: str, banner_plan: Dict, weight_column: Optional[str] = None,
+             wave_column: str = DEFAULT_WAVE_COLUMN) -> str:
+    """
+    Store key of a study's banner plan: study ID, column equations in order, weight and wave columns
+
+    Column names and IDs are not part of the key; they only label the report.
+    """
+    equations = [BannerMaskStore._key(col['equation']) for col in build_banner_columns(banner_plan)]
+    payload = json.dumps({'store_id': store_id, 'equations': equations,
+                          'weight_column': weight_column, 'wave_column': wave_column})
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def study_store_dir(store_id: str) -> Path:
+    """Directory of one study's tracker stores under DEFAULT_STORE_DIR"""
+    return DEFAULT_STORE_DIR / (re.sub(r'[^A-Za-z0-9._-]+', '_', store_id).strip('._') or 'study')
+
+
+def _wave_labels(df: pd.DataFrame, wave_column: str) -> np.ndarray:
+    """Wave of each row as text ('3' for dTrack=3.0)"""
+    if wave_column not in df.columns:
+        return np.full(len(df), NO_WAVE, dtype=object)
+    numeric = pd.to_numeric(df[wave_column], errors='coerce')
+    labels = df[wave_column].astype(str).to_numpy(dtype=object)
+    whole = (numeric.notna() & (numeric == numeric.round())).to_numpy()
+    labels[whole] = numeric[whole].astype(np.int64).astype(str).to_numpy()
+    labels[df[wave_column].isna().to_numpy()] = NO_WAVE
+    return labels
+
+
+def _delta(current, previous):
+    """current - previous for every numeric result present in both (None if nothing to compare)"""
+    if isinstance(current, dict) and isinstance(previous, dict):
+        deltas = {key: _delta(value, previous[key]) for key, value in current.items()
+                  if key in previous and key not in _NOT_DIFFED}
+        deltas = {key: value for key, value in deltas.items() if value is not None}
+        return deltas or None
+    numbers = (int, float, np.integer, np.floating)
+    if (isinstance(current, numbers) and isinstance(previous, numbers)
+            and not isinstance(current, bool) and not isinstance(previous, bool)):
+        return round(float(current) - float(previous), 2)
+    return None
+
+
+class TrackerStore:
+    """
+    Persistent per-wave partial aggregates of one study's banner plan
+
+    Args:
+        store_id: Identity of the tracker study (project ID, or the export's
+            name); record IDs are only compared within one study
+        banner_plan: Banner plan with H1/H2 structure
+        weight_column: Respondent weight column (None = unweighted)
+        wave_column: Wave field; rows without it go to wave 'all'
+        record_column: Respondent ID field (defaults to record, then uuid)
+        store_dir: Directory of the state files (defaults to
+            study_store_dir(store_id))
+    """
+
+    def __init__(self, store_id: str, banner_plan: Dict, weight_column: Optional[str] = None,
+                 wave_column: str = DEFAULT_WAVE_COLUMN, record_column: Optional[str] = None,
+                 store_dir=None):
+        if not store_id or not str(store_id).strip():
+            raise ValueError("A tracker store needs a study ID (project ID or export name)")
+        self.store_id = str(store_id).strip()
+        self.banner_plan = banner_plan
+        self.banner_columns = build_banner_columns(banner_plan)
+        self.weight_column = weight_column
+        self.wave_column = wave_column
+        self.record_column = record_column
+        self.store_dir = Path(store_dir) if store_dir is not None else study_store_dir(self.store_id)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.key = plan_key(self.store_id, banner_plan, weight_column, wave_column)
+        self.state = self._load()
+
+    # ----- persistence -----
+
+    @property
+    def path(self) -> Path:
+        return self.store_dir / f"{self.key}-v{STORE_FORMAT_VERSION}.pkl"
+
+    def _empty_state(self) -> Dict:
+        return {'version': STORE_FORMAT_VERSION, 'columns': [], 'seen': set(), 'waves': {}}
+
+    def _load(self) -> Dict:
+        if not self.path.exists():
+            return self._empty_state()
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"WARNING: Discarding unreadable tracker store {self.path.name}: {e}")
+            return self._empty_state()
+        if state.get('version') != STORE_FORMAT_VERSION:
+            return self._empty_state()
+        return state
+
+    def save(self) -> None:
+        """Write the state atomically"""
+        tmp_path = self.path.with_suffix('.pkl.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Forget every aggregate (the next update recomputes from all rows)"""
+        self.state = self._empty_state()
+        self.path.unlink(missing_ok=True)
+
+    # ----- aggregation -----
+
+    @property
+    def waves(self) -> Dict[str, Dict]:
+        """Aggregated waves: rows, first/last start_date and last update time"""
+        return {wave: {k: v for k, v in state.items() if k not in ('bases', 'tables')}
+                for wave, state in self.state['waves'].items()}
+
+    def _record_ids(self, df: pd.DataFrame) -> np.ndarray:
+        record_column = self.record_column or next((col for col in RECORD_COLUMNS if col in df.columns), None)
+        if record_column is None or record_column not in df.columns:
+            raise ValueError("Tracker data needs a record or uuid column to tell new rows from aggregated ones")
+        return df[record_column].astype(str).to_numpy(dtype=object)
+
+    def update(self, df: pd.DataFrame, questions: List[Dict]) -> Dict:
+        """
+        Fold rows not aggregated yet into the store, and save it
+
+        Args:
+            df: Full tracker export (all waves so far)
+            questions: List of question definitions with type info
+
+        Returns:
+            Summary: new_rows, skipped_rows (already aggregated or duplicate
+            IDs), new rows per wave and back-filled question count
+        """
+        if self.weight_column and self.weight_column not in df.columns:
+            raise ValueError(f"Weight column '{self.weight_column}' not found in data")
+
+        ids = self._record_ids(df)
+        seen = self.state['seen']
+        first = ~pd.Series(ids).duplicated().to_numpy()
+        new = first & ~pd.Series(ids).isin(seen).to_numpy()
+        waves = _wave_labels(df, self.wave_column)
+        keys = [question_key(q) for q in questions]
+
+        columns = list(dict.fromkeys(self.state['columns'] + [str(col) for col in df.columns]))
+        self.state['columns'] = columns
+        catalog = schema_catalog(columns)
+        n_columns = len(self.banner_columns)
+        summary = {'new_rows': int(new.sum()), 'skipped_rows': int(len(df) - new.sum()), 'waves': {},
+                   'backfilled_questions': 0}
+
+        for wave in dict.fromkeys(waves):
+            in_wave = waves == wave
+            wave_state = self.state['waves'].setdefault(
+                wave, {'rows': 0, 'bases': BannerBasesPartial(n_columns), 'tables': {}}
+            )
+            missing = [(q, key) for q, key in zip(questions, keys) if key not in wave_state['tables']]
+            known = [(q, key) for q, key in zip(questions, keys) if key in wave_state['tables']]
+            wave_new = in_wave & new
+            # Questions new to the plan read the wave's aggregated rows once, plus the new ones
+            rows = in_wave & first if missing and wave_state['rows'] else wave_new
+            if not rows.any():
+                continue
+
+            chunk = df[rows].reset_index(drop=True)
+            masks = BannerMaskStore(chunk)
+            mask_matrix = masks.matrix(self.banner_columns)
+            weights = masks.weights(self.weight_column) if self.weight_column else None
+            is_new = wave_new[rows]
+
+            new_chunk = chunk[is_new].reset_index(drop=True) if not is_new.all() else chunk
+            new_masks = mask_matrix[is_new]
+            new_weights = weights[is_new] if weights is not None else None
+            wave_state['bases'].add(new_masks, new_weights)
+            for q, key in known:
+                wave_state['tables'][key].add(new_chunk, new_masks, new_weights)
+            for q, key in missing:
+                partial = question_partial(q, catalog, n_columns)
+                partial.add(chunk, mask_matrix, weights)
+                wave_state['tables'][key] = partial
+            summary['backfilled_questions'] += len(missing) if wave_state['rows'] else 0
+
+            wave_state['rows'] += int(is_new.sum())
+            if 'start_date' in df.columns and is_new.any():
+                dates = pd.to_datetime(new_chunk['start_date'], errors='coerce').dropna()
+                if len(dates):
+                    earliest, latest = dates.min().isoformat(), dates.max().isoformat()
+                    wave_state['first_date'] = min(wave_state.get('first_date', earliest), earliest)
+                    wave_state['last_date'] = max(wave_state.get('last_date', latest), latest)
+            wave_state['updated_at'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            summary['waves'][wave] = int(is_new.sum())
+
+        seen.update(ids[new])
+        self.save()
+        print(f"INFO: Tracker store folded in {summary['new_rows']} new rows "
+              f"({summary['skipped_rows']} already aggregated) across {len(summary['waves'])} waves")
+        return summary
+
+    # ----- reporting -----
+
+    def _merged(self, questions: List[Dict], waves: List[str]):
+        """(bases, partials, rows) of the questions summed over waves"""
+        catalog = schema_catalog(self.state['columns'])
+        n_columns = len(self.banner_columns)
+        bases = BannerBasesPartial(n_columns)
+        partials = [question_partial(q, catalog, n_columns) for q in questions]
+        rows = 0
+
+        for wave in waves:
+            wave_state = self.state['waves'][wave]
+            bases.merge(wave_state['bases'])
+            rows += wave_state['rows']
+            for q, partial in zip(questions, partials):
+                stored = wave_state['tables'].get(question_key(q))
+                if stored is None:
+                    print(f"WARNING: Wave {wave} has no aggregate for {q['id']}; run update() with this question")
+                else:
+                    partial.merge(stored)
+        return bases, partials, rows
+
+    def report(self, questions: List[Dict], waves: Optional[List[str]] = None,
+               sig_confidence: Optional[float] = DEFAULT_CONFIDENCE) -> Dict:
+        """
+        Cross-tab report of the aggregated rows, without reading any data
+
+        Args:
+            questions: List of question definitions with type info (as passed
+                to update)
+            waves: Waves to include (None = all); see the waves property
+            sig_confidence: Confidence level of the column significance
+                tests; None skips stat testing
+
+        Returns:
+            Report shaped like generate_crosstab_report's; metadata['waves']
+            lists the waves included
+        """
+        waves = list(self.state['waves']) if waves is None else [str(wave) for wave in waves]
+        unknown = [wave for wave in waves if wave not in self.state['waves']]
+        if unknown:
+            raise ValueError(f"Waves not in tracker store: {', '.join(unknown)}")
+
+        profiler = ReportProfiler()
+        with profiler.stage('merge'):
+            bases, partials, rows = self._merged(questions, waves)
+
+        weighted = self.weight_column is not None
+        with profiler.stage('finalize'):
+            tables = [partial_table(q, partial, self.banner_columns, bases, weighted)
+                      for q, partial in zip(questions, partials)]
+
+        metadata = {
+            'banner_name': self.banner_plan.get('name', 'Unnamed Banner'),
+            'total_base': rows,
+            'num_questions': len(questions),
+            'num_columns': len(self.banner_columns),
+            'waves': waves
+        }
+        if weighted:
+            metadata['weight_column'] = self.weight_column
+            metadata['weighted_total_base'] = round_weighted_sum(bases.total_weight)
+
+        report = {
+            'metadata': metadata,
+            'tables': tables
+        }
+        if sig_confidence:
+            with profiler.stage('significance'):
+                add_report_significance(report, self.banner_columns, sig_confidence)
+
+        metadata['profile'] = profiler.finish()
+
+        return report
+
+    def wave_deltas(self, questions: List[Dict], current: str, previous: str) -> Dict:
+        """
+        Wave-over-wave changes of every table, from stored aggregates
+
+        Args:
+            questions: List of question definitions with type info
+            current: Wave to compare
+            previous: Wave to compare against
+
+        Returns:
+            {'current', 'previous', 'tables': [{question_id, question_type,
+            data: {column id: cell of current - previous}}]}; percentages,
+            means and boxes are differenced, labels and letters are not
+        """
+        now = self.report(questions, [current], sig_confidence=None)
+        before = self.report(questions, [previous], sig_confidence=None)
+
+        tables = []
+        for table, earlier in zip(now['tables'], before['tables']):
+            tables.append({
+                'question_id': table['question_id'],
+                'question_type': table['question_type'],
+                'data': {cid: _delta(cell, earlier['data'][cid]) or {} for cid, cell in table['data'].items()}
+            })
+        return {'current': str(current), 'previous': str(previous), 'tables': tables}